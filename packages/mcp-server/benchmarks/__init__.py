@@ -0,0 +1,3 @@
+"""
+Benchmarks - Performance harnesses for the Guru MCP server tools
+"""
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+RAG Benchmark - Ingest and query throughput, latency and recall of the RAG knowledge base tool
+
+Drives `RAGKnowledgeBaseTool` directly (no MCP server) against a synthetic corpus in a
+scratch directory and prints one JSON document, so runs can be diffed across changes:
+
+    python -m benchmarks.rag_benchmark --chunks 100000 --duplication 0.1 --ann --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from guru_mcp.tools.rag_knowledge_base import RAGKnowledgeBaseTool
+
+from .synthetic_corpus import SyntheticCorpus
+
+
+KB_NAME = "rag-benchmark"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark RAG ingest and query performance on a synthetic corpus")
+
+    corpus = parser.add_argument_group("corpus")
+    corpus.add_argument("--chunks", type=int, default=10_000, help="chunks to generate (10k to 1M)")
+    corpus.add_argument("--chunk-size", type=int, default=1000, help="characters per chunk")
+    corpus.add_argument("--chunks-per-document", type=int, default=10)
+    corpus.add_argument("--vocabulary-size", type=int, default=20_000)
+    corpus.add_argument("--zipf-exponent", type=float, default=1.1, help="word frequency skew (higher = fewer distinct words per chunk)")
+    corpus.add_argument("--duplication", type=float, default=0.0, help="probability that a passage repeats an earlier one")
+    corpus.add_argument("--seed", type=int, default=0)
+
+    kb = parser.add_argument_group("knowledge base")
+    kb.add_argument("--embedding-dim", type=int, default=256)
+    kb.add_argument("--vector-dtype", choices=["float32", "float16"], default="float32")
+    kb.add_argument("--ann", action="store_true", help="enable the IVF index")
+    kb.add_argument("--quantization", choices=["none", "int8", "pq"], default="none")
+    kb.add_argument("--batch-documents", type=int, default=500, help="documents per add_documents call")
+
+    query = parser.add_argument_group("queries")
+    query.add_argument("--queries", type=int, default=200)
+    query.add_argument("--top-k", type=int, default=10)
+    query.add_argument("--modes", nargs="+", choices=["hybrid", "exact", "ann"], default=None,
+                       help="search modes to time (default: hybrid, exact, plus ann with --ann)")
+    query.add_argument("--nprobe", type=int, default=8)
+    query.add_argument("--shard-rows", type=int, default=65_536, help="rows per shard for process-parallel exact search")
+    query.add_argument("--search-processes", type=int, default=None,
+                       help="worker processes for sharded exact search (default: CPU count; 1 disables it)")
+
+    run = parser.add_argument_group("run")
+    run.add_argument("--workdir", type=Path, help="directory for the scratch knowledge base (default: a temp dir)")
+    run.add_argument("--keep", action="store_true", help="keep the scratch knowledge base afterwards")
+    run.add_argument("--output", type=Path, help="also write the JSON report to this file")
+
+    args = parser.parse_args(argv)
+    if args.modes is None:
+        args.modes = ["hybrid", "exact"] + (["ann"] if args.ann else [])
+    return args
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if len(samples) == 0:
+        return {}
+    return {
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "max_ms": float(samples.max())
+    }
+
+
+def recall(result_ids: List[int], expected_ids: np.ndarray) -> float:
+    if len(expected_ids) == 0:
+        return 1.0
+    return len(set(result_ids).intersection(expected_ids.tolist())) / len(expected_ids)
+
+
+def oracle_top_k(matrix: np.ndarray, live_mask: np.ndarray, chunk_ids: np.ndarray, query: np.ndarray, k: int,
+                 block_rows: int = 262_144) -> np.ndarray:
+    """Exact top-k chunk ids by cosine, scanning the matrix in blocks (independent of VectorMatrix.search)"""
+    norm = np.linalg.norm(query)
+    query = query / norm if norm > 0 else query
+
+    scores = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), block_rows):
+        scores[start:start + block_rows] = np.asarray(matrix[start:start + block_rows], dtype=np.float32) @ query
+    scores[~live_mask] = -np.inf
+
+    k = min(k, int(live_mask.sum()))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return chunk_ids[top]
+
+
+def directory_bytes(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def call(tool: RAGKnowledgeBaseTool, **args: Any) -> str:
+    """Run a tool operation, turning its markdown error replies into exceptions"""
+    result = await tool.execute(args)
+    if result.startswith("## Error"):
+        raise RuntimeError(f"{args['operation']} failed: {result}")
+    return result
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="guru-rag-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    corpus = SyntheticCorpus(
+        chunks=args.chunks,
+        chunk_size=args.chunk_size,
+        chunks_per_document=args.chunks_per_document,
+        vocabulary_size=args.vocabulary_size,
+        zipf_exponent=args.zipf_exponent,
+        duplication=args.duplication,
+        seed=args.seed
+    )
+
+    # Cognitive analysis is off, so the tool never touches the core bridge or the wingman
+    tool = RAGKnowledgeBaseTool(core_bridge=None, phi4_wingman=None)
+    tool.knowledge_base_dir = workdir / "knowledge_bases"
+    tool.vector_shard_rows = args.shard_rows
+    if args.search_processes:
+        tool.vector_search_processes = args.search_processes
+    tool.knowledge_base_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        await call(
+            tool, operation="create", knowledge_base_name=KB_NAME, cognitive_systems=[],
+            embedding_dim=args.embedding_dim, vector_dtype=args.vector_dtype,
+            enable_ann_index=args.ann, vector_quantization=args.quantization
+        )
+
+        # Ingest
+        ingest_start = time.perf_counter()
+        generate_seconds = 0.0
+        batches = corpus.iter_batches(args.batch_documents)
+        while True:
+            generate_start = time.perf_counter()
+            batch = next(batches, None)
+            generate_seconds += time.perf_counter() - generate_start
+            if batch is None:
+                break
+            await call(
+                tool, operation="add_documents", knowledge_base_name=KB_NAME, documents=batch,
+                enable_cognitive_analysis=False, chunk_size=args.chunk_size, chunk_overlap=0
+            )
+        ingest_seconds = max(time.perf_counter() - ingest_start - generate_seconds, 1e-9)
+
+        kb_config, kb_path = await tool._load_knowledge_base_config(KB_NAME)
+        db_path = kb_path / "knowledge_base.db"
+        totals = (await tool._read_kb_stats(db_path))["totals"]
+        vector_matrix = await tool._get_vector_matrix(db_path)
+        quantization = tool._vector_quantization(kb_config)
+
+        # Queries: end-to-end retrieval latency and result recall per search mode
+        queries = corpus.sample_queries(args.queries)
+        embedder = await tool._get_kb_embedder(db_path)
+        query_vectors = np.asarray(embedder.embed_batch(queries), dtype=np.float32)
+
+        vectors = vector_matrix.snapshot()
+        matrix, live_mask, chunk_ids = vectors.matrix, vectors.live_mask, vectors.chunk_ids
+        oracle = [oracle_top_k(matrix, live_mask, chunk_ids, vector, args.top_k) for vector in query_vectors]
+
+        query_results: Dict[str, Any] = {}
+        for mode in args.modes:
+            await tool._retrieve_relevant_chunks(db_path, queries[0], args.top_k, mode, args.nprobe, quantization)
+
+            latencies, recalls = [], []
+            for query, expected in zip(queries, oracle):
+                start = time.perf_counter()
+                chunks = await tool._retrieve_relevant_chunks(db_path, query, args.top_k, mode, args.nprobe, quantization)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(recall([chunk["chunk_id"] for chunk in chunks], expected))
+
+            query_results[mode] = dict(percentiles(latencies), recall_at_k=float(np.mean(recalls)))
+
+        # Vector candidate generation alone, against the same oracle
+        candidate_searches = {"exact": lambda vector: vector_matrix.search(vector, args.top_k)}
+        sharded_searcher = tool._get_sharded_searcher()
+        if sharded_searcher.should_shard(vector_matrix):
+            sharded_searcher.search(vector_matrix, query_vectors[0], args.top_k)  # start the worker processes
+            candidate_searches["sharded"] = lambda vector: sharded_searcher.search(vector_matrix, vector, args.top_k)
+        if args.ann:
+            await tool._sync_ann_index(db_path)
+            ann_index = tool._get_ann_index(db_path, vector_matrix.dim)
+            if ann_index.is_trained:
+                candidate_searches["ann"] = lambda vector: ann_index.search(vector_matrix, vector, args.top_k, args.nprobe)
+        if quantization:
+            await tool._sync_vector_quantizer(db_path, quantization)
+            quantizer = tool._get_vector_quantizer(db_path, vector_matrix.dim, quantization)
+            if quantizer.is_trained:
+                candidate_searches[quantization] = lambda vector: quantizer.search(
+                    vector_matrix, vector, args.top_k, tool.quantization_rerank_factor
+                )
+
+        candidate_results: Dict[str, Any] = {}
+        for name, search in candidate_searches.items():
+            latencies, recalls = [], []
+            for vector, expected in zip(query_vectors, oracle):
+                start = time.perf_counter()
+                result_ids, _ = search(vector)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(recall(result_ids.tolist(), expected))
+            candidate_results[name] = dict(percentiles(latencies), recall_at_k=float(np.mean(recalls)))
+
+        db_bytes = sum(path.stat().st_size for path in kb_path.glob("knowledge_base.db*"))
+
+        return {
+            "benchmark": "rag",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "platform": {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system()},
+            "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+            "corpus": {
+                "documents": totals["documents"],
+                "chunk_references": totals["chunk_references"],
+                "unique_chunks": totals["chunks"],
+                "deduplicated_chunks": totals["chunk_references"] - totals["chunks"],
+                "vocabulary_size": corpus.vocabulary_size,
+                "generate_seconds": generate_seconds
+            },
+            "ingest": {
+                "seconds": ingest_seconds,
+                "documents_per_second": totals["documents"] / ingest_seconds,
+                "chunks_per_second": totals["chunk_references"] / ingest_seconds
+            },
+            "storage": {
+                "database_bytes": db_bytes,
+                "vector_bytes": directory_bytes(kb_path / "vectors"),
+                "ann_index_bytes": (kb_path / "ann_index.npz").stat().st_size if (kb_path / "ann_index.npz").exists() else 0,
+                "total_bytes": directory_bytes(kb_path)
+            },
+            "query": query_results,
+            "candidates": candidate_results
+        }
+    finally:
+        for pool in tool._connection_pools.values():
+            await pool.close()
+        tool._db_executor.shutdown(wait=True)
+        if tool._sharded_searcher is not None:
+            tool._sharded_searcher.close()
+        if not args.keep and args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(report_json + "\n")
+    print(report_json)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Synthetic Corpus - Deterministic generated documents for RAG benchmarks
+"""
+
+from typing import Any, Dict, Iterator, List
+import numpy as np
+
+
+class SyntheticCorpus:
+    """
+    Streams documents made of chunk-sized passages over a Zipf-distributed vocabulary
+
+    Every passage is a run of words ending in a full stop, between 60% and 90% of
+    `chunk_size` characters long, so a `DocumentChunker(chunk_size, chunk_overlap=0)` cuts
+    exactly one chunk per passage and the chunk count is known up front. With probability
+    `duplication` a passage repeats an earlier one verbatim, which the content-addressed
+    chunk store deduplicates. The first passage of each document is always new, so no two
+    documents are identical.
+    """
+
+    _syllables = [
+        consonant + vowel
+        for consonant in "bcdfghjklmnprstvwz"
+        for vowel in ("a", "e", "i", "o", "u", "ai", "ou")
+    ]
+
+    def __init__(self, chunks: int, chunk_size: int = 1000, chunks_per_document: int = 10,
+                 vocabulary_size: int = 20_000, zipf_exponent: float = 1.1, duplication: float = 0.0,
+                 categories: int = 8, seed: int = 0):
+        if not 0.0 <= duplication < 1.0:
+            raise ValueError("duplication must be in [0, 1)")
+        if chunk_size < 200:
+            raise ValueError("chunk_size must be at least 200 characters")
+
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.chunks_per_document = max(1, chunks_per_document)
+        self.vocabulary_size = vocabulary_size
+        self.zipf_exponent = zipf_exponent
+        self.duplication = duplication
+        self.categories = [f"category-{i}" for i in range(max(1, categories))]
+        self.seed = seed
+        self.max_duplicate_pool = 10_000  # passages eligible for repetition
+
+        rng = np.random.default_rng(seed)
+        self.vocabulary = self._build_vocabulary(rng, vocabulary_size)
+
+        # Zipf weights over word ranks; the cumulative table makes sampling one searchsorted
+        weights = 1.0 / np.arange(1, vocabulary_size + 1) ** zipf_exponent
+        self._cumulative_weights = np.cumsum(weights / weights.sum())
+
+    @property
+    def documents(self) -> int:
+        return -(-self.chunks // self.chunks_per_document)
+
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """Yield add_documents payloads ({"filename", "content", "category", "metadata"})"""
+        rng = np.random.default_rng(self.seed + 1)
+        duplicate_pool: List[str] = []
+        remaining = self.chunks
+
+        for doc_index in range(self.documents):
+            passages = []
+            for passage_index in range(min(self.chunks_per_document, remaining)):
+                if passage_index > 0 and duplicate_pool and rng.random() < self.duplication:
+                    passages.append(duplicate_pool[rng.integers(len(duplicate_pool))])
+                    continue
+
+                passage = self._passage(rng)
+                passages.append(passage)
+                if len(duplicate_pool) < self.max_duplicate_pool:
+                    duplicate_pool.append(passage)
+                else:
+                    duplicate_pool[rng.integers(self.max_duplicate_pool)] = passage
+
+            remaining -= len(passages)
+            yield {
+                "filename": f"doc-{doc_index:07d}.txt",
+                "content": "\n\n".join(passages),
+                "category": self.categories[doc_index % len(self.categories)],
+                "metadata": {"synthetic": True, "seed": self.seed}
+            }
+
+    def iter_batches(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        for document in self.iter_documents():
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def sample_queries(self, count: int, words_per_query: int = 6, seed: int = 1) -> List[str]:
+        """Queries drawn from the same word distribution as the passages"""
+        rng = np.random.default_rng(self.seed + 1000 + seed)
+        return [" ".join(self._words(rng, words_per_query)) for _ in range(count)]
+
+    def _passage(self, rng: np.random.Generator) -> str:
+        # Words are at most 12 characters, so the passage stays under chunk_size (>= 200)
+        target = int(self.chunk_size * rng.uniform(0.6, 0.9))
+        words: List[str] = []
+        length = 0
+        while length < target:
+            for word in self._words(rng, 32):
+                words.append(word)
+                length += len(word) + 1
+                if length >= target:
+                    break
+        return " ".join(words).capitalize() + "."
+
+    def _words(self, rng: np.random.Generator, count: int) -> List[str]:
+        ranks = np.searchsorted(self._cumulative_weights, rng.random(count), side="right")
+        return [self.vocabulary[min(rank, self.vocabulary_size - 1)] for rank in ranks]
+
+    def _build_vocabulary(self, rng: np.random.Generator, size: int) -> List[str]:
+        words: Dict[str, None] = {}
+        while len(words) < size:
+            syllable_count = int(rng.integers(1, 5))
+            word = "".join(self._syllables[i] for i in rng.integers(len(self._syllables), size=syllable_count))
+            words.setdefault(word)
+        return list(words)
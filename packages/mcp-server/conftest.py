@@ -0,0 +1,66 @@
+"""
+Shared fixtures for the RAG knowledge base tests
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from guru_mcp.tools.rag_knowledge_base import RAGKnowledgeBaseTool
+
+
+class StubCoreBridge:
+    """Deterministic stand-in for the Guru core bridge"""
+
+    async def invoke_harmonic_analyzer(self, content, depth):
+        return {"analysis_confidence": 0.9, "patterns": [len(content)]}
+
+    async def invoke_quantum_synthesizer(self, prompt, contents):
+        return {"synthesis_confidence": 0.9, "quantum_insights": []}
+
+
+class StubWingman:
+    async def generate_specialized_response(self, prompt, specialization):
+        return "Stub answer"
+
+
+WORDS = [
+    "harmonic", "quantum", "synthesis", "vector", "matrix", "cluster", "signal", "bridge", "kernel",
+    "lattice", "entropy", "gradient", "tensor", "spectrum", "horizon", "orbit", "cascade", "filter",
+    "river", "granite", "meadow", "copper", "falcon", "lantern", "harbor", "glacier", "ember", "willow"
+]
+
+
+def make_documents(count, prefix="doc", seed=0, paragraphs=3):
+    """Documents of random word paragraphs; each paragraph is long enough to be its own chunk"""
+    rng = random.Random(seed)
+    documents = []
+    for i in range(count):
+        content = "\n\n".join(
+            " ".join(rng.choice(WORDS) for _ in range(120)).capitalize() + "."
+            for _ in range(paragraphs)
+        )
+        documents.append({"filename": f"{prefix}-{i:04d}.txt", "content": content, "category": f"cat-{i % 3}"})
+    return documents
+
+
+@pytest.fixture
+def rag_tool(tmp_path, monkeypatch):
+    """A RAG tool whose knowledge bases live under a temporary home directory"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tool = RAGKnowledgeBaseTool(StubCoreBridge(), StubWingman())
+    yield tool
+
+    async def close_pools():
+        for pool in tool._connection_pools.values():
+            await pool.close()
+
+    asyncio.run(close_pools())
+    if tool._sharded_searcher is not None:
+        tool._sharded_searcher.close()
+    tool._db_executor.shutdown(wait=True)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
@@ -0,0 +1,17 @@
+"""
+Guru RAG Storage - Retrieval structures backing the RAG knowledge base tool
+"""
+
+from .vector_store import VectorMatrix, VectorSnapshot
+from .ann_index import IVFIndex
+from .quantizer import VectorQuantizer
+from .embedder import Embedder, HashingEmbedder
+from .onnx_embedder import ONNXEmbedder
+from .connection_pool import KBConnectionPool
+from .query_cache import QueryCache
+from .chunker import DocumentChunker
+from .snapshot import KBSnapshot
+from .concepts import ConceptExtractor
+from .sharded_search import ShardedSearcher
+
+__all__ = ["VectorMatrix", "VectorSnapshot", "IVFIndex", "VectorQuantizer", "Embedder", "HashingEmbedder", "ONNXEmbedder", "KBConnectionPool", "QueryCache", "DocumentChunker", "KBSnapshot", "ConceptExtractor", "ShardedSearcher"]
@@ -0,0 +1,240 @@
+"""
+ANN Index - Inverted-file (IVF) approximate nearest-neighbour index over a vector matrix
+"""
+
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from .vector_store import VectorMatrix, VectorSnapshot
+
+if TYPE_CHECKING:
+    from .quantizer import VectorQuantizer
+
+
+class IVFState:
+    """
+    Immutable clustering and inverted lists of an `IVFIndex`
+
+    `sync` builds a new state off to the side and publishes it in one swap, so a query that
+    read the state at its start keeps a complete index however the writer moves on.
+    """
+
+    def __init__(self, centroids: Optional[np.ndarray] = None, inverted_lists: Sequence[np.ndarray] = (),
+                 max_chunk_id: int = -1, indexed_count: int = 0, trained_size: int = 0):
+        self.centroids = centroids
+        self.inverted_lists = tuple(inverted_lists)
+        self.max_chunk_id = max_chunk_id
+        self.indexed_count = indexed_count
+        self.trained_size = trained_size
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def nlist(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+
+class IVFIndex:
+    """
+    Pure NumPy IVF index for cosine similarity search
+
+    Vectors are clustered with spherical k-means; each cluster keeps an inverted list of
+    chunk ids. A query only scores the vectors in the `nprobe` clusters whose centroids are
+    closest to it, reading them back from the KB's `VectorMatrix`.
+
+    Syncs must be serialised by the caller (the KB's write lock); searches may run alongside
+    them and each works on the `IVFState` current when it started.
+    """
+
+    def __init__(self, index_path: Path, dim: int):
+        self.index_path = index_path
+        self.dim = dim
+
+        # Tuning knobs
+        self.min_train_size = 1024  # below this, exact search is already fast
+        self.max_train_sample = 50_000
+        self.kmeans_iterations = 10
+        self.retrain_growth_factor = 4.0  # retrain once the KB outgrows its clustering
+
+        self._lock = threading.Lock()
+        self._state = IVFState()
+
+        self._load()
+
+    @property
+    def state(self) -> IVFState:
+        with self._lock:
+            return self._state
+
+    @property
+    def is_trained(self) -> bool:
+        return self.state.is_trained
+
+    @property
+    def nlist(self) -> int:
+        return self.state.nlist
+
+    def sync(self, vector_matrix: Union[VectorMatrix, VectorSnapshot]) -> int:
+        """Bring the index up to date with the vector matrix, returning how many rows were added"""
+        vector_matrix = vector_matrix.snapshot()
+        rows = len(vector_matrix)
+        state = self.state
+
+        if rows < state.indexed_count:
+            # The matrix was rebuilt underneath us; start over
+            state = IVFState()
+            self._publish(state)
+
+        if not state.is_trained or rows >= state.trained_size * self.retrain_growth_factor:
+            if rows < self.min_train_size:
+                return 0
+            self._publish(self._train(vector_matrix))
+            self.save()
+            return rows
+
+        chunk_ids = vector_matrix.chunk_ids
+        start = int(np.searchsorted(chunk_ids, state.max_chunk_id, side="right"))
+        if start >= rows:
+            return 0
+
+        self._publish(self._add(state, chunk_ids[start:], vector_matrix.matrix[start:]))
+        self.save()
+        return rows - start
+
+    def search(self, vector_matrix: Union[VectorMatrix, VectorSnapshot], query_vector: np.ndarray, top_k: int, nprobe: int,
+               quantizer: Optional["VectorQuantizer"] = None, rerank_factor: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (chunk_ids, cosine similarities) of the approximate top_k rows, best first
+
+        With a quantizer, the probed lists are scored on its codes and only a shortlist is
+        rescored from the float matrix.
+        """
+        vector_matrix = vector_matrix.snapshot()
+        state = self.state
+        if not state.is_trained:
+            return vector_matrix.search(query_vector, top_k)
+
+        query = np.asarray(query_vector, dtype=np.float32).reshape(self.dim)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        nprobe = max(1, min(nprobe, state.nlist))
+        centroid_scores = state.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidate_ids = np.concatenate([state.inverted_lists[i] for i in probe])
+        if len(candidate_ids) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # Lists may still hold ids the snapshot has removed or compacted away; live_rows drops them
+        rows = vector_matrix.live_rows(candidate_ids)
+        if quantizer is not None and quantizer.is_trained:
+            return quantizer.search(vector_matrix, query, top_k, rerank_factor, rows=rows)
+
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        scores = vector_matrix.matrix[rows] @ query
+
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return vector_matrix.chunk_ids[rows[top]], scores[top]
+
+    def save(self):
+        """Persist the index atomically next to the KB database"""
+        state = self.state
+        if state.centroids is None:
+            return
+
+        lengths = np.array([len(ids) for ids in state.inverted_lists], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        list_ids = np.concatenate(state.inverted_lists) if state.inverted_lists else np.zeros(0, dtype=np.int64)
+
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=state.centroids,
+                list_offsets=offsets,
+                list_ids=list_ids.astype(np.int64),
+                state=np.array([state.max_chunk_id, state.indexed_count, state.trained_size], dtype=np.int64)
+            )
+        tmp_path.replace(self.index_path)
+
+    def _load(self):
+        if not self.index_path.exists():
+            return
+
+        with np.load(self.index_path) as data:
+            centroids = data["centroids"]
+            if centroids.shape[1] != self.dim:
+                return
+            offsets = data["list_offsets"]
+            list_ids = data["list_ids"]
+            max_chunk_id, indexed_count, trained_size = (int(v) for v in data["state"])
+
+        self._publish(IVFState(
+            centroids.astype(np.float32), [list_ids[offsets[i]:offsets[i + 1]] for i in range(len(centroids))],
+            max_chunk_id, indexed_count, trained_size
+        ))
+
+    def _publish(self, state: IVFState):
+        with self._lock:
+            self._state = state
+
+    def _train(self, vector_matrix: VectorSnapshot) -> IVFState:
+        """Cluster the matrix with spherical k-means and build every inverted list afresh"""
+        matrix = vector_matrix.matrix
+        rows = len(matrix)
+        nlist = int(min(4096, max(1, round(np.sqrt(rows)))))
+
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(rows, size=min(rows, self.max_train_sample), replace=False))
+        sample = np.asarray(matrix[sample_rows])
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignments = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=nlist)
+
+            # Reseed empty clusters from random sample points
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                sums[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        empty_lists = [np.zeros(0, dtype=np.int64) for _ in range(nlist)]
+        return self._add(IVFState(centroids, empty_lists, trained_size=rows), vector_matrix.chunk_ids, matrix)
+
+    def _add(self, state: IVFState, chunk_ids: np.ndarray, vectors: np.ndarray, batch_size: int = 65_536) -> IVFState:
+        """A copy of `state` with the given rows assigned to their lists (the lists of `state` are left alone)"""
+        inverted_lists = list(state.inverted_lists)
+        for start in range(0, len(chunk_ids), batch_size):
+            batch_ids = np.asarray(chunk_ids[start:start + batch_size], dtype=np.int64)
+            assignments = self._assign(np.asarray(vectors[start:start + batch_size]), state.centroids)
+
+            order = np.argsort(assignments, kind="stable")
+            lists, boundaries = np.unique(assignments[order], return_index=True)
+            for list_no, ids in zip(lists, np.split(batch_ids[order], boundaries[1:])):
+                inverted_lists[list_no] = np.concatenate([inverted_lists[list_no], ids])
+
+        max_chunk_id = max(state.max_chunk_id, int(chunk_ids[-1])) if len(chunk_ids) else state.max_chunk_id
+        return IVFState(state.centroids, inverted_lists, max_chunk_id, state.indexed_count + len(chunk_ids), state.trained_size)
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 4096) -> np.ndarray:
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            batch = np.asarray(vectors[start:start + batch_size])
+            assignments[start:start + batch_size] = np.argmax(batch @ centroids.T, axis=1)
+        return assignments
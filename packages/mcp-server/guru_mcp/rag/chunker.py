@@ -0,0 +1,126 @@
+"""
+Chunker - Streaming, sentence-aware document chunking with exact overlap
+"""
+
+import codecs
+import re
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+class DocumentChunker:
+    """
+    Splits text into overlapping windows without holding the whole document in memory
+
+    Text arrives in blocks (from a string, a file handle or an mmap). Sentence boundaries
+    are found with a single regex pass over each block as it is read, and a window is cut
+    at the last boundary past its midpoint. The next window starts exactly `chunk_overlap`
+    units before the previous one ended. Sizes are in characters, or in approximate tokens
+    (`chars_per_token` characters each) when `unit="tokens"`.
+    """
+
+    _boundary_pattern = re.compile(r"[.!?]+[\"')\]]*(?=\s)")
+    _boundary_lookback = 16  # trailing characters whose boundary status depends on unread text
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, unit: str = "chars",
+                 chars_per_token: float = 4.0, read_size: int = 1 << 20):
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unsupported chunk unit: {unit}. Available: chars, tokens")
+        if chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_size must be positive and chunk_overlap smaller than chunk_size")
+
+        scale = chars_per_token if unit == "tokens" else 1
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.unit = unit
+        self.window_chars = max(1, int(chunk_size * scale))
+        self.overlap_chars = min(int(chunk_overlap * scale), self.window_chars - 1)
+        self.read_size = max(read_size, self.window_chars + self._boundary_lookback)
+
+    def chunk_text(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Chunk an in-memory string"""
+        return self._chunk_blocks(text[i:i + self.read_size] for i in range(0, len(text), self.read_size))
+
+    def chunk_stream(self, stream, encoding: str = "utf-8") -> Iterator[Dict[str, Any]]:
+        """Chunk a text or binary file handle (or mmap), reading `read_size` at a time"""
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+        def blocks():
+            while True:
+                block = stream.read(self.read_size)
+                if not block:
+                    break
+                yield decoder.decode(block) if isinstance(block, (bytes, bytearray)) else block
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+
+        return self._chunk_blocks(blocks())
+
+    def chunk_file(self, path: Path, encoding: str = "utf-8") -> Iterator[Dict[str, Any]]:
+        """Chunk a file on disk with memory bounded by read_size"""
+        with open(path, "rb") as f:
+            yield from self.chunk_stream(f, encoding)
+
+    def _chunk_blocks(self, blocks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Yield {"content", "start", "end"} chunks; positions are character offsets into the document"""
+        blocks = iter(blocks)
+        size, overlap = self.window_chars, self.overlap_chars
+
+        buffer = ""  # document text from offset buffer_start onwards
+        buffer_start = 0
+        boundaries: List[int] = []  # offsets just past sentence-ending punctuation, ascending
+        first_boundary = 0  # index of the first boundary after `start`
+        scanned_to = 0  # boundaries before this offset are final
+        eof = False
+        start = 0
+
+        while True:
+            # Read until the window (plus lookahead for boundary detection) is buffered
+            while not eof and buffer_start + len(buffer) < start + size + self._boundary_lookback:
+                block = next(blocks, None)
+                if block is None:
+                    eof = True
+                else:
+                    buffer += block
+
+            buffer_end = buffer_start + len(buffer)
+            final_to = buffer_end if eof else buffer_end - self._boundary_lookback
+            if final_to > scanned_to:
+                scan_from = max(scanned_to - self._boundary_lookback - buffer_start, 0)
+                for match in self._boundary_pattern.finditer(buffer, scan_from):
+                    if match.end() + buffer_start > final_to:
+                        break
+                    if match.end() + buffer_start > scanned_to:
+                        boundaries.append(match.end() + buffer_start)
+                scanned_to = final_to
+
+            if start >= buffer_end:
+                return
+
+            end = min(start + size, buffer_end)
+
+            # Try to end at a sentence boundary past the middle of the window
+            if not (eof and end == buffer_end):
+                last = bisect_right(boundaries, end, first_boundary) - 1
+                if last >= first_boundary and boundaries[last] > start + size // 2:
+                    end = boundaries[last]
+
+            content = buffer[start - buffer_start:end - buffer_start].strip()
+            if content:
+                yield {"content": content, "start": start, "end": end}
+
+            if eof and end >= buffer_end:
+                return
+
+            # Step back exactly `overlap` characters from where this chunk ended
+            start = end - overlap if end - overlap > start else end
+
+            first_boundary = bisect_right(boundaries, start, first_boundary)
+            if start - buffer_start >= self.read_size:
+                # Drop consumed text (and its boundaries) about once per block read
+                buffer = buffer[start - buffer_start:]
+                buffer_start = start
+                del boundaries[:first_boundary]
+                first_boundary = 0
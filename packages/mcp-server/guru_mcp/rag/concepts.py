@@ -0,0 +1,87 @@
+"""
+Concept Extractor - Lightweight entity and key-term extraction for the knowledge graph
+"""
+
+import heapq
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+
+class ConceptExtractor:
+    """
+    Picks the concepts a chunk is about without any model or external dependency
+
+    Two kinds of concept are collected in one pass over the text:
+    - entities: runs of capitalised words ("Quantum Synthesis", "Guru") without leading
+      function words, except a lone capitalised word that merely starts a sentence
+    - terms: lower-cased words of at least `min_term_length` letters that are not stopwords
+
+    Each concept's weight is its frequency in the chunk, plus `entity_weight` per entity
+    occurrence, divided by the strongest concept's, so weights lie in (0, 1]. Concepts come back sorted by weight,
+    then key, so the same text always yields the same ordered list.
+    """
+
+    _term_pattern = re.compile(r"[a-z][a-z0-9'-]*[a-z0-9]")
+    _entity_pattern = re.compile(r"\b[A-Z][a-z0-9]+(?:[ \t]+[A-Z][a-z0-9]+)*")
+
+    stopwords = frozenset("""
+        about above after again against also among another because been before being below between
+        both cannot could does doing down during each either else even ever every from further
+        have having here hers herself himself however into itself just least less like made make
+        many more most much must neither never none only other ought ours ourselves over same
+        shall should since some such than that their theirs them themselves then there these they
+        this those though through thus together under unless until upon very were what when where
+        whether which while whom whose will with within without would your yours yourself
+    """.split())
+
+    # Capitalised only because they open a sentence or a title ("The Guru Bridge")
+    function_words = stopwords | frozenset("a an and as at but by for if in is it its of on or the to".split())
+
+    def __init__(self, max_concepts: int = 8, min_term_length: int = 4, entity_weight: float = 1.0):
+        self.max_concepts = max_concepts
+        self.min_term_length = min_term_length
+        self.entity_weight = entity_weight
+
+    def extract(self, text: str) -> List[Tuple[str, str, str, float]]:
+        """Return up to max_concepts (key, title, kind, weight) tuples, strongest first
+
+        `key` is the normalised form concepts are merged on, `title` the first surface form
+        seen and `kind` either "entity" or "term".
+        """
+        scores: Dict[str, float] = {}
+        titles: Dict[str, str] = {}
+        kinds: Dict[str, str] = {}
+
+        for match in self._entity_pattern.finditer(text):
+            words = match.group(0).split()
+            leading = 0
+            while leading < len(words) and words[leading].lower() in self.function_words:
+                leading += 1
+            words = words[leading:]
+            if not words or (len(words) == 1 and not leading and self._opens_sentence(text, match.start())):
+                continue
+            phrase = " ".join(words)
+            key = phrase.lower()
+            scores[key] = scores.get(key, 0.0) + self.entity_weight
+            titles.setdefault(key, phrase)
+            kinds[key] = "entity"
+
+        # Terms are counted over the lower-cased text once; filters only touch distinct words
+        for key, count in Counter(self._term_pattern.findall(text.lower())).items():
+            if len(key) < self.min_term_length or key in self.stopwords:
+                continue
+            scores[key] = scores.get(key, 0.0) + count
+            titles.setdefault(key, key)
+
+        if not scores:
+            return []
+
+        ranked = heapq.nsmallest(self.max_concepts, scores.items(), key=lambda item: (-item[1], item[0]))
+        top_score = ranked[0][1]
+        return [(key, titles[key], kinds.get(key, "term"), score / top_score) for key, score in ranked]
+
+    @staticmethod
+    def _opens_sentence(text: str, position: int) -> bool:
+        preceding = text[max(0, position - 8):position].rstrip()
+        return not preceding or preceding[-1] in ".!?"
@@ -0,0 +1,103 @@
+"""
+Connection Pool - Long-lived, tuned SQLite connections per knowledge base, used off the event loop
+"""
+
+import asyncio
+import sqlite3
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Callable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class KBConnectionPool:
+    """
+    SQLite connections for one knowledge base, driven through a thread executor
+
+    Connections stay open for the life of the pool, so SQLite's page cache and memory map
+    survive between operations instead of being rebuilt on every call. In WAL mode up to
+    `max_readers` reader connections keep answering queries while the single writer
+    connection holds a transaction; writers are serialised by an asyncio lock rather than
+    by SQLite's busy handler.
+    """
+
+    def __init__(self, db_path: Path, executor: Executor, max_readers: int = 4,
+                 mmap_size: int = 256 * 1024 * 1024, cache_size_kb: int = 64 * 1024):
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+
+        self._executor = executor
+        self._idle_readers: List[sqlite3.Connection] = []
+        self._reader_slots = asyncio.Semaphore(max_readers)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._closed = False
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run blocking work (SQLite calls, file IO, NumPy scans) on the pool's executor"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def read(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run fn(connection, *args) on a pooled read-only connection"""
+        async with self._reader_slots:
+            conn = self._idle_readers.pop() if self._idle_readers else await self.run(self._connect, True)
+            try:
+                return await self.run(fn, conn, *args)
+            finally:
+                if self._closed:
+                    conn.close()
+                else:
+                    self._idle_readers.append(conn)
+
+    async def write(self, fn: Callable[..., T], *args: Any, transaction: bool = True) -> T:
+        """Run fn(connection, *args) on the writer connection
+
+        By default fn runs inside BEGIN IMMEDIATE ... COMMIT and is rolled back if it raises;
+        pass transaction=False for work that manages its own transactions (or runs VACUUM).
+        Either way no other write on this KB runs until fn returns.
+        """
+        async with self._write_lock:
+            if self._closed:
+                raise RuntimeError(f"Connection pool for {self.db_path} is closed")
+            if self._writer is None:
+                self._writer = await self.run(self._connect, False)
+            return await self.run(self._run_write, self._writer, fn, args, transaction)
+
+    async def close(self):
+        """Close every connection once in-flight writes have finished"""
+        async with self._write_lock:
+            self._closed = True
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            while self._idle_readers:
+                self._idle_readers.pop().close()
+
+    def _connect(self, read_only: bool) -> sqlite3.Connection:
+        # Autocommit mode: transactions are always explicit, and reads never hold one open
+        conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False, timeout=30.0)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @staticmethod
+    def _run_write(conn: sqlite3.Connection, fn: Callable[..., T], args: tuple, transaction: bool) -> T:
+        if not transaction:
+            return fn(conn, *args)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
@@ -0,0 +1,78 @@
+"""
+Embedder - Deterministic feature-hashing text embeddings for knowledge base retrieval
+"""
+
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+import numpy as np
+
+
+class Embedder(ABC):
+    """
+    Interface shared by the knowledge base embedding backends
+
+    `version` identifies the model: stored vectors are only comparable with query vectors
+    produced by the same version. Backends whose vectors are expensive to compute set
+    `cacheable` so the knowledge base keeps them in its embedding cache table.
+    """
+
+    version = "base"
+    cacheable = False
+    dim: int
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text as an L2-normalised float32 vector"""
+        return self.embed_batch([text])[0]
+
+    @abstractmethod
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed many texts at once into an (n, dim) L2-normalised float32 matrix"""
+
+
+class HashingEmbedder(Embedder):
+    """
+    Stable, vectorised hashing vectorizer
+
+    Words are bucketed with keyed BLAKE2b rather than Python's per-process salted `hash()`,
+    so vectors stored in a knowledge base stay comparable with query vectors across
+    restarts and hosts. One hash bit picks the sign of each feature, which keeps collisions
+    from inflating cosine similarity between unrelated texts.
+    """
+
+    version = "blake2b-hash-v1"
+
+    _key = b"guru-rag-embedder"
+    _word_pattern = re.compile(r"[^\W\d_]{3,}")
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._features = lru_cache(maxsize=1 << 18)(self._hash_word)
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed many texts at once into an (n, dim) L2-normalised float32 matrix"""
+        rows: List[int] = []
+        buckets: List[int] = []
+        signs: List[float] = []
+
+        for row, text in enumerate(texts):
+            for word in self._word_pattern.findall(text.lower()):
+                bucket, sign = self._features(word)
+                rows.append(row)
+                buckets.append(bucket)
+                signs.append(sign)
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(vectors, (np.array(rows), np.array(buckets)), np.array(signs, dtype=np.float32))
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _hash_word(self, word: str) -> Tuple[int, float]:
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8, key=self._key).digest()
+        value = int.from_bytes(digest, "little")
+        return (value >> 1) % self.dim, 1.0 if value & 1 else -1.0
@@ -0,0 +1,112 @@
+"""
+ONNX Embedder - Local sentence-embedding models run with onnxruntime
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+import numpy as np
+
+from .embedder import Embedder
+
+
+class ONNXEmbedder(Embedder):
+    """
+    Sentence embeddings from a local ONNX export (e.g. a MiniLM, BGE or E5 model directory)
+
+    The directory must hold `model.onnx` (or `onnx/model.onnx`) and the Hugging Face
+    `tokenizer.json`; nothing is ever downloaded. Texts are sorted by length and encoded in
+    batches so padding stays short, and onnxruntime's intra-op threads are sized to the CPU.
+    Token embeddings are mean-pooled under the attention mask (a model that already outputs
+    a pooled sentence vector is used as is) and L2-normalised.
+    """
+
+    cacheable = True
+
+    def __init__(self, model_dir: Path, batch_size: Optional[int] = None, max_length: int = 256,
+                 threads: Optional[int] = None):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError("The onnx embedder needs the onnxruntime and tokenizers packages") from e
+
+        self.model_dir = Path(model_dir).expanduser()
+        model_path = next(
+            (path for path in (self.model_dir / "model.onnx", self.model_dir / "onnx" / "model.onnx") if path.exists()),
+            None
+        )
+        tokenizer_path = self.model_dir / "tokenizer.json"
+        if model_path is None or not tokenizer_path.exists():
+            raise RuntimeError(f"No model.onnx and tokenizer.json found in {self.model_dir}")
+
+        cpu_count = os.cpu_count() or 1
+        self.threads = threads or cpu_count
+        self.batch_size = batch_size or min(256, 16 * cpu_count)
+        self.max_length = max_length
+
+        self._tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self._tokenizer.enable_truncation(max_length)
+        if self._tokenizer.padding is None:
+            pad_token = next((token for token in ("[PAD]", "<pad>") if self._tokenizer.token_to_id(token) is not None), None)
+            if pad_token:
+                self._tokenizer.enable_padding(pad_id=self._tokenizer.token_to_id(pad_token), pad_token=pad_token)
+            else:
+                self._tokenizer.enable_padding()
+        else:
+            # Pad each batch to its own longest text rather than a fixed length
+            self._tokenizer.enable_padding(**dict(self._tokenizer.padding, length=None))
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self._session.get_inputs()}
+
+        outputs = self._session.get_outputs()
+        pooled = [output for output in outputs if output.name == "sentence_embedding"]
+        self._output_name = (pooled or outputs)[0].name
+
+        # Vectors are tied to the exact model file, not just the directory name
+        digest = hashlib.blake2b(digest_size=6)
+        with open(model_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.version = f"onnx-{self.model_dir.name}-{digest.hexdigest()}"
+
+        self.dim = self._encode(["dimension probe"]).shape[1]
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed many texts at once into an (n, dim) L2-normalised float32 matrix"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        # Similar lengths share a batch, so little compute is spent on padding
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            vectors[rows] = self._encode([texts[row] for row in rows])
+
+        return vectors
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(list(texts))
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+        }
+
+        output = self._session.run(
+            [self._output_name], {name: value for name, value in feeds.items() if name in self._input_names}
+        )[0].astype(np.float32)
+
+        if output.ndim == 3:
+            mask = attention_mask[..., None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return output / norms
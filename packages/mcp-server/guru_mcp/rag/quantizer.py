@@ -0,0 +1,361 @@
+"""
+Vector Quantizer - Compressed int8 / product-quantized codes for memory-light vector search
+"""
+
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+import numpy as np
+
+from .vector_store import VectorMatrix, VectorSnapshot
+
+
+class QuantizerState:
+    """
+    Immutable codebook and codes of a `VectorQuantizer`
+
+    `codes` maps exactly the `encoded_count` rows written when the state was built, so rows
+    appended (or a code file rewritten) by a later sync never show through it.
+    """
+
+    def __init__(self, scale: Optional[np.ndarray] = None, codebooks: Optional[np.ndarray] = None,
+                 codes: Optional[np.ndarray] = None, last_chunk_id: int = -1, trained_size: int = 0):
+        self.scale = scale  # int8: per-dimension step size
+        self.codebooks = codebooks  # pq: (subvectors, 256, dim // subvectors)
+        self.codes = codes if codes is not None else np.zeros((0, 0), dtype=np.uint8)
+        self.last_chunk_id = last_chunk_id
+        self.trained_size = trained_size
+
+    @property
+    def is_trained(self) -> bool:
+        return self.scale is not None or self.codebooks is not None
+
+    @property
+    def encoded_count(self) -> int:
+        return len(self.codes)
+
+
+class VectorQuantizer:
+    """
+    Compressed copy of a KB's `VectorMatrix` used for candidate generation
+
+    Two code formats are supported:
+    - "int8": scalar quantization, one signed byte per dimension with a per-dimension scale (4x smaller)
+    - "pq": product quantization, the vector split into `subvectors` pieces that are each replaced
+      by the index of their nearest of 256 k-means centroids (one byte per piece, ~32x smaller)
+
+    Codes are kept in row order next to the float matrix (`codes.<kind>`), memory-mapped, and
+    scored asymmetrically against the float query. Only the best `top_k * rerank_factor`
+    candidates are read back from the float matrix and rescored exactly, so the float rows
+    stay on disk and out of the page cache for every other chunk.
+
+    Syncs must be serialised by the caller (the KB's write lock); each publishes a new
+    `QuantizerState`, and a search works on the state current when it started.
+    """
+
+    kinds = ("int8", "pq")
+
+    def __init__(self, vectors_dir: Path, dim: int, kind: str):
+        if kind not in self.kinds:
+            raise ValueError(f"Unsupported vector quantization: {kind}. Available: {', '.join(self.kinds)}")
+
+        self.vectors_dir = vectors_dir
+        self.dim = dim
+        self.kind = kind
+        self.codes_path, self.state_path = self._paths(vectors_dir, kind)
+
+        # Tuning knobs
+        self.min_train_size = 256  # below this, exact float search is already cheap
+        self.max_train_sample = 20_000
+        self.kmeans_iterations = 10
+        self.retrain_growth_factor = 4.0  # retrain once the KB outgrows its codebooks
+        self.subvectors = self._default_subvectors(dim)
+
+        self._lock = threading.Lock()
+        self._state = QuantizerState()
+
+        self._load()
+
+    @property
+    def state(self) -> QuantizerState:
+        with self._lock:
+            return self._state
+
+    @property
+    def is_trained(self) -> bool:
+        return self.state.is_trained
+
+    @property
+    def encoded_count(self) -> int:
+        return self.state.encoded_count
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Memory-mapped (encoded_count, code_size) code matrix"""
+        return self.state.codes
+
+    @property
+    def code_size(self) -> int:
+        """Bytes per encoded vector"""
+        return self._code_size(self.state)
+
+    @property
+    def code_bytes(self) -> int:
+        state = self.state
+        return state.encoded_count * self._code_size(state)
+
+    @property
+    def codebook_bytes(self) -> int:
+        state = self.state
+        if state.scale is not None:
+            return state.scale.nbytes
+        if state.codebooks is not None:
+            return state.codebooks.nbytes
+        return 0
+
+    @classmethod
+    def derived_files(cls, vectors_dir: Path) -> List[Path]:
+        """Every code and state file any quantizer kind may have written"""
+        return [path for kind in cls.kinds for path in cls._paths(vectors_dir, kind)]
+
+    def sync(self, vector_matrix: Union[VectorMatrix, VectorSnapshot]) -> int:
+        """Bring the codes up to date with the vector matrix, returning how many rows were encoded"""
+        vector_matrix = vector_matrix.snapshot()
+        rows = len(vector_matrix)
+        state = self.state
+
+        # Codes only stay valid while the matrix keeps the encoded prefix (compaction renumbers rows)
+        if state.encoded_count and (
+            rows < state.encoded_count or int(vector_matrix.chunk_ids[state.encoded_count - 1]) != state.last_chunk_id
+        ):
+            state = QuantizerState()
+            self._publish(state)
+            self._remove_files()
+            self.subvectors = self._default_subvectors(self.dim)
+
+        if not state.is_trained or rows >= state.trained_size * self.retrain_growth_factor:
+            if rows < self.min_train_size:
+                return 0
+            trained = self._train(vector_matrix)
+            # Searches keep reading the old codes through their own mapping while the file is rewritten
+            self._remove_files()
+            self._publish(self._encode_rows(vector_matrix, trained))
+            self.save()
+            return rows
+
+        if rows == state.encoded_count:
+            return 0
+
+        self._publish(self._encode_rows(vector_matrix, state))
+        self.save()
+        return rows - state.encoded_count
+
+    def search(self, vector_matrix: Union[VectorMatrix, VectorSnapshot], query_vector: np.ndarray, top_k: int, rerank_factor: int = 4,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (chunk_ids, exact cosine similarities) of the top_k rows, best first
+
+        Candidates come from the codes; `rows` restricts the scan (e.g. to probed IVF lists)
+        and must index the same snapshot. Rows appended after the last sync have no codes
+        yet and are scored exactly.
+        """
+        vector_matrix = vector_matrix.snapshot()
+        state = self.state
+        if len(vector_matrix) == 0 or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query_vector, dtype=np.float32).reshape(self.dim)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        if rows is None:
+            rows = np.arange(len(vector_matrix), dtype=np.int64)
+        rows = rows[vector_matrix.live_mask[rows]]
+
+        coded = rows[rows < state.encoded_count]
+        uncoded = rows[rows >= state.encoded_count]
+
+        candidate_count = top_k * max(rerank_factor, 1)
+        if len(coded) > candidate_count:
+            approximate = self._score(state, query, coded)
+            coded = coded[np.argpartition(-approximate, candidate_count - 1)[:candidate_count]]
+
+        candidates = np.sort(np.concatenate([coded, uncoded]))
+        if len(candidates) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # Exact float rerank of the shortlist only
+        scores = np.asarray(vector_matrix.matrix[candidates]) @ query
+
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return vector_matrix.chunk_ids[candidates[top]], scores[top]
+
+    def save(self):
+        """Persist the codebooks and encoding state atomically (codes are appended in place)"""
+        state = self.state
+        if not state.is_trained:
+            return
+
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                codebook=state.scale if self.kind == "int8" else state.codebooks,
+                state=np.array([state.encoded_count, state.last_chunk_id, state.trained_size, self.dim], dtype=np.int64)
+            )
+        tmp_path.replace(self.state_path)
+
+    def _load(self):
+        if not self.state_path.exists():
+            return
+
+        with np.load(self.state_path) as data:
+            codebook = data["codebook"].astype(np.float32)
+            encoded_count, last_chunk_id, trained_size, dim = (int(v) for v in data["state"])
+
+        if dim != self.dim:
+            return
+        if self.kind == "pq":
+            self.subvectors = codebook.shape[0]
+
+        state = QuantizerState(scale=codebook, trained_size=trained_size) if self.kind == "int8" else \
+            QuantizerState(codebooks=codebook, trained_size=trained_size)
+
+        # Codes written after the last saved state (e.g. before a crash) are discarded
+        expected_bytes = encoded_count * self._code_size(state)
+        if not self.codes_path.exists() or self.codes_path.stat().st_size < expected_bytes:
+            return
+        if self.codes_path.stat().st_size > expected_bytes:
+            with open(self.codes_path, "r+b") as f:
+                f.truncate(expected_bytes)
+
+        self._publish(QuantizerState(
+            state.scale, state.codebooks, self._map_codes(state, encoded_count), last_chunk_id, trained_size
+        ))
+
+    def _publish(self, state: QuantizerState):
+        with self._lock:
+            self._state = state
+
+    def _remove_files(self):
+        # The state file goes first, so a crash part-way leaves an untrained quantizer, never mismatched codes
+        self.state_path.unlink(missing_ok=True)
+        self.codes_path.unlink(missing_ok=True)
+
+    def _code_size(self, state: QuantizerState) -> int:
+        if self.kind == "int8":
+            return self.dim
+        return state.codebooks.shape[0] if state.codebooks is not None else self.subvectors
+
+    def _map_codes(self, state: QuantizerState, count: int) -> np.ndarray:
+        dtype = np.int8 if self.kind == "int8" else np.uint8
+        if count == 0:
+            return np.zeros((0, self._code_size(state)), dtype=dtype)
+        return np.memmap(self.codes_path, dtype=dtype, mode="r", shape=(count, self._code_size(state)))
+
+    def _train(self, vector_matrix: VectorSnapshot) -> QuantizerState:
+        """Fit the int8 scales or the PQ codebooks on a sample of the matrix, returning an empty state"""
+        matrix = vector_matrix.matrix
+        rows = len(matrix)
+
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(rows, size=min(rows, self.max_train_sample), replace=False))
+        sample = np.asarray(matrix[sample_rows])
+
+        if self.kind == "int8":
+            # Symmetric per-dimension range; the rare outlier beyond it is clipped
+            scale = np.abs(sample).max(axis=0) / 127.0
+            scale[scale == 0] = 1.0 / 127.0
+            return QuantizerState(scale=scale.astype(np.float32), trained_size=rows)
+
+        sub_dim = self.dim // self.subvectors
+        centroid_count = min(256, len(sample))
+        codebooks = np.empty((self.subvectors, centroid_count, sub_dim), dtype=np.float32)
+        for m in range(self.subvectors):
+            codebooks[m] = self._kmeans(sample[:, m * sub_dim:(m + 1) * sub_dim], centroid_count, rng)
+        return QuantizerState(codebooks=codebooks, trained_size=rows)
+
+    def _kmeans(self, vectors: np.ndarray, centroid_count: int, rng: np.random.Generator) -> np.ndarray:
+        centroids = vectors[rng.choice(len(vectors), size=centroid_count, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignments = self._nearest(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=centroid_count)
+
+            # Reseed empty clusters from random sample points
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            if empty.any():
+                centroids[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+
+        return centroids
+
+    def _encode_rows(self, vector_matrix: VectorSnapshot, state: QuantizerState, batch_size: int = 16_384) -> QuantizerState:
+        """Append codes for the matrix rows `state` has not encoded yet, returning the extended state"""
+        matrix = vector_matrix.matrix
+        self.vectors_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(self.codes_path, "ab") as f:
+            for batch_start in range(state.encoded_count, len(matrix), batch_size):
+                f.write(self._encode(state, np.asarray(matrix[batch_start:batch_start + batch_size])).tobytes())
+
+        return QuantizerState(
+            state.scale, state.codebooks, self._map_codes(state, len(matrix)),
+            int(vector_matrix.chunk_ids[-1]) if len(matrix) else -1, state.trained_size
+        )
+
+    def _encode(self, state: QuantizerState, vectors: np.ndarray) -> np.ndarray:
+        if self.kind == "int8":
+            return np.clip(np.rint(vectors / state.scale), -127, 127).astype(np.int8)
+
+        subvectors = state.codebooks.shape[0]
+        sub_dim = self.dim // subvectors
+        codes = np.empty((len(vectors), subvectors), dtype=np.uint8)
+        for m in range(subvectors):
+            codes[:, m] = self._nearest(vectors[:, m * sub_dim:(m + 1) * sub_dim], state.codebooks[m])
+        return codes
+
+    def _score(self, state: QuantizerState, query: np.ndarray, rows: np.ndarray, batch_size: int = 16_384) -> np.ndarray:
+        """Approximate inner products of the query with the encoded rows"""
+        codes = state.codes
+        scores = np.empty(len(rows), dtype=np.float32)
+
+        if self.kind == "int8":
+            scaled_query = query * state.scale
+            for start in range(0, len(rows), batch_size):
+                batch = np.asarray(codes[rows[start:start + batch_size]], dtype=np.float32)
+                scores[start:start + batch_size] = batch @ scaled_query
+        else:
+            # One lookup table of query·centroid per subvector, then a gather-and-sum per code
+            subvectors = state.codebooks.shape[0]
+            sub_dim = self.dim // subvectors
+            lookup = np.einsum("mkd,md->mk", state.codebooks, query.reshape(subvectors, sub_dim))
+            subvector_index = np.arange(subvectors)
+            for start in range(0, len(rows), batch_size):
+                batch = np.asarray(codes[rows[start:start + batch_size]])
+                scores[start:start + batch_size] = lookup[subvector_index, batch].sum(axis=1)
+
+        return scores
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 4096) -> np.ndarray:
+        """Index of the closest centroid (squared Euclidean) for every vector"""
+        centroid_norms = (centroids ** 2).sum(axis=1)
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            batch = np.asarray(vectors[start:start + batch_size])
+            assignments[start:start + batch_size] = np.argmin(centroid_norms - 2 * batch @ centroids.T, axis=1)
+        return assignments
+
+    @staticmethod
+    def _default_subvectors(dim: int) -> int:
+        """Largest divisor of dim giving subvectors of at least 8 dimensions"""
+        return max(m for m in range(1, dim + 1) if dim % m == 0 and m <= max(1, dim // 8))
+
+    @staticmethod
+    def _paths(vectors_dir: Path, kind: str) -> Tuple[Path, Path]:
+        return vectors_dir / f"codes.{kind}", vectors_dir / f"quantizer_{kind}.npz"
@@ -0,0 +1,82 @@
+"""
+Query Cache - Versioned LRU cache of knowledge base retrieval results
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class QueryCache:
+    """
+    LRU cache for repeated RAG queries
+
+    Every key embeds the knowledge base's current content version, so bumping the version
+    when documents are added or removed makes all older entries for that KB unreachable
+    at once; they are evicted eagerly rather than waiting to age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, kb_key: str, query: str, *params: Hashable) -> Tuple:
+        """Build a cache key from the KB, the normalised query text and any result-shaping parameters"""
+        normalized_query = " ".join(query.lower().split())
+        return (kb_key, self._versions.get(kb_key, 0), normalized_query) + params
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a key (marking it most recently used), or None"""
+        kb_key = key[0]
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses[kb_key] = self._misses.get(kb_key, 0) + 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits[kb_key] = self._hits.get(kb_key, 0) + 1
+        return entry
+
+    def put(self, key: Tuple, entry: Dict[str, Any]):
+        """Store an entry, evicting the least recently used ones beyond max_entries"""
+        if self.max_entries <= 0 or key[1] != self._versions.get(key[0], 0):
+            # Caching is disabled, or the KB changed while this result was being computed
+            return
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def bump_version(self, kb_key: str):
+        """Invalidate every cached result for a KB whose content changed"""
+        self._versions[kb_key] = self._versions.get(kb_key, 0) + 1
+        self._evict(kb_key)
+
+    def forget(self, kb_key: str):
+        """Drop all state for a deleted KB"""
+        self.bump_version(kb_key)
+        self._hits.pop(kb_key, None)
+        self._misses.pop(kb_key, None)
+
+    def stats(self, kb_key: str) -> Dict[str, Any]:
+        """Entry count, hits, misses and hit rate for one KB"""
+        hits = self._hits.get(kb_key, 0)
+        misses = self._misses.get(kb_key, 0)
+        return {
+            "entries": sum(1 for key in self._entries if key[0] == kb_key),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "version": self._versions.get(kb_key, 0)
+        }
+
+    def _evict(self, kb_key: str):
+        for key in [key for key in self._entries if key[0] == kb_key]:
+            del self._entries[key]
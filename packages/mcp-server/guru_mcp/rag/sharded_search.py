@@ -0,0 +1,158 @@
+"""
+Sharded Search - Process-parallel exact top-k over a vector matrix that need not fit in RAM
+"""
+
+import heapq
+import itertools
+import mmap
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from .vector_store import VectorMatrix
+
+
+# Per-worker cache of sorted tombstone ids, keyed by file path and invalidated by size/mtime
+_tombstone_cache: Dict[str, Tuple[Tuple[int, int], np.ndarray]] = {}
+
+
+def _load_tombstones(deleted_path: str) -> np.ndarray:
+    try:
+        stat = os.stat(deleted_path)
+    except FileNotFoundError:
+        return np.zeros(0, dtype=np.int64)
+
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _tombstone_cache.get(deleted_path)
+    if cached is None or cached[0] != signature:
+        cached = (signature, np.unique(np.fromfile(deleted_path, dtype=np.int64)))
+        _tombstone_cache[deleted_path] = cached
+    return cached[1]
+
+
+def _scan_shard(matrix_path: str, ids_path: str, deleted_path: str, dim: int, start_row: int, end_row: int,
+                query: np.ndarray, top_k: int, block_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k of rows [start_row, end_row) of a matrix file, best first (runs in a worker process)
+
+    Only this shard is mapped, and only for the duration of the scan, so a worker's resident
+    set is bounded by the shard size whatever the size of the whole matrix.
+    """
+    row_bytes = dim * np.dtype(np.float32).itemsize
+    rows = end_row - start_row
+
+    with open(matrix_path, "rb") as matrix_file, open(ids_path, "rb") as ids_file:
+        # Appends and compactions change or swap both files; refuse an opened pair that does not line up
+        matrix_rows = os.fstat(matrix_file.fileno()).st_size // row_bytes
+        id_rows = os.fstat(ids_file.fileno()).st_size // np.dtype(np.int64).itemsize
+        if matrix_rows != id_rows or id_rows < end_row:
+            raise RuntimeError("Vector files changed during the search")
+
+        ids_file.seek(start_row * np.dtype(np.int64).itemsize)
+        chunk_ids = np.fromfile(ids_file, dtype=np.int64, count=rows)
+        tombstones = _load_tombstones(deleted_path)
+
+        shard = np.memmap(matrix_file, dtype=np.float32, mode="r", offset=start_row * row_bytes, shape=(rows, dim))
+        try:
+            if hasattr(shard, "_mmap") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                shard._mmap.madvise(mmap.MADV_SEQUENTIAL)
+
+            scores = np.empty(rows, dtype=np.float32)
+            for start in range(0, rows, block_rows):
+                scores[start:start + block_rows] = shard[start:start + block_rows] @ query
+        finally:
+            del shard
+
+    if len(tombstones):
+        positions = np.minimum(np.searchsorted(tombstones, chunk_ids), len(tombstones) - 1)
+        scores[tombstones[positions] == chunk_ids] = -np.inf
+
+    top_k = min(top_k, rows)
+    top = np.argpartition(-scores, top_k - 1)[:top_k] if top_k < rows else np.arange(rows)
+    top = top[np.isfinite(scores[top])]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return chunk_ids[top], scores[top]
+
+
+class ShardedSearcher:
+    """
+    Exact cosine top-k over a `VectorMatrix`, split into fixed-size row shards scanned in parallel
+
+    The matrix file is addressed as consecutive shards of `shard_rows` rows. Each shard is
+    memory-mapped on its own by a worker process, scored in `block_rows` blocks and reduced to
+    a partial top-k there; the parent only receives k rows per shard and merges the sorted
+    partials with a heap. Peak memory is about one shard per worker plus k results per shard,
+    independent of the matrix size, and shards spread across all worker processes, so scan
+    throughput grows with cores instead of being bound to one.
+
+    Shards are row ranges of the existing append-only files rather than separate files, so
+    appends, tombstones, compaction and snapshots work on the matrix exactly as before.
+    """
+
+    def __init__(self, shard_rows: int = 65_536, block_rows: int = 8_192, processes: Optional[int] = None):
+        self.shard_rows = shard_rows
+        self.block_rows = block_rows
+        self.processes = processes or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def should_shard(self, vector_matrix: VectorMatrix) -> bool:
+        """Worth the inter-process round trip: more than one shard and more than one process"""
+        return self.processes > 1 and len(vector_matrix) > self.shard_rows
+
+    def shards(self, rows: int) -> List[Tuple[int, int]]:
+        return [(start, min(start + self.shard_rows, rows)) for start in range(0, rows, self.shard_rows)]
+
+    def search(self, vector_matrix: VectorMatrix, query_vector: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (chunk_ids, cosine similarities) of the top_k live rows, best first
+
+        Rows appended after the call starts are not scanned, matching a single-process search
+        that mapped the matrix at that moment.
+        """
+        rows = len(vector_matrix)
+        if rows == 0 or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = VectorMatrix._normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, vector_matrix.dim))[0]
+        executor = self._get_executor()
+        futures = [
+            executor.submit(
+                _scan_shard, str(vector_matrix.matrix_path), str(vector_matrix.ids_path), str(vector_matrix.deleted_path),
+                vector_matrix.dim, start, end, query, top_k, self.block_rows
+            )
+            for start, end in self.shards(rows)
+        ]
+
+        partials = []
+        try:
+            for future in futures:
+                chunk_ids, scores = future.result()
+                partials.append(zip(scores.tolist(), chunk_ids.tolist()))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); the next search starts a fresh pool
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+        best = list(itertools.islice(heapq.merge(*partials, key=lambda entry: -entry[0]), top_k))
+        return (
+            np.array([chunk_id for _, chunk_id in best], dtype=np.int64),
+            np.array([score for score, _ in best], dtype=np.float32)
+        )
+
+    def close(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: the parent runs threads (DB executor, event loop) that a fork would copy mid-state
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
@@ -0,0 +1,159 @@
+"""
+KB Snapshot - Single-file export/import of a knowledge base's database and vector files
+"""
+
+import gzip
+import io
+import json
+import shutil
+import sqlite3
+import tarfile
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Dict, List, Tuple
+
+
+class KBSnapshot:
+    """
+    Uncompressed tar holding everything needed to bring up a knowledge base elsewhere
+
+    - `manifest.json`: KB config, schema version, content totals and member sizes
+    - `knowledge_base.db.gz`: an SQLite online-backup image of the database, gzip-compressed
+      (document and chunk text make up most of it and compress well)
+    - `files/...`: the raw vector matrix, tombstones, ANN index and quantized codes, stored
+      byte-for-byte so a restore only has to copy them back
+
+    Restoring is file-level: the database image is decompressed in one stream and the vector
+    files are written back as-is, so no row is re-inserted and nothing is re-embedded.
+    """
+
+    format_name = "guru-kb-snapshot"
+    format_version = 1
+    manifest_member = "manifest.json"
+    database_member = "knowledge_base.db.gz"
+    files_prefix = "files"
+
+    compress_level = 3  # gzip level for the database image; favours speed over ratio
+    copy_buffer_size = 1024 * 1024
+
+    @staticmethod
+    def backup_database(conn: sqlite3.Connection, target_path: Path):
+        """Copy a live database to target_path with the SQLite online backup API"""
+        target = sqlite3.connect(str(target_path))
+        try:
+            conn.backup(target)
+        finally:
+            target.close()
+
+    @staticmethod
+    def open_files(kb_path: Path, relative_paths: List[str]) -> List[Tuple[str, BinaryIO, int]]:
+        """Open the KB files that exist, pinning their current size
+
+        Vector files only ever grow in place or are replaced by rename, so an open handle read
+        up to the pinned size stays consistent with a database backup taken at the same moment.
+        """
+        pinned = []
+        for relative_path in relative_paths:
+            path = kb_path / relative_path
+            if path.exists():
+                handle = open(path, "rb")
+                pinned.append((relative_path, handle, path.stat().st_size))
+        return pinned
+
+    @classmethod
+    def write(cls, snapshot_path: Path, manifest: Dict[str, Any], database_path: Path,
+              files: List[Tuple[str, BinaryIO, int]]) -> int:
+        """Write the snapshot atomically, returning its size in bytes; closes the file handles"""
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+        compressed_path = database_path.with_name(database_path.name + ".gz")
+
+        try:
+            with open(database_path, "rb") as source, gzip.open(compressed_path, "wb", compresslevel=cls.compress_level) as target:
+                shutil.copyfileobj(source, target, cls.copy_buffer_size)
+
+            manifest = dict(
+                manifest,
+                format=cls.format_name,
+                format_version=cls.format_version,
+                database_bytes=database_path.stat().st_size,
+                files={relative_path: size for relative_path, _, size in files}
+            )
+            manifest_bytes = json.dumps(manifest, indent=2).encode()
+
+            with tarfile.open(tmp_path, "w") as tar:
+                cls._add_member(tar, cls.manifest_member, io.BytesIO(manifest_bytes), len(manifest_bytes))
+                with open(compressed_path, "rb") as database:
+                    cls._add_member(tar, cls.database_member, database, compressed_path.stat().st_size)
+                for relative_path, handle, size in files:
+                    handle.seek(0)
+                    cls._add_member(tar, f"{cls.files_prefix}/{relative_path}", handle, size)
+
+            tmp_path.replace(snapshot_path)
+        finally:
+            for _, handle, _ in files:
+                handle.close()
+            compressed_path.unlink(missing_ok=True)
+            tmp_path.unlink(missing_ok=True)
+
+        return snapshot_path.stat().st_size
+
+    @classmethod
+    def read_manifest(cls, snapshot_path: Path) -> Dict[str, Any]:
+        """Read and validate the manifest without touching the rest of the snapshot"""
+        try:
+            with tarfile.open(snapshot_path, "r") as tar:
+                member = tar.extractfile(cls.manifest_member)
+                manifest = json.load(member)
+        except (tarfile.TarError, KeyError, json.JSONDecodeError) as e:
+            raise ValueError(f"Not a knowledge base snapshot: {snapshot_path} ({e})")
+
+        if manifest.get("format") != cls.format_name:
+            raise ValueError(f"Not a knowledge base snapshot: {snapshot_path}")
+        if manifest.get("format_version", 0) > cls.format_version:
+            raise ValueError(
+                f"Snapshot format version {manifest['format_version']} is newer than this server supports ({cls.format_version})"
+            )
+        return manifest
+
+    @classmethod
+    def extract(cls, snapshot_path: Path, target_dir: Path) -> Dict[str, Any]:
+        """Restore the database and files into target_dir, returning the manifest"""
+        manifest = cls.read_manifest(snapshot_path)
+        expected_files = manifest.get("files", {})
+
+        with tarfile.open(snapshot_path, "r") as tar:
+            for member in tar:
+                if member.name == cls.manifest_member:
+                    continue
+
+                if member.name == cls.database_member:
+                    with tar.extractfile(member) as source, gzip.open(source, "rb") as database, \
+                            open(target_dir / "knowledge_base.db", "wb") as target:
+                        shutil.copyfileobj(database, target, cls.copy_buffer_size)
+                    continue
+
+                relative_path = PurePosixPath(member.name).relative_to(cls.files_prefix).as_posix()
+                if relative_path not in expected_files or not member.isfile():
+                    raise ValueError(f"Unexpected snapshot member: {member.name}")
+
+                path = target_dir / relative_path
+                if not path.resolve().is_relative_to(target_dir.resolve()):
+                    raise ValueError(f"Snapshot member escapes the knowledge base directory: {member.name}")
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with tar.extractfile(member) as source, open(path, "wb") as target:
+                    shutil.copyfileobj(source, target, cls.copy_buffer_size)
+                if path.stat().st_size != expected_files[relative_path]:
+                    raise ValueError(f"Truncated snapshot member: {member.name}")
+
+        database_path = target_dir / "knowledge_base.db"
+        if not database_path.exists() or database_path.stat().st_size != manifest.get("database_bytes"):
+            raise ValueError(f"Snapshot database image is missing or truncated: {snapshot_path}")
+
+        return manifest
+
+    @staticmethod
+    def _add_member(tar: tarfile.TarFile, name: str, fileobj: BinaryIO, size: int):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mode = 0o644
+        tar.addfile(info, fileobj)
@@ -0,0 +1,299 @@
+"""
+Vector Store - Contiguous memory-mapped embedding matrix for knowledge base retrieval
+"""
+
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+import numpy as np
+
+
+class VectorSnapshot:
+    """
+    Immutable view of a `VectorMatrix` at one moment: matrix rows, their chunk ids and live mask
+
+    All three arrays always describe the same file layout, so any sequence of lookups and
+    scans against one snapshot is consistent even while the matrix is appended to,
+    tombstoned or compacted underneath it. The memory map keeps a replaced file's data
+    alive until the snapshot is dropped.
+    """
+
+    def __init__(self, dim: int, matrix: np.ndarray, chunk_ids: np.ndarray, live_mask: np.ndarray):
+        self.dim = dim
+        self.matrix = matrix
+        self.chunk_ids = chunk_ids
+        self.live_mask = live_mask
+        self.live_count = int(live_mask.sum())
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @property
+    def dead_count(self) -> int:
+        return len(self) - self.live_count
+
+    def snapshot(self) -> "VectorSnapshot":
+        return self
+
+    def rows_for(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """Map chunk ids to matrix rows (rows are kept in ascending chunk id order)"""
+        return np.searchsorted(self.chunk_ids, np.asarray(chunk_ids, dtype=np.int64))
+
+    def live_rows(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """Sorted matrix rows of the given chunks, skipping chunks that are missing or removed"""
+        chunk_ids = np.unique(np.asarray(chunk_ids, dtype=np.int64))
+        if len(self) == 0 or len(chunk_ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        rows = np.minimum(self.rows_for(chunk_ids), len(self) - 1)
+        present = (self.chunk_ids[rows] == chunk_ids) & self.live_mask[rows]
+        return rows[present]
+
+    def similarities(self, chunk_ids: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query to each given chunk (0 for chunks missing from the matrix)"""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        similarities = np.zeros(len(chunk_ids), dtype=np.float32)
+        if len(self) == 0 or len(chunk_ids) == 0:
+            return similarities
+
+        rows = np.minimum(self.rows_for(chunk_ids), len(self) - 1)
+        present = (self.chunk_ids[rows] == chunk_ids) & self.live_mask[rows]
+
+        query = VectorMatrix._normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, self.dim))[0]
+        similarities[present] = self.matrix[rows[present]] @ query
+
+        return similarities
+
+    def search(self, query_vector: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (chunk_ids, cosine similarities) of the top_k rows, best first
+
+        `rows` (live rows of this snapshot, e.g. from `live_rows`) restricts the scan to a
+        pre-filtered subset.
+        """
+        matrix = self.matrix
+        if len(matrix) == 0 or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = VectorMatrix._normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, self.dim))[0]
+        if rows is not None:
+            row_ids = np.asarray(rows, dtype=np.int64)
+            scores = np.asarray(matrix[row_ids]) @ query
+        else:
+            row_ids = None
+            scores = matrix @ query
+            if self.dead_count:
+                scores[~self.live_mask] = -np.inf
+
+        top_k = min(top_k, self.live_count if row_ids is None else len(row_ids))
+        if top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if top_k < len(scores):
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        top_rows = top if row_ids is None else row_ids[top]
+        return self.chunk_ids[top_rows], scores[top]
+
+
+class VectorMatrix:
+    """
+    Float32 embedding matrix for one knowledge base, persisted in its `vectors/` directory
+
+    Row i of `embeddings.f32` holds the L2-normalised embedding of the chunk whose id is
+    stored at position i of `chunk_ids.i64`, so a query is scored against every chunk with
+    a single matrix-vector product. Rows are kept in ascending chunk id order.
+
+    Removed chunks are tombstoned in `deleted.i64` and masked out of every search, so a
+    document update does not rewrite the whole matrix; `compact()` drops dead rows once
+    enough of them accumulate.
+
+    Readers work on a `VectorSnapshot`, built and published under a lock that writers also
+    hold while they change the files, so a search never mixes rows, ids and tombstones from
+    different layouts. Writers themselves are serialised by the caller (the KB write lock).
+    """
+
+    def __init__(self, vectors_dir: Path, dim: int):
+        self.vectors_dir = vectors_dir
+        self.dim = dim
+        self.matrix_path = vectors_dir / "embeddings.f32"
+        self.ids_path = vectors_dir / "chunk_ids.i64"
+        self.deleted_path = vectors_dir / "deleted.i64"
+
+        # Current snapshot, rebuilt lazily after every write
+        self._lock = threading.Lock()
+        self._snapshot: Optional[VectorSnapshot] = None
+
+    def __len__(self) -> int:
+        if not self.ids_path.exists():
+            return 0
+        return self.ids_path.stat().st_size // np.dtype(np.int64).itemsize
+
+    @property
+    def live_count(self) -> int:
+        """Rows whose chunk has not been removed"""
+        return len(self) - self.dead_count
+
+    @property
+    def dead_count(self) -> int:
+        if not self.deleted_path.exists():
+            return 0
+        return self.deleted_path.stat().st_size // np.dtype(np.int64).itemsize
+
+    def is_consistent(self, expected_rows: int) -> bool:
+        """Check that the matrix and id files agree with each other and with the database"""
+        if not self.matrix_path.exists() or not self.ids_path.exists():
+            return expected_rows == 0
+
+        row_bytes = self.dim * np.dtype(np.float32).itemsize
+        matrix_rows, remainder = divmod(self.matrix_path.stat().st_size, row_bytes)
+
+        return remainder == 0 and matrix_rows == len(self) and self.live_count == expected_rows
+
+    def snapshot(self) -> VectorSnapshot:
+        """Consistent view of the current files; hold on to it for multi-step reads"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._load_snapshot()
+            return self._snapshot
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Memory-mapped (rows, dim) view of the stored embeddings"""
+        return self.snapshot().matrix
+
+    @property
+    def chunk_ids(self) -> np.ndarray:
+        """Chunk id for every matrix row"""
+        return self.snapshot().chunk_ids
+
+    @property
+    def live_mask(self) -> np.ndarray:
+        """False for every tombstoned row"""
+        return self.snapshot().live_mask
+
+    def rows_for(self, chunk_ids: np.ndarray) -> np.ndarray:
+        return self.snapshot().rows_for(chunk_ids)
+
+    def live_rows(self, chunk_ids: np.ndarray) -> np.ndarray:
+        return self.snapshot().live_rows(chunk_ids)
+
+    def similarities(self, chunk_ids: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+        return self.snapshot().similarities(chunk_ids, query_vector)
+
+    def append(self, chunk_ids: Iterable[int], vectors: np.ndarray):
+        """Append embeddings for newly stored chunks"""
+        ids = np.asarray(list(chunk_ids), dtype=np.int64)
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim))
+
+        if len(ids) == 0:
+            return
+
+        self.vectors_dir.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            with open(self.matrix_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.write(ids.tobytes())
+            self._snapshot = None
+
+    def rebuild(self, rows: Iterable[Tuple[int, np.ndarray]]):
+        """Rewrite the matrix from (chunk_id, vector) pairs, e.g. after a crash or legacy KB load"""
+        self.vectors_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_matrix = self.matrix_path.with_suffix(".f32.tmp")
+        tmp_ids = self.ids_path.with_suffix(".i64.tmp")
+
+        with open(tmp_matrix, "wb") as matrix_file, open(tmp_ids, "wb") as ids_file:
+            for chunk_id, vector in rows:
+                vector = self._normalize(np.asarray(vector, dtype=np.float32).reshape(1, self.dim))
+                matrix_file.write(vector.tobytes())
+                ids_file.write(np.int64(chunk_id).tobytes())
+
+        self._swap_in(tmp_matrix, tmp_ids)
+
+    def remove(self, chunk_ids: Iterable[int]) -> int:
+        """Tombstone the rows of removed chunks, returning how many rows were newly removed"""
+        ids = np.unique(np.asarray(list(chunk_ids), dtype=np.int64))
+        current = self.snapshot()
+        if len(ids) == 0 or len(current) == 0:
+            return 0
+
+        rows = np.minimum(current.rows_for(ids), len(current) - 1)
+        present = (current.chunk_ids[rows] == ids) & current.live_mask[rows]
+        if not present.any():
+            return 0
+
+        with self._lock:
+            with open(self.deleted_path, "ab") as f:
+                f.write(ids[present].tobytes())
+
+            # Same layout, fewer live rows: publish a new mask rather than re-reading the files
+            if self._snapshot is current:
+                live_mask = current.live_mask.copy()
+                live_mask[rows[present]] = False
+                self._snapshot = VectorSnapshot(self.dim, current.matrix, current.chunk_ids, live_mask)
+            else:
+                self._snapshot = None
+
+        return int(present.sum())
+
+    def compact(self, block_rows: int = 65_536):
+        """Rewrite the matrix without tombstoned rows"""
+        if self.dead_count == 0:
+            return
+
+        current = self.snapshot()
+        live, matrix, chunk_ids = current.live_mask, current.matrix, current.chunk_ids
+        tmp_matrix = self.matrix_path.with_suffix(".f32.tmp")
+        tmp_ids = self.ids_path.with_suffix(".i64.tmp")
+
+        with open(tmp_matrix, "wb") as matrix_file, open(tmp_ids, "wb") as ids_file:
+            for start in range(0, len(chunk_ids), block_rows):
+                keep = live[start:start + block_rows]
+                matrix_file.write(np.asarray(matrix[start:start + block_rows])[keep].tobytes())
+                ids_file.write(chunk_ids[start:start + block_rows][keep].tobytes())
+
+        self._swap_in(tmp_matrix, tmp_ids)
+
+    def search(self, query_vector: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (chunk_ids, cosine similarities) of the top_k live rows, best first
+
+        `rows` must come from the same snapshot; take one with `snapshot()` to combine calls.
+        """
+        return self.snapshot().search(query_vector, top_k, rows)
+
+    def _swap_in(self, tmp_matrix: Path, tmp_ids: Path):
+        # Renames are atomic one file at a time; the lock keeps readers from loading a half-swapped pair
+        with self._lock:
+            tmp_matrix.replace(self.matrix_path)
+            tmp_ids.replace(self.ids_path)
+            self.deleted_path.unlink(missing_ok=True)
+            self._snapshot = None
+
+    def _load_snapshot(self) -> VectorSnapshot:
+        if not self.ids_path.exists():
+            empty = np.zeros(0, dtype=np.int64)
+            return VectorSnapshot(self.dim, np.zeros((0, self.dim), dtype=np.float32), empty, np.ones(0, dtype=bool))
+
+        chunk_ids = np.fromfile(self.ids_path, dtype=np.int64)
+        rows = len(chunk_ids)
+        if rows == 0:
+            matrix = np.zeros((0, self.dim), dtype=np.float32)
+        else:
+            matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+        if self.dead_count == 0:
+            live_mask = np.ones(rows, dtype=bool)
+        else:
+            live_mask = ~np.isin(chunk_ids, np.fromfile(self.deleted_path, dtype=np.int64))
+
+        return VectorSnapshot(self.dim, matrix, chunk_ids, live_mask)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32, copy=False)
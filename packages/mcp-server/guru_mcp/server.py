@@ -5,6 +5,7 @@ This server provides MCP tools that bridge external AI models to Guru's cognitiv
 """
 
 import asyncio
+import inspect
 import json
 import sys
 from typing import Any, Dict, List, Optional, Sequence
@@ -57,6 +58,7 @@ class GuruMCPServer:
         self.manual_filesystem_tool = ManualFilesystemAnalysisTool(self.core_bridge, self.phi4_wingman)
         self.document_upload_tool = DocumentUploadTool(self.core_bridge, self.phi4_wingman)
         self.rag_tool = RAGKnowledgeBaseTool(self.core_bridge, self.phi4_wingman)
+        self.rag_tool.filesystem_tool = self.filesystem_tool  # add_path shares the filesystem allow-list
         self.synthesis_tool = SynthesisTool()
         self.active_knowledge_tool = ActiveKnowledgeTool()
         self.spec_management_tool = SpecManagementTool()
@@ -374,12 +376,12 @@ class GuruMCPServer:
                             },
                             "recursive": {
                                 "type": "boolean",
-                                "default": true,
+                                "default": True,
                                 "description": "Whether to analyze subdirectories recursively"
                             },
                             "include_hidden": {
                                 "type": "boolean", 
-                                "default": false,
+                                "default": False,
                                 "description": "Whether to include hidden files and directories"
                             }
                         },
@@ -445,7 +447,7 @@ class GuruMCPServer:
                                         "content": {"type": "string", "description": "Document content (text or base64 encoded)"},
                                         "mime_type": {"type": "string", "description": "MIME type of the document"},
                                         "encoding": {"type": "string", "default": "utf-8", "description": "Text encoding"},
-                                        "is_base64": {"type": "boolean", "default": false, "description": "Whether content is base64 encoded"},
+                                        "is_base64": {"type": "boolean", "default": False, "description": "Whether content is base64 encoded"},
                                         "category": {"type": "string", "description": "Document category (auto-detected if not provided)"},
                                         "metadata": {"type": "object", "description": "Additional document metadata"}
                                     },
@@ -470,7 +472,7 @@ class GuruMCPServer:
                             },
                             "preserve_files": {
                                 "type": "boolean",
-                                "default": false,
+                                "default": False,
                                 "description": "Whether to preserve temporary files after analysis"
                             },
                             "batch_name": {
@@ -489,13 +491,18 @@ class GuruMCPServer:
                         "properties": {
                             "operation": {
                                 "type": "string",
-                                "enum": ["create", "add_documents", "query", "list", "info", "delete", "update"],
+                                "enum": ["create", "add_documents", "add_path", "query", "list", "info", "delete", "update", "replace", "remove", "evaluate_index", "reembed", "export", "import"],
                                 "default": "query",
                                 "description": "Operation to perform on knowledge base"
                             },
                             "knowledge_base_name": {
                                 "type": "string",
-                                "description": "Name of the knowledge base to operate on"
+                                "description": "Name of the knowledge base to operate on (for query, may be a glob such as \"docs-*\" to search every matching knowledge base)"
+                            },
+                            "knowledge_base_names": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Further knowledge base names or globs to search together in one federated query (for query operation)"
                             },
                             "description": {
                                 "type": "string",
@@ -512,7 +519,39 @@ class GuruMCPServer:
                                         "metadata": {"type": "object"}
                                     }
                                 },
-                                "description": "Documents to add to the knowledge base (for add_documents operation)"
+                                "description": "Documents to add to the knowledge base (for add_documents operation), or to replace by filename (for replace operation)"
+                            },
+                            "filenames": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Filenames of the documents to drop (for remove operation)"
+                            },
+                            "path": {
+                                "type": "string",
+                                "description": "File or directory on the server to read documents from (for add_path operation; must be within the filesystem tool's allowed directories)"
+                            },
+                            "file_types": {
+                                "type": "array",
+                                "items": {
+                                    "type": "string",
+                                    "enum": ["code", "docs", "config", "data", "build"]
+                                },
+                                "default": ["code", "docs", "config"],
+                                "description": "Types of files to add (for add_path operation)"
+                            },
+                            "recursive": {
+                                "type": "boolean",
+                                "default": True,
+                                "description": "Whether to descend into subdirectories (for add_path operation)"
+                            },
+                            "include_hidden": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Whether to include hidden files and directories (for add_path operation)"
+                            },
+                            "max_files": {
+                                "type": "integer",
+                                "description": "Stop after this many files (for add_path operation)"
                             },
                             "query": {
                                 "type": "string",
@@ -525,7 +564,7 @@ class GuruMCPServer:
                             },
                             "include_cognitive_insights": {
                                 "type": "boolean",
-                                "default": true,
+                                "default": True,
                                 "description": "Whether to include Guru's cognitive insights in results"
                             },
                             "response_mode": {
@@ -534,6 +573,95 @@ class GuruMCPServer:
                                 "default": "comprehensive",
                                 "description": "Response detail level"
                             },
+                            "search_mode": {
+                                "type": "string",
+                                "enum": ["hybrid", "exact", "ann"],
+                                "default": "hybrid",
+                                "description": "Candidate generation: hybrid (BM25 keyword index, reranked by vectors), exact brute-force vectors, or the approximate (IVF) vector index"
+                            },
+                            "nprobe": {
+                                "type": "integer",
+                                "default": 8,
+                                "description": "Number of IVF clusters probed per ANN query (higher = better recall, slower)"
+                            },
+                            "graph_hops": {
+                                "type": "integer",
+                                "minimum": 0,
+                                "maximum": 2,
+                                "default": 0,
+                                "description": "Also return chunks linked to the top hits through shared concepts in the knowledge graph, up to this many hops away (0 = off)"
+                            },
+                            "category": {
+                                "anyOf": [
+                                    {"type": "string"},
+                                    {"type": "array", "items": {"type": "string"}}
+                                ],
+                                "description": "Only search documents in this category or any of these categories (for query operation), or the category given to every added file (for add_path operation; defaults to the file type)"
+                            },
+                            "filename_glob": {
+                                "type": "string",
+                                "description": "Only search documents whose filename matches this case-sensitive glob, e.g. \"docs/*.md\" (for query operation)"
+                            },
+                            "added_after": {
+                                "type": "string",
+                                "description": "Only search documents added at or after this ISO 8601 date/time, UTC if no offset is given (for query operation)"
+                            },
+                            "added_before": {
+                                "type": "string",
+                                "description": "Only search documents added before this ISO 8601 date/time, UTC if no offset is given (for query operation)"
+                            },
+                            "use_cache": {
+                                "type": "boolean",
+                                "default": True,
+                                "description": "Serve repeated queries from the versioned query cache (set false to force a fresh retrieval)"
+                            },
+                            "enable_ann_index": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Maintain an approximate nearest-neighbour index for this knowledge base (for create/update operations)"
+                            },
+                            "vector_quantization": {
+                                "type": "string",
+                                "enum": ["none", "int8", "pq"],
+                                "default": "none",
+                                "description": "Compressed vector codes for candidate generation, reranked in full precision: int8 scalar (4x smaller) or product quantization (~32x smaller) (for create/update operations)"
+                            },
+                            "embedding_dim": {
+                                "type": "integer",
+                                "default": 256,
+                                "description": "Dimensionality of the hashing embedder (for create/reembed operations; onnx models set their own)"
+                            },
+                            "embedder": {
+                                "type": "string",
+                                "enum": ["hashing", "onnx"],
+                                "default": "hashing",
+                                "description": "Embedding backend (for create/reembed): the built-in hashing embedder, or a local ONNX sentence-embedding model"
+                            },
+                            "embedding_model_path": {
+                                "type": "string",
+                                "description": "Local directory with model.onnx and tokenizer.json for the onnx embedder (defaults to GURU_EMBEDDING_MODEL_PATH)"
+                            },
+                            "vector_dtype": {
+                                "type": "string",
+                                "enum": ["float32", "float16"],
+                                "default": "float32",
+                                "description": "Precision of the stored chunk vectors (for create operation)"
+                            },
+                            "snapshot_path": {
+                                "type": "string",
+                                "description": "Snapshot file to write (for export; defaults to ~/.guru/snapshots/<name>-<timestamp>.gurukb) or to restore from (for import, optionally under a new knowledge_base_name)"
+                            },
+                            "sample_size": {
+                                "type": "integer",
+                                "default": 100,
+                                "description": "Number of sample queries for the evaluate_index operation"
+                            },
+                            "nprobe_values": {
+                                "type": "array",
+                                "items": {"type": "integer"},
+                                "default": [1, 2, 4, 8, 16, 32],
+                                "description": "nprobe settings to compare in the evaluate_index operation"
+                            },
                             "cognitive_systems": {
                                 "type": "array",
                                 "items": {"type": "string"},
@@ -542,17 +670,44 @@ class GuruMCPServer:
                             },
                             "enable_cognitive_analysis": {
                                 "type": "boolean",
-                                "default": true,
+                                "default": True,
                                 "description": "Enable cognitive analysis of documents"
                             },
+                            "enrichment_mode": {
+                                "type": "string",
+                                "enum": ["inline", "deferred"],
+                                "default": "inline",
+                                "description": "inline: analyse chunks before add_documents returns; deferred: index now and enrich in the background"
+                            },
+                            "cognitive_concurrency": {
+                                "type": "integer",
+                                "default": 16,
+                                "description": "Maximum cognitive analysis calls in flight while adding documents"
+                            },
                             "chunk_documents": {
                                 "type": "boolean",
-                                "default": true,
+                                "default": True,
                                 "description": "Whether to chunk documents for better retrieval"
                             },
+                            "chunk_size": {
+                                "type": "integer",
+                                "default": 1000,
+                                "description": "Chunk window size, in chunk_unit units (for add_documents)"
+                            },
+                            "chunk_overlap": {
+                                "type": "integer",
+                                "default": 200,
+                                "description": "Exact overlap between consecutive chunks, in chunk_unit units"
+                            },
+                            "chunk_unit": {
+                                "type": "string",
+                                "enum": ["chars", "tokens"],
+                                "default": "chars",
+                                "description": "Measure chunk_size/chunk_overlap in characters or approximate tokens (~4 characters)"
+                            },
                             "confirm": {
                                 "type": "boolean",
-                                "default": false,
+                                "default": False,
                                 "description": "Confirmation flag for destructive operations"
                             }
                         },
@@ -798,7 +953,7 @@ class GuruMCPServer:
                 elif name == "guru_upload_documents":
                     result = await self.document_upload_tool.execute(args)
                 elif name == "guru_rag_knowledge_base":
-                    result = await self.rag_tool.execute(args)
+                    result = await self.rag_tool.execute(args, progress=self._progress_reporter())
                 elif name == "guru_knowledge_synthesis":
                     result_dict = await self.synthesis_tool.execute(**args)
                     # Format the result as JSON for consistent output
@@ -831,6 +986,28 @@ class GuruMCPServer:
                     text=f"## Error\n\nFailed to execute {name}: {str(e)}"
                 )]
     
+    def _progress_reporter(self):
+        """Progress callback for the current tool call, or None when the client sent no progress token"""
+        try:
+            ctx = self.server.request_context
+        except LookupError:
+            return None
+        
+        progress_token = ctx.meta.progressToken if ctx.meta else None
+        if progress_token is None:
+            return None
+        
+        # Progress messages need a newer MCP SDK; older ones still get the progress counter
+        supports_message = "message" in inspect.signature(ctx.session.send_progress_notification).parameters
+        
+        async def report(progress: float, total: Optional[float] = None, message: Optional[str] = None):
+            if supports_message:
+                await ctx.session.send_progress_notification(progress_token, progress, total, message=message)
+            else:
+                await ctx.session.send_progress_notification(progress_token, progress, total)
+        
+        return report
+    
     async def _handle_open_silc_channel(self, args: Dict[str, Any]) -> str:
         """Handle opening a new SILC signal channel"""
         import sys
@@ -1184,6 +1361,9 @@ class GuruMCPServer:
         # Initialize Phi-4 Mini wingman
         await self.phi4_wingman.initialize()
         
+        # Resume deferred knowledge base enrichment left over from a previous run
+        await self.rag_tool.resume_enrichment_jobs()
+        
         logger.success("✅ All systems initialized and ready!")
     
     async def run(self):
@@ -3,16 +3,34 @@ RAG Knowledge Base Tool - Retrieval-Augmented Generation system like Claude Proj
 """
 
 import asyncio
+import codecs
+import fnmatch
+import heapq
 import json
 import os
+import re
+import shutil
 import sqlite3
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 from loguru import logger
 import hashlib
+import itertools
 import numpy as np
 from datetime import datetime, timezone
 
+from .filesystem_analysis import FilesystemAnalysisTool
+from ..rag import ConceptExtractor, DocumentChunker, Embedder, HashingEmbedder, IVFIndex, KBConnectionPool, KBSnapshot, ONNXEmbedder, QueryCache, ShardedSearcher, VectorMatrix, VectorQuantizer, VectorSnapshot
+
+# Per-call progress sink (progress, total, message); one per MCP request, so concurrent calls never share it
+ProgressReporter = Callable[[float, Optional[float], Optional[str]], Awaitable[None]]
+_progress_reporter: ContextVar[Optional[ProgressReporter]] = ContextVar("rag_progress_reporter", default=None)
+
 
 class RAGKnowledgeBaseTool:
     """
@@ -29,6 +47,10 @@ class RAGKnowledgeBaseTool:
         self.knowledge_base_dir = Path.home() / ".guru" / "knowledge_bases"
         self.knowledge_base_dir.mkdir(parents=True, exist_ok=True)
         
+        # Name → directory registry, rebuilt only when the storage directory's mtime changes
+        self._kb_registry: Dict[str, Path] = {}
+        self._kb_registry_mtime: Optional[int] = None
+        
         # Vector similarity threshold for retrieval
         self.similarity_threshold = 0.7
         
@@ -38,26 +60,117 @@ class RAGKnowledgeBaseTool:
         # Chunk size for document processing
         self.chunk_size = 1000  # characters
         self.chunk_overlap = 200  # character overlap between chunks
+        self.chunk_unit = "chars"  # or "tokens" (approximated as ~4 characters each)
+        
+        # Maximum cognitive bridge calls in flight while enriching chunks during ingest
+        self.cognitive_concurrency = 16
+        
+        # Deferred enrichment: persistent per-KB job tables drained by a background worker
+        self.enrichment_batch_size = 64
+        self.enrichment_max_attempts = 3
+        self._enrichment_queue: set = set()  # db paths with pending jobs
+        self._enrichment_task: Optional[asyncio.Task] = None
+        self._enrichment_stats: Dict[str, Dict[str, float]] = {}
+        
+        # On-disk schema version; older KBs are upgraded in place when first loaded
+        self.schema_version = 10
+        self._schema_checked: set = set()
+        
+        # Embedding dimensionality for new KBs (pre-versioned KBs used 64-dim hash() vectors)
+        self.embedding_dim = 256
+        self.legacy_embedding_dim = 64
+        self._embedders: Dict[str, Embedder] = {}
+        
+        # Embedding backend for new KBs: "hashing", or "onnx" with a local sentence-embedding model
+        self.embedder_backend = "hashing"
+        self.embedding_model_path = os.getenv("GURU_EMBEDDING_MODEL_PATH")
+        self.embedding_batch_size: Optional[int] = None  # None sizes ONNX batches to the CPU
+        self._onnx_embedders: Dict[str, ONNXEmbedder] = {}  # one loaded session per model directory
+        
+        # Chunk vectors are stored as packed BLOBs of this dtype (float32 or float16)
+        self.vector_dtype = "float32"
+        self._vector_dtypes: Dict[str, np.dtype] = {}
+        
+        # Per-KB memory-mapped vector matrices
+        self.candidate_multiplier = 5  # vector/keyword candidates per requested result
+        self.vector_compaction_ratio = 0.25  # compact once this share of matrix rows is tombstoned
+        self._vector_matrices: Dict[str, VectorMatrix] = {}
+        
+        # Optional approximate nearest-neighbour (IVF) index per KB
+        self.ann_nprobe = 8  # clusters probed per ANN query
+        self._ann_indexes: Dict[str, IVFIndex] = {}
+        
+        # Optional int8 / product-quantized codes per KB for memory-light candidate generation
+        self.quantization_rerank_factor = 4  # code-scored candidates per result rescored in float
+        self.quantization_recall_sample = 32  # sampled queries behind the recall figure in `info`
+        self._vector_quantizers: Dict[str, VectorQuantizer] = {}
+        
+        # Full exact scans of matrices larger than one shard run on a process pool, one shard per task
+        self.vector_shard_rows = 65_536  # rows per memory-mapped shard (64 MiB at 256 float32 dimensions)
+        self.vector_search_processes = os.cpu_count() or 1
+        self._sharded_searcher: Optional[ShardedSearcher] = None
+        self._sharded_searcher_lock = threading.Lock()
+        
+        # Long-lived SQLite connections per KB; all database work runs on this executor
+        self.db_max_readers = 4
+        self.db_mmap_size = 256 * 1024 * 1024  # bytes
+        self.db_cache_size_kb = 64 * 1024
+        self._db_executor = ThreadPoolExecutor(thread_name_prefix="guru-rag-db")
+        self._connection_pools: Dict[str, KBConnectionPool] = {}
+        
+        # Concept graph built at ingest (chunk → concept mentions, concept co-occurrences) for graph-expanded queries
+        self.concept_extractor = ConceptExtractor()
+        self.graph_cooccurrence_concepts = 5  # strongest concepts per chunk linked pairwise (fixed once a KB has data)
+        self.graph_fanout = 16  # neighbours followed per node while expanding
+        self.graph_hop_decay = 0.5  # score multiplier per hop away from a direct hit
+        self.max_graph_hops = 2
+        
+        # Server-side ingestion of files on disk (add_path), under the filesystem tool's allow-list
+        self.filesystem_tool = FilesystemAnalysisTool(core_bridge, phi4_wingman)
+        self.path_batch_bytes = 16 * 1024 * 1024  # file text held in memory per ingest batch
+        self.path_batch_files = 256
+        self.stream_file_bytes = 4 * 1024 * 1024  # larger files are chunked from disk instead of read whole
+        self.stream_chunk_batch = 2048  # chunks embedded and written per transaction while streaming a file
+        
+        # Single-file KB snapshots (export/import); default export location
+        self.snapshot_dir = self.knowledge_base_dir.parent / "snapshots"
+        
+        # LRU cache of retrieval results (and generated answers), invalidated by KB content version
+        self.query_cache_size = 256  # entries across all KBs
+        self.cache_rag_responses = True
+        self.query_cache = QueryCache(self.query_cache_size)
         
         # Knowledge base operations
         self.operations = {
             "create": self._create_knowledge_base,
             "add_documents": self._add_documents_to_kb,
+            "add_path": self._add_path_to_kb,
             "query": self._query_knowledge_base,
             "list": self._list_knowledge_bases,
             "info": self._get_knowledge_base_info,
             "delete": self._delete_knowledge_base,
-            "update": self._update_knowledge_base
+            "update": self._update_knowledge_base,
+            "replace": self._replace_documents_in_kb,
+            "remove": self._remove_documents_from_kb,
+            "evaluate_index": self._evaluate_ann_index,
+            "reembed": self._reembed_knowledge_base,
+            "export": self._export_knowledge_base,
+            "import": self._import_knowledge_base
         }
         
-    async def execute(self, args: Dict[str, Any]) -> str:
-        """Execute RAG knowledge base operation"""
+    async def execute(self, args: Dict[str, Any], progress: Optional[ProgressReporter] = None) -> str:
+        """Execute RAG knowledge base operation
+        
+        `progress`, when given, receives partial results ahead of the final reply (queries
+        report their retrieved sources and scores before the answer is generated).
+        """
         operation = args.get("operation", "query")
         kb_name = args.get("knowledge_base_name", "")
         
         if operation not in self.operations:
             return f"## Error\n\nUnknown operation: {operation}. Available: {', '.join(self.operations.keys())}"
         
+        progress_token = _progress_reporter.set(progress)
         try:
             logger.info(f"🧠 Executing RAG operation: {operation} on KB: {kb_name}")
             
@@ -69,12 +182,48 @@ class RAGKnowledgeBaseTool:
         except Exception as e:
             logger.error(f"RAG operation failed: {e}")
             return f"## Error\n\nRAG operation failed: {str(e)}"
+        finally:
+            _progress_reporter.reset(progress_token)
+    
+    async def _report_progress(self, progress: float, total: Optional[float], message: Optional[str] = None):
+        """Send a progress update to the current caller, if it asked for them; never fails the operation"""
+        reporter = _progress_reporter.get()
+        if reporter is None:
+            return
+        try:
+            await reporter(progress, total, message)
+        except Exception as e:
+            logger.warning(f"RAG progress notification failed: {e}")
+    
+    async def _report_retrieved_sources(self, kb_label: str, relevant_chunks: List[Dict[str, Any]]):
+        """Stream the retrieved sources and scores before the (slower) answer generation"""
+        if _progress_reporter.get() is None:
+            return
+        
+        lines = [f"Retrieved {len(relevant_chunks)} chunks from {kb_label}; generating answer"]
+        for i, chunk in enumerate(relevant_chunks, 1):
+            via = f", graph via {chunk['graph_concept']}" if "graph_hop" in chunk else ""
+            lines.append(
+                f"{i}. {self._chunk_source(chunk)} ({chunk['category']}) - Relevance: {chunk['score']:.2f} "
+                f"(vector {chunk['vector_similarity']:.3f}, BM25 {chunk['keyword_score']:.3f}{via})"
+            )
+        await self._report_progress(1, 2, "\n".join(lines))
+    
+    @staticmethod
+    def _chunk_source(chunk: Dict[str, Any]) -> str:
+        return f"{chunk['knowledge_base']}/{chunk['filename']}" if "knowledge_base" in chunk else chunk['filename']
     
     async def _create_knowledge_base(self, args: Dict[str, Any]) -> str:
         """Create a new knowledge base"""
         kb_name = args.get("knowledge_base_name", "")
         description = args.get("description", "")
         cognitive_systems = args.get("cognitive_systems", ["harmonic_analysis", "quantum_synthesis"])
+        enable_ann_index = args.get("enable_ann_index", False)
+        vector_quantization = args.get("vector_quantization", "none")
+        embedding_dim = args.get("embedding_dim", self.embedding_dim)
+        vector_dtype = args.get("vector_dtype", self.vector_dtype)
+        embedder_backend = args.get("embedder", self.embedder_backend)
+        embedding_model_path = args.get("embedding_model_path", self.embedding_model_path)
         
         if not kb_name:
             return "## Error\n\nKnowledge base name is required"
@@ -86,9 +235,21 @@ class RAGKnowledgeBaseTool:
         
         kb_path = self.knowledge_base_dir / safe_kb_name
         
-        if kb_path.exists():
+        self._refresh_kb_registry()
+        if kb_path.exists() or kb_name in self._kb_registry:
             return f"## Error\n\nKnowledge base '{kb_name}' already exists"
         
+        if vector_dtype not in ("float32", "float16"):
+            return f"## Error\n\nUnsupported vector_dtype: {vector_dtype}. Available: float32, float16"
+        
+        if vector_quantization not in ("none",) + VectorQuantizer.kinds:
+            return f"## Error\n\nUnsupported vector_quantization: {vector_quantization}. Available: none, {', '.join(VectorQuantizer.kinds)}"
+        
+        try:
+            embedder = await self._load_embedder(embedder_backend, embedding_dim, embedding_model_path)
+        except (ValueError, RuntimeError) as e:
+            return f"## Error\n\n{e}"
+        
         # Create knowledge base directory structure
         kb_path.mkdir(parents=True)
         (kb_path / "documents").mkdir()
@@ -97,7 +258,8 @@ class RAGKnowledgeBaseTool:
         
         # Initialize SQLite database for metadata and retrieval
         db_path = kb_path / "knowledge_base.db"
-        await self._initialize_kb_database(db_path, kb_name, description, cognitive_systems)
+        await self._initialize_kb_database(db_path, kb_name, description, cognitive_systems, embedder, embedding_model_path, vector_dtype)
+        self._embedders[str(kb_path)] = embedder
         
         # Create configuration file
         config = {
@@ -106,14 +268,15 @@ class RAGKnowledgeBaseTool:
             "description": description,
             "created_at": datetime.now(timezone.utc).isoformat(),
             "cognitive_systems": cognitive_systems,
-            "document_count": 0,
-            "chunk_count": 0,
+            "ann_index": enable_ann_index,
+            "vector_quantization": vector_quantization,
             "last_updated": datetime.now(timezone.utc).isoformat(),
             "version": "1.0"
         }
         
-        with open(kb_path / "config.json", "w") as f:
-            json.dump(config, f, indent=2)
+        self._save_knowledge_base_config(kb_path, config)
+        
+        self._register_knowledge_base(config, kb_path)
         
         logger.info(f"✅ Created knowledge base: {kb_name}")
         
@@ -123,6 +286,9 @@ class RAGKnowledgeBaseTool:
 **Description:** {description or 'No description provided'}
 **Location:** `{kb_path}`
 **Cognitive Systems:** {', '.join(cognitive_systems)}
+**ANN Index:** {'enabled' if enable_ann_index else 'disabled'}
+**Vector Quantization:** {vector_quantization}
+**Embedder:** {embedder.version} ({embedder.dim} dimensions, stored as {vector_dtype})
 
 ### Next Steps:
 1. Use `add_documents` operation to add content
@@ -131,10 +297,16 @@ class RAGKnowledgeBaseTool:
 
 *Your knowledge base is ready to receive documents and answer questions!*"""
     
-    async def _initialize_kb_database(self, db_path: Path, kb_name: str, description: str, cognitive_systems: List[str]):
+    async def _initialize_kb_database(self, db_path: Path, kb_name: str, description: str, cognitive_systems: List[str], embedder: Embedder, embedding_model_path: Optional[str], vector_dtype: str):
         """Initialize SQLite database for knowledge base"""
         
-        conn = sqlite3.connect(str(db_path))
+        await self._get_connection_pool(db_path).write(
+            self._create_kb_tables, kb_name, description, cognitive_systems, embedder, embedding_model_path, vector_dtype
+        )
+    
+    def _create_kb_tables(self, conn: sqlite3.Connection, kb_name: str, description: str, cognitive_systems: List[str], embedder: Embedder, embedding_model_path: Optional[str], vector_dtype: str):
+        """Create the KB tables and metadata (runs inside the writer's transaction)"""
+        
         cursor = conn.cursor()
         
         # Metadata table
@@ -160,21 +332,8 @@ class RAGKnowledgeBaseTool:
             )
         """)
         
-        # Chunks table for retrieval
-        cursor.execute("""
-            CREATE TABLE chunks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                document_id INTEGER,
-                chunk_index INTEGER,
-                content TEXT NOT NULL,
-                content_hash TEXT UNIQUE NOT NULL,
-                start_position INTEGER,
-                end_position INTEGER,
-                vector_embedding TEXT,
-                created_at TEXT,
-                FOREIGN KEY (document_id) REFERENCES documents (id)
-            )
-        """)
+        # Content-addressed chunks for retrieval, referenced by documents through document_chunks
+        self._create_chunk_store(cursor)
         
         # Cognitive analysis results
         cursor.execute("""
@@ -220,24 +379,483 @@ class RAGKnowledgeBaseTool:
         """)
         
         # Indexes for performance
-        cursor.execute("CREATE INDEX idx_chunks_document_id ON chunks (document_id)")
-        cursor.execute("CREATE INDEX idx_chunks_content_hash ON chunks (content_hash)")
         cursor.execute("CREATE INDEX idx_cognitive_analysis_document_id ON cognitive_analysis (document_id)")
         cursor.execute("CREATE INDEX idx_knowledge_nodes_node_id ON knowledge_nodes (node_id)")
         
+        # Full-text keyword index over chunk content
+        self._create_keyword_index(cursor)
+        
+        # Deferred cognitive enrichment jobs
+        self._create_enrichment_job_table(cursor)
+        
+        # Lookups used by per-document replace/remove
+        self._create_document_update_indexes(cursor)
+        
+        # Vectors from expensive embedders, kept by chunk hash across removals and re-embeds
+        self._create_embedding_cache_table(cursor)
+        
+        # Lookups used by query-time metadata filters
+        self._create_document_filter_indexes(cursor)
+        
+        # Counters maintained by triggers in the same transaction as every write
+        self._create_stats_table(cursor)
+        
+        # Adjacency indexes over the knowledge graph edges (and their kb_stats counters)
+        self._create_knowledge_graph_indexes(cursor)
+        
         # Insert metadata
         metadata_entries = [
             ("kb_name", kb_name),
             ("description", description),
             ("cognitive_systems", json.dumps(cognitive_systems)),
             ("created_at", datetime.now(timezone.utc).isoformat()),
-            ("version", "1.0")
+            ("version", "1.0"),
+            ("schema_version", str(self.schema_version)),
+            ("embedder", embedder.version),
+            ("embedding_dim", str(embedder.dim)),
+            ("embedder_backend", self._embedder_backend(embedder)),
+            ("embedding_model_path", embedding_model_path if isinstance(embedder, ONNXEmbedder) else ""),
+            ("vector_format", vector_dtype)
         ]
         
         cursor.executemany("INSERT INTO metadata (key, value) VALUES (?, ?)", metadata_entries)
+    
+    def _create_chunk_store(self, cursor, table: str = "chunks"):
+        """Create the content-addressed chunk table and the document → chunk mapping
+        
+        Each distinct chunk text is stored, embedded and analysed once. ref_count is the number
+        of document_chunks rows pointing at a chunk; a chunk is deleted when it drops to zero.
+        """
+        
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content TEXT NOT NULL,
+                content_hash TEXT UNIQUE NOT NULL,
+                vector_embedding BLOB,
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE document_chunks (
+                document_id INTEGER NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                chunk_id INTEGER NOT NULL,
+                start_position INTEGER,
+                end_position INTEGER,
+                PRIMARY KEY (document_id, chunk_index),
+                FOREIGN KEY (document_id) REFERENCES documents (id),
+                FOREIGN KEY (chunk_id) REFERENCES chunks (id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX idx_document_chunks_chunk_id ON document_chunks (chunk_id, document_id)")
+    
+    def _create_keyword_index(self, cursor):
+        """Create the FTS5 index over chunk content, kept in sync by triggers on insert/update/delete"""
+        
+        cursor.execute("""
+            CREATE VIRTUAL TABLE chunks_fts USING fts5(
+                content,
+                content='chunks',
+                content_rowid='id'
+            )
+        """)
+        
+        self._create_keyword_triggers(cursor)
+    
+    def _create_keyword_triggers(self, cursor):
+        """Create the triggers that mirror chunk inserts, updates and deletes into chunks_fts"""
+        
+        cursor.execute("""
+            CREATE TRIGGER chunks_fts_insert AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts (rowid, content) VALUES (new.id, new.content);
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER chunks_fts_delete AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts (chunks_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER chunks_fts_update AFTER UPDATE OF content ON chunks BEGIN
+                INSERT INTO chunks_fts (chunks_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                INSERT INTO chunks_fts (rowid, content) VALUES (new.id, new.content);
+            END
+        """)
+    
+    def _create_enrichment_job_table(self, cursor):
+        """Create the persistent queue of chunks awaiting deferred cognitive analysis"""
+        
+        cursor.execute("""
+            CREATE TABLE enrichment_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_id INTEGER,
+                chunk_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                FOREIGN KEY (chunk_id) REFERENCES chunks (id)
+            )
+        """)
+        cursor.execute("CREATE INDEX idx_enrichment_jobs_status ON enrichment_jobs (status, id)")
+    
+    def _create_document_update_indexes(self, cursor):
+        """Index the columns that per-document replace/remove look rows up by"""
+        
+        cursor.execute("CREATE INDEX idx_documents_filename ON documents (filename)")
+        cursor.execute("CREATE INDEX idx_cognitive_analysis_chunk_id ON cognitive_analysis (chunk_id)")
+        cursor.execute("CREATE INDEX idx_enrichment_jobs_chunk_id ON enrichment_jobs (chunk_id)")
+    
+    def _create_document_filter_indexes(self, cursor):
+        """Index the document columns that query filters select on (filename is already indexed)"""
+        
+        cursor.execute("CREATE INDEX idx_documents_category ON documents (category, added_at)")
+        cursor.execute("CREATE INDEX idx_documents_added_at ON documents (added_at)")
+    
+    def _create_stats_table(self, cursor):
+        """Create the kb_stats counters and the triggers that keep them exact
+        
+        Every insert, delete and counted-column update on documents, chunks, cognitive_analysis,
+        enrichment_jobs and embedding_cache adjusts a (scope, key) counter inside the writing
+        transaction, so `info` and `list` read a handful of rows instead of aggregating tables.
+        """
+        
+        cursor.execute("""
+            CREATE TABLE kb_stats (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (scope, key)
+            ) WITHOUT ROWID
+        """)
+        
+        add, subtract = self._stats_increment_sql, self._stats_decrement_sql
+        
+        def document_row(row: str, change) -> str:
+            return (
+                change("totals", "'documents'", "1")
+                + change("totals", "'size_bytes'", f"COALESCE({row}.size_bytes, 0)")
+                + change("totals", "'word_count'", f"COALESCE({row}.word_count, 0)")
+                + change("category", f"COALESCE({row}.category, 'uncategorized')", "1")
+            )
+        
+        triggers = {
+            "documents_stats_insert": ("AFTER INSERT ON documents", document_row("new", add)),
+            "documents_stats_delete": ("AFTER DELETE ON documents", document_row("old", subtract)),
+            "documents_stats_update": (
+                "AFTER UPDATE OF category, size_bytes, word_count ON documents",
+                document_row("old", subtract) + document_row("new", add)
+            ),
+            "chunks_stats_insert": (
+                "AFTER INSERT ON chunks",
+                add("totals", "'chunks'", "1") + add("totals", "'chunk_references'", "new.ref_count")
+            ),
+            "chunks_stats_delete": (
+                "AFTER DELETE ON chunks",
+                subtract("totals", "'chunks'", "1") + subtract("totals", "'chunk_references'", "old.ref_count")
+            ),
+            "chunks_stats_update": (
+                "AFTER UPDATE OF ref_count ON chunks",
+                add("totals", "'chunk_references'", "new.ref_count - old.ref_count")
+            ),
+            "cognitive_analysis_stats_insert": ("AFTER INSERT ON cognitive_analysis", add("cognitive", "new.system_name", "1")),
+            "cognitive_analysis_stats_delete": ("AFTER DELETE ON cognitive_analysis", subtract("cognitive", "old.system_name", "1")),
+            "enrichment_jobs_stats_insert": ("AFTER INSERT ON enrichment_jobs", add("jobs", "new.status", "1")),
+            "enrichment_jobs_stats_delete": ("AFTER DELETE ON enrichment_jobs", subtract("jobs", "old.status", "1")),
+            "enrichment_jobs_stats_update": (
+                "AFTER UPDATE OF status ON enrichment_jobs",
+                subtract("jobs", "old.status", "1") + add("jobs", "new.status", "1")
+            ),
+            "embedding_cache_stats_insert": ("AFTER INSERT ON embedding_cache", add("embedding_cache", "new.embedder", "1")),
+            "embedding_cache_stats_delete": ("AFTER DELETE ON embedding_cache", subtract("embedding_cache", "old.embedder", "1"))
+        }
+        
+        self._create_stats_triggers(cursor, triggers)
+    
+    @staticmethod
+    def _stats_increment_sql(scope: str, key: str, delta: str) -> str:
+        return f"""
+                INSERT INTO kb_stats (scope, key, value) VALUES ('{scope}', {key}, {delta})
+                ON CONFLICT (scope, key) DO UPDATE SET value = value + excluded.value;"""
+    
+    @staticmethod
+    def _stats_decrement_sql(scope: str, key: str, delta: str) -> str:
+        # Keyed counters (categories, systems, statuses) disappear when they reach zero
+        cleanup = "" if scope == "totals" else f"""
+                DELETE FROM kb_stats WHERE scope = '{scope}' AND key = {key} AND value = 0;"""
+        return f"""
+                UPDATE kb_stats SET value = value - {delta} WHERE scope = '{scope}' AND key = {key};{cleanup}"""
+    
+    @staticmethod
+    def _create_stats_triggers(cursor, triggers: Dict[str, Tuple[str, str]]):
+        for name, (event, body) in triggers.items():
+            cursor.execute(f"CREATE TRIGGER {name} {event} BEGIN {body}\n            END")
+    
+    def _create_knowledge_graph_indexes(self, cursor):
+        """Index knowledge graph edges in both directions and count nodes and edges in kb_stats
+        
+        A node's outgoing edges of one type are a range scan of the unique (from, type, to)
+        index, which is also the upsert target for co-occurrence counts; incoming edges are a
+        range scan of (to, type, strength), already ordered for "strongest first" fan-out.
+        """
+        
+        cursor.execute("""
+            CREATE UNIQUE INDEX idx_knowledge_relationships_from
+            ON knowledge_relationships (from_node_id, relationship_type, to_node_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX idx_knowledge_relationships_to
+            ON knowledge_relationships (to_node_id, relationship_type, strength)
+        """)
+        
+        add, subtract = self._stats_increment_sql, self._stats_decrement_sql
+        self._create_stats_triggers(cursor, {
+            "knowledge_nodes_stats_insert": ("AFTER INSERT ON knowledge_nodes", add("graph_nodes", "new.node_type", "1")),
+            "knowledge_nodes_stats_delete": ("AFTER DELETE ON knowledge_nodes", subtract("graph_nodes", "old.node_type", "1")),
+            "knowledge_relationships_stats_insert": (
+                "AFTER INSERT ON knowledge_relationships", add("graph_edges", "new.relationship_type", "1")
+            ),
+            "knowledge_relationships_stats_delete": (
+                "AFTER DELETE ON knowledge_relationships", subtract("graph_edges", "old.relationship_type", "1")
+            )
+        })
+    
+    def _rebuild_kb_stats(self, cursor):
+        """Recompute every kb_stats counter from the tables (schema upgrades and imports)"""
+        
+        cursor.execute("DELETE FROM kb_stats")
+        cursor.execute("""
+            INSERT INTO kb_stats (scope, key, value)
+            SELECT 'totals', 'documents', COUNT(*) FROM documents
+            UNION ALL SELECT 'totals', 'size_bytes', COALESCE(SUM(size_bytes), 0) FROM documents
+            UNION ALL SELECT 'totals', 'word_count', COALESCE(SUM(word_count), 0) FROM documents
+            UNION ALL SELECT 'totals', 'chunks', COUNT(*) FROM chunks
+            UNION ALL SELECT 'totals', 'chunk_references', COALESCE(SUM(ref_count), 0) FROM chunks
+            UNION ALL SELECT 'category', COALESCE(category, 'uncategorized'), COUNT(*) FROM documents GROUP BY 2
+            UNION ALL SELECT 'cognitive', system_name, COUNT(*) FROM cognitive_analysis GROUP BY system_name
+            UNION ALL SELECT 'jobs', status, COUNT(*) FROM enrichment_jobs GROUP BY status
+            UNION ALL SELECT 'embedding_cache', embedder, COUNT(*) FROM embedding_cache GROUP BY embedder
+            UNION ALL SELECT 'graph_nodes', node_type, COUNT(*) FROM knowledge_nodes GROUP BY node_type
+            UNION ALL SELECT 'graph_edges', relationship_type, COUNT(*) FROM knowledge_relationships GROUP BY relationship_type
+        """)
+    
+    async def _read_kb_stats(self, db_path: Path) -> Dict[str, Dict[str, int]]:
+        """Read the KB's maintained counters as {scope: {key: value}}; totals are always present"""
+        
+        def read_stats(conn):
+            return conn.execute("SELECT scope, key, value FROM kb_stats").fetchall()
+        
+        stats: Dict[str, Dict[str, int]] = {
+            "totals": dict.fromkeys(["documents", "size_bytes", "word_count", "chunks", "chunk_references"], 0),
+            "category": {},
+            "cognitive": {},
+            "jobs": {},
+            "embedding_cache": {},
+            "graph_nodes": {},
+            "graph_edges": {}
+        }
+        for scope, key, value in await self._get_connection_pool(db_path).read(read_stats):
+            stats.setdefault(scope, {})[key] = value
+        
+        return stats
+    
+    def _create_embedding_cache_table(self, cursor):
+        """Create the side table of embeddings keyed by embedder version and chunk content hash"""
+        
+        cursor.execute("""
+            CREATE TABLE embedding_cache (
+                embedder TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (embedder, content_hash)
+            ) WITHOUT ROWID
+        """)
+    
+    async def _ensure_kb_schema(self, db_path: Path):
+        """Upgrade a knowledge base database created by an older version in place"""
+        
+        if str(db_path) in self._schema_checked:
+            return
+        
+        await self._get_connection_pool(db_path).write(self._upgrade_kb_schema, db_path, transaction=False)
+        
+        self._schema_checked.add(str(db_path))
+    
+    def _upgrade_kb_schema(self, conn: sqlite3.Connection, db_path: Path):
+        """Apply pending schema upgrades on the writer connection"""
+        
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT value FROM metadata WHERE key = 'schema_version'")
+        row = cursor.fetchone()
+        schema_version = int(row[0]) if row else 1
+        
+        if schema_version >= self.schema_version:
+            return
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version < 2:
+                logger.info(f"Building keyword index for {db_path.parent.name}")
+                self._create_keyword_index(cursor)
+                cursor.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+            
+            if schema_version < 3:
+                logger.info(f"Converting JSON vectors to float32 BLOBs for {db_path.parent.name}")
+                self._convert_json_vectors_to_blobs(cursor)
+                cursor.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES ('vector_format', 'float32')")
+            
+            if schema_version < 4:
+                self._create_enrichment_job_table(cursor)
+            
+            if schema_version < 5:
+                self._create_document_update_indexes(cursor)
+            
+            if schema_version < 6:
+                logger.info(f"Moving chunks into the content-addressed chunk store for {db_path.parent.name}")
+                self._migrate_to_chunk_store(cursor)
+            
+            if schema_version < 7:
+                self._create_embedding_cache_table(cursor)
+            
+            if schema_version < 8:
+                self._create_document_filter_indexes(cursor)
+            
+            if schema_version < 9:
+                self._create_stats_table(cursor)
+                self._rebuild_kb_stats(cursor)
+            
+            if schema_version < 10:
+                logger.info(f"Building the knowledge graph for {db_path.parent.name}")
+                self._create_knowledge_graph_indexes(cursor)
+                self._backfill_knowledge_graph(cursor)
+            
+            cursor.execute(
+                "INSERT OR REPLACE INTO metadata (key, value) VALUES ('schema_version', ?)",
+                (str(self.schema_version),)
+            )
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        
+        # Reclaim the space freed by the much smaller vector encoding and the rebuilt chunk table
+        if schema_version < 6:
+            cursor.execute("VACUUM")
+    
+    def _backfill_knowledge_graph(self, cursor, batch_size: int = 1024):
+        """Build the concept graph for chunks stored before it was maintained at ingest"""
+        
+        now = datetime.now(timezone.utc).isoformat()
+        last_chunk_id = 0
+        while True:
+            cursor.execute("""
+                SELECT c.id, c.content, (SELECT MIN(document_id) FROM document_chunks WHERE chunk_id = c.id)
+                FROM chunks c WHERE c.id > ? ORDER BY c.id LIMIT ?
+            """, (last_chunk_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            self._store_concept_graph(cursor, [
+                {"id": chunk_id, "content": content, "document_id": document_id} for chunk_id, content, document_id in rows
+            ], now)
+            last_chunk_id = rows[-1][0]
+    
+    def _migrate_to_chunk_store(self, cursor):
+        """Move per-document chunk rows into the content-addressed store
+        
+        Chunk hashes were already unique, so every chunk keeps its id (and with it its vector
+        matrix row, FTS entry and analyses) and gets a reference count of one.
+        """
+        
+        self._create_chunk_store(cursor, "chunks_store")
+        cursor.execute("""
+            INSERT OR IGNORE INTO document_chunks (document_id, chunk_index, chunk_id, start_position, end_position)
+            SELECT document_id, COALESCE(chunk_index, 0), id, start_position, end_position FROM chunks
+        """)
+        cursor.execute("""
+            INSERT INTO chunks_store (id, content, content_hash, vector_embedding, ref_count, created_at)
+            SELECT c.id, c.content, c.content_hash, c.vector_embedding,
+                   (SELECT COUNT(*) FROM document_chunks m WHERE m.chunk_id = c.id), c.created_at
+            FROM chunks c
+        """)
+        
+        # Dropping the old table also drops its FTS triggers; the FTS rows themselves are unchanged
+        cursor.execute("DROP TABLE chunks")
+        cursor.execute("ALTER TABLE chunks_store RENAME TO chunks")
+        self._create_keyword_triggers(cursor)
+    
+    def _convert_json_vectors_to_blobs(self, cursor, batch_size: int = 1024):
+        """Rewrite JSON-text chunk embeddings as packed float32 BLOBs"""
+        
+        last_chunk_id = 0
+        while True:
+            cursor.execute(
+                "SELECT id, vector_embedding FROM chunks WHERE id > ? ORDER BY id LIMIT ?",
+                (last_chunk_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            cursor.executemany("UPDATE chunks SET vector_embedding = ? WHERE id = ?", [
+                (self._encode_vector(json.loads(vector_json), np.float32), chunk_id)
+                for chunk_id, vector_json in rows
+                if isinstance(vector_json, str)
+            ])
+            last_chunk_id = rows[-1][0]
+    
+    @staticmethod
+    def _encode_vector(vector, dtype) -> bytes:
+        """Pack an embedding into the BLOB stored in chunks.vector_embedding"""
+        return np.asarray(vector, dtype=dtype).tobytes()
+    
+    @staticmethod
+    def _decode_vector(blob: bytes, dtype) -> np.ndarray:
+        """Zero-copy view of a stored embedding BLOB"""
+        return np.frombuffer(blob, dtype=dtype)
+    
+    async def _get_vector_dtype(self, db_path: Path) -> np.dtype:
+        """Return the dtype of the KB's stored vector BLOBs"""
+        
+        kb_key = str(db_path.parent)
+        if kb_key not in self._vector_dtypes:
+            metadata = await self._read_kb_metadata(db_path, ["vector_format"])
+            self._vector_dtypes[kb_key] = np.dtype(metadata.get("vector_format", "float32"))
+        
+        return self._vector_dtypes[kb_key]
+    
+    async def _read_kb_metadata(self, db_path: Path, keys: List[str]) -> Dict[str, str]:
+        """Read the given keys from the KB metadata table"""
+        
+        def read_metadata(conn):
+            placeholders = ",".join("?" * len(keys))
+            return dict(conn.execute(f"SELECT key, value FROM metadata WHERE key IN ({placeholders})", keys).fetchall())
+        
+        return await self._get_connection_pool(db_path).read(read_metadata)
+    
+    def _get_connection_pool(self, db_path: Path) -> KBConnectionPool:
+        """Return the KB's connection pool, opening it on first use"""
+        
+        pool = self._connection_pools.get(str(db_path))
+        if pool is None:
+            pool = KBConnectionPool(
+                db_path,
+                self._db_executor,
+                max_readers=self.db_max_readers,
+                mmap_size=self.db_mmap_size,
+                cache_size_kb=self.db_cache_size_kb
+            )
+            self._connection_pools[str(db_path)] = pool
         
-        conn.commit()
-        conn.close()
+        return pool
     
     async def _add_documents_to_kb(self, args: Dict[str, Any]) -> str:
         """Add documents to an existing knowledge base"""
@@ -245,10 +863,17 @@ class RAGKnowledgeBaseTool:
         documents = args.get("documents", [])
         enable_cognitive_analysis = args.get("enable_cognitive_analysis", True)
         chunk_documents = args.get("chunk_documents", True)
+        cognitive_concurrency = args.get("cognitive_concurrency", self.cognitive_concurrency)
+        enrichment_mode = args.get("enrichment_mode", "inline")  # inline, deferred
         
         if not kb_name or not documents:
             return "## Error\n\nKnowledge base name and documents are required"
         
+        try:
+            chunker = self._get_chunker(args) if chunk_documents else None
+        except ValueError as e:
+            return f"## Error\n\n{e}"
+        
         # Load knowledge base
         kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
         if not kb_config:
@@ -256,35 +881,24 @@ class RAGKnowledgeBaseTool:
         
         db_path = kb_path / "knowledge_base.db"
         
-        added_documents = []
-        skipped_documents = []
-        total_chunks_created = 0
+        start_time = time.perf_counter()
+        ingest_result = await self._ingest_documents(
+            db_path, documents, enable_cognitive_analysis, chunker, cognitive_concurrency, enrichment_mode
+        )
         
-        for doc in documents:
-            try:
-                # Process document
-                doc_info = await self._process_document_for_kb(
-                    doc, kb_path, db_path, enable_cognitive_analysis, chunk_documents
-                )
-                
-                if doc_info:
-                    added_documents.append(doc_info)
-                    total_chunks_created += doc_info.get("chunk_count", 0)
-                else:
-                    skipped_documents.append(doc.get("filename", "unknown"))
-                    
-            except Exception as e:
-                logger.warning(f"Failed to process document {doc.get('filename', 'unknown')}: {e}")
-                skipped_documents.append(doc.get("filename", "unknown"))
+        added_documents = ingest_result["added_documents"]
+        skipped_documents = ingest_result["skipped_documents"]
+        total_chunks_created = ingest_result["chunk_count"]
         
-        # Update knowledge base configuration
-        kb_config["document_count"] += len(added_documents)
-        kb_config["chunk_count"] = kb_config.get("chunk_count", 0) + total_chunks_created
-        kb_config["last_updated"] = datetime.now(timezone.utc).isoformat()
+        if total_chunks_created:
+            await self._after_documents_added(db_path, kb_config, kb_name)
         
-        config_path = kb_path / "config.json"
-        with open(config_path, "w") as f:
-            json.dump(kb_config, f, indent=2)
+        elapsed = max(time.perf_counter() - start_time, 1e-9)
+        
+        # Counts come from kb_stats, which the ingest transaction already updated
+        kb_config["last_updated"] = datetime.now(timezone.utc).isoformat()
+        self._save_knowledge_base_config(kb_path, kb_config)
+        kb_totals = (await self._read_kb_stats(db_path))["totals"]
         
         # Generate summary
         result = f"""## 📚 Documents Added to Knowledge Base
@@ -293,322 +907,2559 @@ class RAGKnowledgeBaseTool:
 **Documents Added:** {len(added_documents)}
 **Documents Skipped:** {len(skipped_documents)}
 **Total Chunks Created:** {total_chunks_created}
+**Chunks Deduplicated:** {ingest_result['deduplicated_chunks']}
+
+### Added Documents:"""
+        
+        for doc_info in added_documents[:5]:  # Show first 5
+            result += f"\n- **{doc_info['filename']}** ({doc_info['category']}) - {doc_info['chunk_count']} chunks"
+        
+        if len(added_documents) > 5:
+            result += f"\n- ... and {len(added_documents) - 5} more documents"
+        
+        if skipped_documents:
+            result += f"\n\n### Skipped Documents:\n- {', '.join(skipped_documents)}"
+        
+        if ingest_result["queued_jobs"]:
+            result += f"\n\n### Deferred Enrichment:\n- **Chunks Queued:** {ingest_result['queued_jobs']}\n- Chunks are queryable now; cognitive analysis runs in the background (see `info`)"
+        
+        result += f"""
+
+### Ingest Throughput:
+- **Documents/s:** {len(added_documents) / elapsed:.1f}
+- **Chunks/s:** {total_chunks_created / elapsed:.1f}
+- **Elapsed:** {elapsed:.2f}s ({', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in ingest_result['stage_seconds'].items())})"""
+        
+        result += f"\n\n### Knowledge Base Status:\n- **Total Documents:** {kb_totals['documents']}\n- **Total Chunks:** {kb_totals['chunks']}\n- **Last Updated:** {kb_config['last_updated'][:19]}\n\n*Your knowledge base has been updated and is ready for querying!*"
+        
+        return result
+    
+    async def _add_path_to_kb(self, args: Dict[str, Any]) -> str:
+        """Add the files under a directory on the server's disk, streamed through ingest in bounded batches
+        
+        Files are read lazily, at most about `path_batch_bytes` of text at a time, and each batch
+        is committed before the next is read, so memory stays flat whatever the corpus size.
+        Files above `stream_file_bytes` are never read whole: they are chunked from disk by
+        `_ingest_file_stream`. Paths are checked against the filesystem tool's allow-list,
+        symlink targets included.
+        """
+        kb_name = args.get("knowledge_base_name", "")
+        target_path = args.get("path", "")
+        file_types = args.get("file_types", ["code", "docs", "config"])
+        recursive = args.get("recursive", True)
+        include_hidden = args.get("include_hidden", False)
+        category = args.get("category")
+        max_files = args.get("max_files")
+        enable_cognitive_analysis = args.get("enable_cognitive_analysis", True)
+        chunk_documents = args.get("chunk_documents", True)
+        cognitive_concurrency = args.get("cognitive_concurrency", self.cognitive_concurrency)
+        enrichment_mode = args.get("enrichment_mode", "inline")  # inline, deferred
+        
+        if not kb_name or not target_path:
+            return "## Error\n\nKnowledge base name and path are required"
+        
+        unknown_types = [file_type for file_type in file_types if file_type not in self.filesystem_tool.supported_extensions]
+        if unknown_types or not file_types:
+            return f"## Error\n\nUnknown file types: {', '.join(unknown_types) or 'none given'}. Available: {', '.join(self.filesystem_tool.supported_extensions)}"
+        
+        if category is not None and not isinstance(category, str):
+            return "## Error\n\ncategory must be a single string for add_path"
+        
+        if max_files is not None and (not isinstance(max_files, int) or max_files < 1):
+            return "## Error\n\nmax_files must be a positive integer"
+        
+        if not self.filesystem_tool._is_path_allowed(target_path):
+            return f"## Error\n\nPath '{target_path}' is not in allowed directories for security reasons"
+        
+        root = Path(target_path).resolve()
+        if not root.exists():
+            return f"## Error\n\nPath '{target_path}' does not exist"
+        
+        try:
+            chunker = self._get_chunker(args) if chunk_documents else None
+        except ValueError as e:
+            return f"## Error\n\n{e}"
+        
+        kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
+        if not kb_config:
+            return f"## Error\n\nKnowledge base '{kb_name}' not found"
+        
+        db_path = kb_path / "knowledge_base.db"
+        pool = self._get_connection_pool(db_path)
+        
+        # Running totals only; documents are dropped once their batch is committed
+        scan = {"files": 0, "bytes": 0, "skipped": {}, "limit_reached": False}
+        added_count = 0
+        added_examples: List[Dict[str, Any]] = []
+        skipped_documents: List[str] = []
+        total_chunks_created = 0
+        deduplicated_chunks = 0
+        queued_jobs = 0
+        stage_seconds: Dict[str, float] = {}
+        
+        start_time = time.perf_counter()
+        done_bytes = 0  # progress: bytes of files fully ingested, plus the streamed part of the current one
+        reported_bytes = -1
+        
+        async def report(progress: int, message: str):
+            # MCP progress must strictly increase; a finished stream and its file summary can coincide
+            nonlocal reported_bytes
+            if progress > reported_bytes:
+                reported_bytes = progress
+                await self._report_progress(progress, None, message)
+        
+        def absorb(ingest_result: Dict[str, Any]):
+            nonlocal added_count, total_chunks_created, deduplicated_chunks, queued_jobs
+            added_count += len(ingest_result["added_documents"])
+            added_examples.extend(ingest_result["added_documents"][:5 - len(added_examples)])
+            skipped_documents.extend(ingest_result["skipped_documents"])
+            total_chunks_created += ingest_result["chunk_count"]
+            deduplicated_chunks += ingest_result["deduplicated_chunks"]
+            queued_jobs += ingest_result["queued_jobs"]
+            for stage, seconds in ingest_result["stage_seconds"].items():
+                stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+        
+        documents = self._iter_path_documents(root, file_types, recursive, include_hidden, category, max_files, scan)
+        while True:
+            batch = await pool.run(self._next_path_batch, documents)
+            if not batch:
+                break
+            
+            # Small files are ingested together from memory; large ones are chunked straight from disk
+            in_memory = [document for document in batch if "path" not in document]
+            streamed = [document for document in batch if "path" in document]
+            del batch
+            
+            if in_memory:
+                absorb(await self._ingest_documents(
+                    db_path, in_memory, enable_cognitive_analysis, chunker, cognitive_concurrency, enrichment_mode
+                ))
+                done_bytes += sum(document["metadata"]["size"] for document in in_memory)
+                del in_memory
+                await report(done_bytes, f"Ingested {scan['files']} files ({scan['bytes'] / 1e6:.1f} MB) from {root}: {total_chunks_created} chunks")
+            
+            for document in streamed:
+                async def report_stream(chunk_count: int, position: int, document=document):
+                    # Chunk positions count characters; capped so multi-byte text cannot overshoot the file size
+                    await report(done_bytes + min(position, document["metadata"]["size"]), f"Streaming {document['filename']}: {chunk_count} chunks so far")
+                
+                absorb(await self._ingest_file_stream(
+                    db_path, document, enable_cognitive_analysis, chunker, cognitive_concurrency, enrichment_mode, report_stream
+                ))
+                done_bytes += document["metadata"]["size"]
+                await report(done_bytes, f"Ingested {scan['files']} files ({scan['bytes'] / 1e6:.1f} MB) from {root}: {total_chunks_created} chunks")
+        
+        if total_chunks_created:
+            await self._after_documents_added(db_path, kb_config, kb_name)
+        
+        elapsed = max(time.perf_counter() - start_time, 1e-9)
+        
+        kb_config["last_updated"] = datetime.now(timezone.utc).isoformat()
+        self._save_knowledge_base_config(kb_path, kb_config)
+        kb_totals = (await self._read_kb_stats(db_path))["totals"]
+        
+        result = f"""## 📂 Path Added to Knowledge Base
+
+**Knowledge Base:** {kb_name}
+**Path:** {root}
+**Files Read:** {scan['files']} ({scan['bytes'] / 1e6:.1f} MB)
+**Documents Added:** {added_count}
+**Documents Skipped:** {len(skipped_documents)}
+**Total Chunks Created:** {total_chunks_created}
+**Chunks Deduplicated:** {deduplicated_chunks}
 
 ### Added Documents:"""
         
-        for doc_info in added_documents[:5]:  # Show first 5
-            result += f"\n- **{doc_info['filename']}** ({doc_info['category']}) - {doc_info['chunk_count']} chunks"
+        for doc_info in added_examples:
+            result += f"\n- **{doc_info['filename']}** ({doc_info['category']}) - {doc_info['chunk_count']} chunks"
+        
+        if added_count > len(added_examples):
+            result += f"\n- ... and {added_count - len(added_examples)} more documents"
+        
+        if skipped_documents:
+            shown = ', '.join(skipped_documents[:10])
+            more = f" and {len(skipped_documents) - 10} more" if len(skipped_documents) > 10 else ""
+            result += f"\n\n### Skipped Documents (empty or already stored):\n- {shown}{more}"
+        
+        if scan["skipped"]:
+            result += "\n\n### Files Not Read:"
+            for reason, count in sorted(scan["skipped"].items()):
+                result += f"\n- **{reason}:** {count}"
+        
+        if scan["limit_reached"]:
+            result += f"\n\n*Stopped after max_files={max_files}; run add_path again with a higher limit to continue (stored documents are skipped).*"
+        
+        if queued_jobs:
+            result += f"\n\n### Deferred Enrichment:\n- **Chunks Queued:** {queued_jobs}\n- Chunks are queryable now; cognitive analysis runs in the background (see `info`)"
+        
+        result += f"""
+
+### Ingest Throughput:
+- **Files/s:** {scan['files'] / elapsed:.1f}
+- **MB/s:** {scan['bytes'] / 1e6 / elapsed:.2f}
+- **Chunks/s:** {total_chunks_created / elapsed:.1f}
+- **Elapsed:** {elapsed:.2f}s ({', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in stage_seconds.items())})"""
+        
+        result += f"\n\n### Knowledge Base Status:\n- **Total Documents:** {kb_totals['documents']}\n- **Total Chunks:** {kb_totals['chunks']}\n- **Last Updated:** {kb_config['last_updated'][:19]}\n\n*Your knowledge base has been updated and is ready for querying!*"
+        
+        return result
+    
+    def _iter_path_documents(self, root: Path, file_types: List[str], recursive: bool, include_hidden: bool, category: Optional[str], max_files: Optional[int], scan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Lazily yield add_documents payloads for the matching text files under root, in path order
+        
+        Filenames are relative to root's parent (so "docs/guide.md" for a root named docs) and
+        the absolute path, size and mtime go into the metadata. Files above stream_file_bytes
+        carry their "path" instead of "content", for `_ingest_file_stream`. Files that are binary,
+        unreadable or outside the allow-list are counted in scan["skipped"] by reason.
+        """
+        filesystem_tool = self.filesystem_tool
+        build_names = filesystem_tool.supported_extensions["build"]
+        
+        def file_category(path: Path) -> Optional[str]:
+            for file_type in file_types:
+                extensions = filesystem_tool.supported_extensions[file_type]
+                if path.suffix.lower() in extensions or (file_type == "build" and path.name in build_names):
+                    return file_type
+            return None
+        
+        def skip(reason: str):
+            scan["skipped"][reason] = scan["skipped"].get(reason, 0) + 1
+        
+        def candidate_files() -> Iterator[Path]:
+            if root.is_file():
+                yield root
+                return
+            for dir_path, dir_names, file_names in os.walk(root):
+                # Prune in place so hidden directories are never descended into
+                dir_names[:] = sorted(name for name in dir_names if recursive and (include_hidden or not name.startswith('.')))
+                for name in sorted(file_names):
+                    if include_hidden or not name.startswith('.'):
+                        yield Path(dir_path) / name
+        
+        base = root.parent
+        for path in candidate_files():
+            file_type = file_category(path)
+            if file_type is None:
+                continue
+            
+            if max_files is not None and scan["files"] >= max_files:
+                scan["limit_reached"] = True
+                return
+            
+            # Resolves symlinks, so a link pointing outside the allowed directories is refused
+            if not filesystem_tool._is_path_allowed(str(path)):
+                skip("outside allowed directories")
+                continue
+            
+            try:
+                stat = path.stat()
+                
+                # Any size is accepted (the filesystem tool's max_file_size is an analysis limit);
+                # files above stream_file_bytes are only sniffed here and chunked from disk later
+                streamed = stat.st_size > self.stream_file_bytes
+                with open(path, "rb") as f:
+                    data = f.read(8192) if streamed else f.read()
+            except OSError as e:
+                logger.warning(f"Could not read {path}: {e}")
+                skip("unreadable")
+                continue
+            
+            if b"\0" in data[:8192]:
+                skip("binary")
+                continue
+            
+            scan["files"] += 1
+            scan["bytes"] += stat.st_size
+            document = {
+                "filename": path.relative_to(base).as_posix(),
+                "category": category or file_type,
+                "metadata": {"source_path": str(path), "size": stat.st_size, "mtime": stat.st_mtime}
+            }
+            if streamed:
+                document["path"] = path
+            else:
+                document["content"] = data.decode("utf-8", errors="replace")
+            yield document
+    
+    def _next_path_batch(self, documents: Iterator[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Pull documents until the batch reaches path_batch_bytes or path_batch_files (runs off the event loop)"""
+        batch: List[Dict[str, Any]] = []
+        batch_bytes = 0
+        for document in documents:
+            batch.append(document)
+            batch_bytes += len(document.get("content", ""))  # streamed files are not held in memory
+            if batch_bytes >= self.path_batch_bytes or len(batch) >= self.path_batch_files:
+                break
+        return batch
+    
+    async def _replace_documents_in_kb(self, args: Dict[str, Any]) -> str:
+        """Replace documents by filename, re-embedding and re-analysing only chunks whose text changed"""
+        kb_name = args.get("knowledge_base_name", "")
+        documents = args.get("documents", [])
+        enable_cognitive_analysis = args.get("enable_cognitive_analysis", True)
+        cognitive_concurrency = args.get("cognitive_concurrency", self.cognitive_concurrency)
+        enrichment_mode = args.get("enrichment_mode", "inline")  # inline, deferred
+        
+        if not kb_name or not documents:
+            return "## Error\n\nKnowledge base name and documents are required"
+        
+        try:
+            chunker = self._get_chunker(args)
+        except ValueError as e:
+            return f"## Error\n\n{e}"
+        
+        kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
+        if not kb_config:
+            return f"## Error\n\nKnowledge base '{kb_name}' not found"
+        
+        db_path = kb_path / "knowledge_base.db"
+        
+        start_time = time.perf_counter()
+        replace_result = await self._replace_documents(
+            db_path, documents, enable_cognitive_analysis, chunker, cognitive_concurrency, enrichment_mode
+        )
+        
+        # Filenames that are not in the KB yet are simply added
+        added_documents = []
+        added_chunks = 0
+        if replace_result["new_documents"]:
+            ingest_result = await self._ingest_documents(
+                db_path, replace_result["new_documents"], enable_cognitive_analysis, chunker, cognitive_concurrency, enrichment_mode
+            )
+            added_documents = ingest_result["added_documents"]
+            added_chunks = ingest_result["chunk_count"]
+            replace_result["skipped_documents"].extend(ingest_result["skipped_documents"])
+        
+        await self._after_documents_changed(db_path, kb_config, replace_result["compacted"])
+        elapsed = time.perf_counter() - start_time
+        
+        kb_config["last_updated"] = datetime.now(timezone.utc).isoformat()
+        self._save_knowledge_base_config(kb_path, kb_config)
+        
+        result = f"""## 🔄 Documents Replaced in Knowledge Base
+
+**Knowledge Base:** {kb_name}
+**Documents Replaced:** {len(replace_result['replaced_documents'])}
+**Documents Added:** {len(added_documents)}
+**Documents Unchanged:** {len(replace_result['unchanged_documents'])}
+**Documents Skipped:** {len(replace_result['skipped_documents'])}
+
+### Chunk Changes:
+- **Reused:** {replace_result['reused_chunks']} (embeddings and cognitive analyses kept)
+- **Re-embedded:** {replace_result['embedded_chunks'] + added_chunks}
+- **Removed:** {replace_result['removed_chunks']}
+- **Elapsed:** {elapsed:.2f}s"""
+        
+        if replace_result["replaced_documents"]:
+            result += f"\n\n### Replaced Documents:\n- {', '.join(replace_result['replaced_documents'][:10])}"
+            if len(replace_result["replaced_documents"]) > 10:
+                result += f" ... and {len(replace_result['replaced_documents']) - 10} more"
+        
+        if replace_result["skipped_documents"]:
+            result += f"\n\n### Skipped Documents:\n- {', '.join(replace_result['skipped_documents'])}"
+        
+        if replace_result["queued_jobs"]:
+            result += f"\n\n### Deferred Enrichment:\n- **Chunks Queued:** {replace_result['queued_jobs']}"
+        
+        return result
+    
+    async def _remove_documents_from_kb(self, args: Dict[str, Any]) -> str:
+        """Remove documents by filename along with their chunks, vectors and analyses"""
+        kb_name = args.get("knowledge_base_name", "")
+        filenames = args.get("filenames") or [doc.get("filename") for doc in args.get("documents", []) if doc.get("filename")]
+        
+        if not kb_name or not filenames:
+            return "## Error\n\nKnowledge base name and filenames are required"
+        
+        kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
+        if not kb_config:
+            return f"## Error\n\nKnowledge base '{kb_name}' not found"
+        
+        db_path = kb_path / "knowledge_base.db"
+        vector_matrix = await self._get_vector_matrix(db_path)
+        
+        def remove_documents(conn):
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                document_rows = []
+                for filename in dict.fromkeys(filenames):
+                    cursor.execute("SELECT id, filename FROM documents WHERE filename = ?", (filename,))
+                    document_rows.extend(cursor.fetchall())
+                
+                document_ids = [document_id for document_id, _ in document_rows]
+                released_chunk_ids = self._unlink_documents(cursor, document_ids)
+                chunk_ids = self._delete_unreferenced_chunks(cursor, released_chunk_ids)
+                self._delete_documents(cursor, document_ids)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            
+            vector_matrix.remove(chunk_ids)
+            return document_rows, chunk_ids, len(released_chunk_ids) - len(chunk_ids), self._compact_vector_matrix(vector_matrix)
+        
+        document_rows, chunk_ids, shared_chunks, compacted = await self._get_connection_pool(db_path).write(remove_documents, transaction=False)
+        await self._after_documents_changed(db_path, kb_config, compacted)
+        
+        removed_filenames = list(dict.fromkeys(filename for _, filename in document_rows))
+        missing_filenames = [filename for filename in dict.fromkeys(filenames) if filename not in removed_filenames]
+        
+        kb_config["last_updated"] = datetime.now(timezone.utc).isoformat()
+        self._save_knowledge_base_config(kb_path, kb_config)
+        kb_totals = (await self._read_kb_stats(db_path))["totals"]
+        
+        result = f"""## ➖ Documents Removed from Knowledge Base
+
+**Knowledge Base:** {kb_name}
+**Documents Removed:** {len(document_rows)}
+**Chunks Removed:** {len(chunk_ids)}"""
+        
+        if shared_chunks:
+            result += f"\n**Shared Chunks Kept:** {shared_chunks} (still referenced by other documents)"
+        
+        if removed_filenames:
+            result += f"\n\n### Removed Documents:\n- {', '.join(removed_filenames)}"
+        
+        if missing_filenames:
+            result += f"\n\n### Not Found:\n- {', '.join(missing_filenames)}"
+        
+        result += f"\n\n### Knowledge Base Status:\n- **Total Documents:** {kb_totals['documents']}\n- **Total Chunks:** {kb_totals['chunks']}"
+        
+        return result
+    
+    async def _after_documents_added(self, db_path: Path, kb_config: Dict[str, Any], kb_name: str):
+        """Extend the ANN index and quantized codes with the newly appended vectors"""
+        if kb_config.get("ann_index"):
+            indexed = await self._sync_ann_index(db_path)
+            logger.info(f"ANN index for {kb_name} updated with {indexed} vectors")
+        
+        quantization = self._vector_quantization(kb_config)
+        if quantization:
+            encoded = await self._sync_vector_quantizer(db_path, quantization)
+            logger.info(f"{quantization} codes for {kb_name} updated with {encoded} vectors")
+    
+    async def _after_documents_changed(self, db_path: Path, kb_config: Dict[str, Any], compacted: bool):
+        """Invalidate cached results and bring the ANN index back in line after a replace/remove"""
+        
+        kb_key = str(db_path.parent)
+        self.query_cache.bump_version(kb_key)
+        
+        # Compaction renumbers matrix rows, so the IVF lists and codes are rebuilt from scratch
+        if compacted:
+            self._ann_indexes.pop(kb_key, None)
+            self._vector_quantizers.pop(kb_key, None)
+        
+        if kb_config.get("ann_index"):
+            await self._sync_ann_index(db_path)
+        
+        quantization = self._vector_quantization(kb_config)
+        if quantization:
+            await self._sync_vector_quantizer(db_path, quantization)
+    
+    async def _ingest_documents(self, db_path: Path, documents: List[Dict[str, Any]], enable_cognitive_analysis: bool, chunker: Optional[DocumentChunker], cognitive_concurrency: int, enrichment_mode: str = "inline") -> Dict[str, Any]:
+        """Ingest a batch of documents through the parse → chunk → hash → embed → write pipeline
+        
+        Everything is written with one executemany per table inside a single WAL-mode
+        transaction, and the new vectors are appended to the vector matrix once it commits.
+        Database lookups, embedding and the write all run on the KB's connection pool.
+        """
+        
+        pool = self._get_connection_pool(db_path)
+        stage_seconds: Dict[str, float] = {}
+        skipped_documents: List[str] = []
+        
+        # Stage 1: parse
+        stage_start = time.perf_counter()
+        parsed_documents = []
+        for doc in documents:
+            filename = doc.get("filename", "unknown")
+            content = doc.get("content", "")
+            if not content.strip():
+                skipped_documents.append(filename)
+                continue
+            
+            parsed_documents.append({
+                "filename": filename,
+                "content": content,
+                "category": doc.get("category", "document"),
+                "metadata": doc.get("metadata", {})
+            })
+        stage_seconds["parse"] = time.perf_counter() - stage_start
+        
+        # Stage 2: chunk (documents are stored unchunked when no chunker is given)
+        stage_start = time.perf_counter()
+        document_chunks = await pool.run(
+            lambda: [self._create_document_chunks(doc["content"], chunker) if chunker else [] for doc in parsed_documents]
+        )
+        for doc, chunks in zip(parsed_documents, document_chunks):
+            doc["chunks"] = chunks
+        stage_seconds["chunk"] = time.perf_counter() - stage_start
+        
+        # Stage 3: hash, dropping documents that are already stored
+        stage_start = time.perf_counter()
+        for doc in parsed_documents:
+            doc["content_hash"] = hashlib.md5(doc["content"].encode()).hexdigest()
+            for chunk in doc["chunks"]:
+                chunk["content_hash"] = hashlib.md5(chunk["content"].encode()).hexdigest()
+        
+        def find_stored_hashes(conn):
+            cursor = conn.cursor()
+            return (
+                self._find_existing_hashes(cursor, "documents", [doc["content_hash"] for doc in parsed_documents]),
+                self._find_existing_hashes(
+                    cursor, "chunks", [chunk["content_hash"] for doc in parsed_documents for chunk in doc["chunks"]]
+                )
+            )
+        
+        existing_document_hashes, existing_chunk_hashes = await pool.read(find_stored_hashes)
+        
+        new_documents = []
+        for doc in parsed_documents:
+            if doc["content_hash"] in existing_document_hashes:
+                logger.info(f"Document {doc['filename']} already exists (same content hash)")
+                skipped_documents.append(doc["filename"])
+                continue
+            
+            new_documents.append(doc)
+            existing_document_hashes.add(doc["content_hash"])
+        
+        # Chunk text already in the store, or repeated within the batch, is referenced rather than re-embedded
+        unique_chunks: Dict[str, Dict[str, Any]] = {}
+        for doc in new_documents:
+            for chunk in doc["chunks"]:
+                if chunk["content_hash"] not in existing_chunk_hashes:
+                    unique_chunks.setdefault(chunk["content_hash"], chunk)
+        new_chunks = list(unique_chunks.values())
+        stage_seconds["hash"] = time.perf_counter() - stage_start
+        
+        # Stage 4: batch-embed every new unique chunk at once (and extract its graph concepts)
+        stage_start = time.perf_counter()
+        embedder = await self._get_kb_embedder(db_path)
+        vectors_by_hash = await self._embed_chunks(db_path, embedder, new_chunks)
+        await pool.run(self._extract_chunk_concepts, new_chunks)
+        stage_seconds["embed"] = time.perf_counter() - stage_start
+        
+        # Stage 5: cognitive enrichment, fanned out with bounded concurrency (or queued for later)
+        stage_start = time.perf_counter()
+        defer_enrichment = enable_cognitive_analysis and enrichment_mode == "deferred"
+        analyses_by_hash = {}
+        if enable_cognitive_analysis and not defer_enrichment:
+            analyses = await self._enrich_chunks([chunk["content"] for chunk in new_chunks], cognitive_concurrency)
+            analyses_by_hash = dict(zip(unique_chunks, analyses))
+        stage_seconds["enrich"] = time.perf_counter() - stage_start
+        
+        # Stage 6: write everything in one transaction
+        stage_start = time.perf_counter()
+        vector_matrix = await self._get_vector_matrix(db_path)
+        vector_dtype = await self._get_vector_dtype(db_path)
+        
+        def write_batch(conn):
+            stored_chunks, stored_vectors = self._write_ingest_batch(
+                conn, new_documents, vectors_by_hash, analyses_by_hash, vector_dtype, embedder, defer_enrichment
+            )
+            # Append while still holding the write lock so matrix rows stay in chunk id order
+            if stored_chunks:
+                vector_matrix.append([chunk["id"] for chunk in stored_chunks], stored_vectors)
+            return stored_chunks
+        
+        stored_chunks = await pool.write(write_batch, transaction=False)
+        stage_seconds["write"] = time.perf_counter() - stage_start
+        
+        if new_documents:
+            self.query_cache.bump_version(str(db_path.parent))
+        
+        if defer_enrichment and stored_chunks:
+            self._schedule_enrichment(db_path)
+        
+        added_documents = [
+            {
+                "filename": doc["filename"],
+                "category": doc["category"],
+                "document_id": doc["id"],
+                "chunk_count": len(doc["chunks"]),
+                "content_hash": doc["content_hash"]
+            }
+            for doc in new_documents
+        ]
+        chunk_references = sum(len(doc["chunks"]) for doc in new_documents)
+        
+        return {
+            "added_documents": added_documents,
+            "skipped_documents": skipped_documents,
+            "chunk_count": len(stored_chunks),
+            "deduplicated_chunks": chunk_references - len(stored_chunks),
+            "queued_jobs": len(stored_chunks) if defer_enrichment else 0,
+            "stage_seconds": stage_seconds
+        }
+    
+    async def _ingest_file_stream(self, db_path: Path, document: Dict[str, Any], enable_cognitive_analysis: bool, chunker: Optional[DocumentChunker], cognitive_concurrency: int, enrichment_mode: str = "inline", on_batch: Optional[Callable[[int, int], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """Ingest one file from disk without holding its text in memory
+        
+        A first streaming pass hashes the text exactly as `_ingest_documents` hashes an
+        in-memory copy (so either path recognises the other's documents) and counts its
+        words. The document row is then written without a stored copy of the text, and
+        `DocumentChunker.chunk_file` feeds the chunks through the hash → embed → write stages
+        `stream_chunk_batch` at a time, one transaction per batch. Memory is bounded by the
+        chunker's read size plus one chunk batch, whatever the file size. A file that fails
+        part-way is removed again, so a retry starts from scratch.
+        
+        `document` carries "path", "filename", "category" and "metadata"; streamed files are
+        always chunked (the default chunker stands in for None). `on_batch(chunks_so_far,
+        characters_so_far)` is awaited after every committed batch. Returns the same summary as `_ingest_documents`.
+        """
+        
+        path = document["path"]
+        filename = document["filename"]
+        category = document.get("category", "document")
+        chunker = chunker or self._get_chunker({})
+        pool = self._get_connection_pool(db_path)
+        stage_seconds = {"hash": 0.0, "chunk": 0.0, "embed": 0.0, "enrich": 0.0, "write": 0.0}
+        result = {
+            "added_documents": [],
+            "skipped_documents": [],
+            "chunk_count": 0,
+            "deduplicated_chunks": 0,
+            "queued_jobs": 0,
+            "stage_seconds": stage_seconds
+        }
+        
+        # Pass 1: hash the text and count its words, dropping files that are empty or already stored
+        stage_start = time.perf_counter()
+        content_hash, size_bytes, word_count = await pool.run(self._scan_text_file, path, chunker.read_size)
+        already_stored = await pool.read(lambda conn: self._find_existing_hashes(conn.cursor(), "documents", [content_hash]))
+        stage_seconds["hash"] += time.perf_counter() - stage_start
+        
+        if already_stored:
+            logger.info(f"Document {filename} already exists (same content hash)")
+        if already_stored or not word_count:
+            result["skipped_documents"].append(filename)
+            return result
+        
+        now = datetime.now(timezone.utc).isoformat()
+        
+        # The text itself lives only in the chunks; documents.content is left empty for streamed files
+        def insert_document(conn):
+            cursor = conn.cursor()
+            document_id = self._next_row_id(cursor, "documents")
+            cursor.execute("""
+                INSERT INTO documents (id, filename, content_hash, content, category, size_bytes, word_count, added_at, metadata)
+                VALUES (?, ?, ?, '', ?, ?, ?, ?, ?)
+            """, (
+                document_id, filename, content_hash, category, size_bytes, word_count, now,
+                json.dumps({"original_metadata": document.get("metadata", {}), "streamed": True})
+            ))
+            return document_id
+        
+        document_id = await pool.write(insert_document)
+        
+        embedder = await self._get_kb_embedder(db_path)
+        vector_matrix = await self._get_vector_matrix(db_path)
+        vector_dtype = await self._get_vector_dtype(db_path)
+        defer_enrichment = enable_cognitive_analysis and enrichment_mode == "deferred"
+        
+        chunks = chunker.chunk_file(path)
+        chunk_count = 0
+        try:
+            while True:
+                # Pass 2: the next batch of chunks, read off the event loop
+                stage_start = time.perf_counter()
+                batch = await pool.run(lambda: list(itertools.islice(chunks, self.stream_chunk_batch)))
+                if not batch:
+                    break
+                for chunk in batch:
+                    chunk["content_hash"] = hashlib.md5(chunk["content"].encode()).hexdigest()
+                stage_seconds["chunk"] += time.perf_counter() - stage_start
+                
+                stage_start = time.perf_counter()
+                existing_chunk_hashes = await pool.read(
+                    lambda conn: self._find_existing_hashes(conn.cursor(), "chunks", [chunk["content_hash"] for chunk in batch])
+                )
+                unique_chunks: Dict[str, Dict[str, Any]] = {}
+                for chunk in batch:
+                    if chunk["content_hash"] not in existing_chunk_hashes:
+                        unique_chunks.setdefault(chunk["content_hash"], chunk)
+                new_chunks = list(unique_chunks.values())
+                stage_seconds["hash"] += time.perf_counter() - stage_start
+                
+                stage_start = time.perf_counter()
+                vectors_by_hash = await self._embed_chunks(db_path, embedder, new_chunks)
+                await pool.run(self._extract_chunk_concepts, new_chunks)
+                stage_seconds["embed"] += time.perf_counter() - stage_start
+                
+                stage_start = time.perf_counter()
+                analyses_by_hash = {}
+                if enable_cognitive_analysis and not defer_enrichment:
+                    analyses = await self._enrich_chunks([chunk["content"] for chunk in new_chunks], cognitive_concurrency)
+                    analyses_by_hash = dict(zip(unique_chunks, analyses))
+                stage_seconds["enrich"] += time.perf_counter() - stage_start
+                
+                stage_start = time.perf_counter()
+                batch_document = {"id": document_id, "chunks": batch, "first_chunk_index": chunk_count}
+                
+                def write_batch(conn):
+                    cursor = conn.cursor()
+                    cursor.execute("BEGIN IMMEDIATE")
+                    try:
+                        stored_chunks, stored_vectors = self._store_document_chunks(
+                            cursor, [batch_document], vectors_by_hash, analyses_by_hash, vector_dtype, embedder, defer_enrichment, now
+                        )
+                        cursor.execute("COMMIT")
+                    except Exception:
+                        cursor.execute("ROLLBACK")
+                        raise
+                    if stored_chunks:
+                        vector_matrix.append([chunk["id"] for chunk in stored_chunks], stored_vectors)
+                    return stored_chunks
+                
+                stored_chunks = await pool.write(write_batch, transaction=False)
+                self.query_cache.bump_version(str(db_path.parent))
+                stage_seconds["write"] += time.perf_counter() - stage_start
+                
+                chunk_count += len(batch)
+                position = batch[-1]["end"]
+                result["chunk_count"] += len(stored_chunks)
+                result["deduplicated_chunks"] += len(batch) - len(stored_chunks)
+                del batch, batch_document, vectors_by_hash, analyses_by_hash
+                
+                if on_batch is not None:
+                    await on_batch(chunk_count, position)
+        except Exception:
+            logger.warning(f"Streaming ingest of {filename} failed after {chunk_count} chunks; removing the partial document")
+            await self._drop_partial_document(db_path, document_id)
+            raise
+        finally:
+            chunks.close()
+        
+        if defer_enrichment and result["chunk_count"]:
+            self._schedule_enrichment(db_path)
+        
+        result["queued_jobs"] = result["chunk_count"] if defer_enrichment else 0
+        result["added_documents"].append({
+            "filename": filename,
+            "category": category,
+            "document_id": document_id,
+            "chunk_count": chunk_count,
+            "content_hash": content_hash
+        })
+        return result
+    
+    async def _drop_partial_document(self, db_path: Path, document_id: int):
+        """Remove a document whose streaming ingest did not finish, with the chunks only it used"""
+        
+        vector_matrix = await self._get_vector_matrix(db_path)
+        
+        def drop(conn):
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                chunk_ids = self._delete_unreferenced_chunks(cursor, self._unlink_documents(cursor, [document_id]))
+                self._delete_documents(cursor, [document_id])
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            # Tombstones only: the row layout (and with it the ANN index and codes) stays valid
+            vector_matrix.remove(chunk_ids)
+        
+        await self._get_connection_pool(db_path).write(drop, transaction=False)
+        self.query_cache.bump_version(str(db_path.parent))
+    
+    @staticmethod
+    def _scan_text_file(path: Path, read_size: int) -> Tuple[str, int, int]:
+        """Return (MD5 of the UTF-8 text, its size in bytes, its word count), reading read_size bytes at a time
+        
+        Decoding replaces invalid bytes as the chunker does, and the hash and counts match those
+        of the whole decoded text, so a streamed file is the same document as an in-memory copy.
+        """
+        
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        digest = hashlib.md5()
+        size_bytes = 0
+        word_count = 0
+        in_word = False  # whether the text so far ends inside a word
+        
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(read_size)
+                text = decoder.decode(block, final=not block)
+                if text:
+                    encoded = text.encode()
+                    digest.update(encoded)
+                    size_bytes += len(encoded)
+                    words = text.split()
+                    # A word cut by the block boundary was already counted
+                    word_count += len(words) - (1 if in_word and words and not text[0].isspace() else 0)
+                    in_word = not text[-1].isspace()
+                if not block:
+                    break
+        
+        return digest.hexdigest(), size_bytes, word_count
+    
+    def _write_ingest_batch(self, conn: sqlite3.Connection, new_documents: List[Dict[str, Any]], vectors_by_hash: Dict[str, np.ndarray], analyses_by_hash: Dict[str, List[Tuple[str, Dict[str, Any], float]]], vector_dtype: np.dtype, embedder: Embedder, queue_enrichment: bool = False) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Insert documents and their chunk references with one executemany per table in a single transaction
+        
+        Returns the chunks that were newly stored and their vectors, in chunk id order.
+        """
+        
+        if not new_documents:
+            return [], np.zeros((0, embedder.dim), dtype=np.float32)
+        
+        now = datetime.now(timezone.utc).isoformat()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Assign ids up front so rows can reference each other without per-row lastrowid
+            next_document_id = self._next_row_id(cursor, "documents")
+            
+            document_rows = []
+            for doc in new_documents:
+                doc["id"] = next_document_id
+                next_document_id += 1
+                
+                document_rows.append((
+                    doc["id"],
+                    doc["filename"],
+                    doc["content_hash"],
+                    doc["content"],
+                    doc["category"],
+                    len(doc["content"].encode()),
+                    len(doc["content"].split()),
+                    now,
+                    json.dumps({"original_metadata": doc["metadata"]})
+                ))
+            
+            cursor.executemany("""
+                INSERT INTO documents (id, filename, content_hash, content, category, size_bytes, word_count, added_at, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, document_rows)
+            
+            stored_chunks, stored_vectors = self._store_document_chunks(
+                cursor, new_documents, vectors_by_hash, analyses_by_hash, vector_dtype, embedder, queue_enrichment, now
+            )
+            
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        
+        return stored_chunks, stored_vectors
+    
+    def _store_document_chunks(self, cursor, documents: List[Dict[str, Any]], vectors_by_hash: Dict[str, np.ndarray], analyses_by_hash: Dict[str, List[Tuple[str, Dict[str, Any], float]]], vector_dtype: np.dtype, embedder: Embedder, queue_enrichment: bool, now: str) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Map each document's chunks onto the chunk store, inserting only text it does not hold yet
+        
+        Documents need "id" and "chunks" (and "first_chunk_index" when the chunks continue an
+        earlier batch of the same document). Chunks whose hash is stored already just gain a
+        reference; new ones are inserted with their vector and analyses (or an enrichment job).
+        Returns the newly stored chunks and their vectors, in chunk id order.
+        """
+        
+        chunk_ids = self._find_chunk_ids(cursor, [chunk["content_hash"] for doc in documents for chunk in doc["chunks"]])
+        next_chunk_id = self._next_row_id(cursor, "chunks")
+        
+        new_chunks = []
+        mapping_rows = []
+        references: Dict[int, int] = {}
+        for doc in documents:
+            # Streamed documents arrive in several batches; their chunk indexes continue across them
+            for i, chunk in enumerate(doc["chunks"], doc.get("first_chunk_index", 0)):
+                chunk_id = chunk_ids.get(chunk["content_hash"])
+                if chunk_id is None:
+                    chunk_id = chunk_ids[chunk["content_hash"]] = next_chunk_id
+                    next_chunk_id += 1
+                    chunk["document_id"] = doc["id"]
+                    new_chunks.append(chunk)
+                
+                chunk["id"] = chunk_id
+                mapping_rows.append((doc["id"], i, chunk_id, chunk["start"], chunk["end"]))
+                references[chunk_id] = references.get(chunk_id, 0) + 1
+        
+        # Text whose chunk was deleted after the caller looked its hash up has no vector yet
+        unembedded = [chunk for chunk in new_chunks if chunk["content_hash"] not in vectors_by_hash]
+        if unembedded:
+            vectors_by_hash = dict(vectors_by_hash)
+            vectors_by_hash.update(zip(
+                [chunk["content_hash"] for chunk in unembedded],
+                embedder.embed_batch([chunk["content"] for chunk in unembedded])
+            ))
+        
+        vectors = np.array([vectors_by_hash[chunk["content_hash"]] for chunk in new_chunks], dtype=np.float32).reshape(-1, embedder.dim)
+        
+        cursor.executemany("""
+            INSERT INTO chunks (id, content, content_hash, vector_embedding, ref_count, created_at)
+            VALUES (?, ?, ?, ?, 0, ?)
+        """, [
+            (chunk["id"], chunk["content"], chunk["content_hash"], self._encode_vector(vector, vector_dtype), now)
+            for chunk, vector in zip(new_chunks, vectors)
+        ])
+        
+        cursor.executemany("""
+            INSERT INTO document_chunks (document_id, chunk_index, chunk_id, start_position, end_position)
+            VALUES (?, ?, ?, ?, ?)
+        """, mapping_rows)
+        
+        if embedder.cacheable:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO embedding_cache (embedder, content_hash, vector) VALUES (?, ?, ?)",
+                [(embedder.version, chunk["content_hash"], self._encode_vector(vector, np.float32)) for chunk, vector in zip(new_chunks, vectors)]
+            )
+        
+        cursor.executemany(
+            "UPDATE chunks SET ref_count = ref_count + ? WHERE id = ?",
+            [(count, chunk_id) for chunk_id, count in references.items()]
+        )
+        
+        cursor.executemany("""
+            INSERT INTO cognitive_analysis (document_id, chunk_id, system_name, analysis_result, confidence_score, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (chunk["document_id"], chunk["id"], system_name, json.dumps(analysis_result), confidence, now)
+            for chunk in new_chunks
+            for system_name, analysis_result, confidence in analyses_by_hash.get(chunk["content_hash"], [])
+        ])
+        
+        if queue_enrichment:
+            cursor.executemany("""
+                INSERT INTO enrichment_jobs (document_id, chunk_id, status, created_at, updated_at)
+                VALUES (?, ?, 'pending', ?, ?)
+            """, [(chunk["document_id"], chunk["id"], now, now) for chunk in new_chunks])
+        
+        self._store_concept_graph(cursor, new_chunks, now)
+        
+        return new_chunks, vectors
+    
+    def _store_concept_graph(self, cursor, chunks: List[Dict[str, Any]], now: str):
+        """Add graph nodes and edges for newly stored chunks (needs "id", "content" and "document_id")
+        
+        Each chunk is a `chunk:<id>` node with a `mentions` edge to every concept extracted from
+        it (`concept:<key>` nodes, strength = the concept's weight in the chunk). The chunk's
+        strongest `graph_cooccurrence_concepts` concepts are linked pairwise, in both
+        directions, by `co_occurs` edges whose strength counts the chunks they share.
+        """
+        
+        if not chunks:
+            return
+        
+        chunk_nodes = []
+        concept_nodes: Dict[str, Tuple] = {}
+        mention_edges = []
+        cooccurrences: Dict[Tuple[str, str], int] = {}
+        for chunk in chunks:
+            chunk_node = f"chunk:{chunk['id']}"
+            chunk_nodes.append((chunk_node, "chunk", f"Chunk {chunk['id']}", chunk["document_id"], now))
+            
+            concepts = chunk.get("concepts")
+            if concepts is None:
+                concepts = self.concept_extractor.extract(chunk["content"])
+            for key, title, kind, weight in concepts:
+                concept_node = f"concept:{key}"
+                concept_nodes.setdefault(concept_node, (concept_node, kind, title, chunk["document_id"], now))
+                mention_edges.append((chunk_node, concept_node, weight, now))
+            
+            linked = [f"concept:{key}" for key, _, _, _ in concepts[:self.graph_cooccurrence_concepts]]
+            for pair in itertools.permutations(linked, 2):
+                cooccurrences[pair] = cooccurrences.get(pair, 0) + 1
+        
+        cursor.executemany("""
+            INSERT OR IGNORE INTO knowledge_nodes (node_id, node_type, title, source_document_id, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, chunk_nodes + list(concept_nodes.values()))
+        
+        cursor.executemany("""
+            INSERT OR IGNORE INTO knowledge_relationships (from_node_id, to_node_id, relationship_type, strength, created_at)
+            VALUES (?, ?, 'mentions', ?, ?)
+        """, mention_edges)
+        
+        cursor.executemany("""
+            INSERT INTO knowledge_relationships (from_node_id, to_node_id, relationship_type, strength, created_at)
+            VALUES (?, ?, 'co_occurs', ?, ?)
+            ON CONFLICT (from_node_id, relationship_type, to_node_id) DO UPDATE SET strength = strength + excluded.strength
+        """, [(from_node, to_node, count, now) for (from_node, to_node), count in cooccurrences.items()])
+    
+    def _extract_chunk_concepts(self, chunks: List[Dict[str, Any]]):
+        """Attach extracted concepts to chunks ahead of the write, keeping the extraction outside the write lock"""
+        
+        for chunk in chunks:
+            chunk["concepts"] = self.concept_extractor.extract(chunk["content"])
+    
+    def _delete_concept_graph(self, cursor, chunk_ids: List[int]):
+        """Remove deleted chunks from the graph, releasing their co-occurrences and orphaned concepts"""
+        
+        released: Dict[Tuple[str, str], int] = {}
+        touched_concepts = set()
+        for chunk_id in chunk_ids:
+            cursor.execute("""
+                SELECT to_node_id, strength FROM knowledge_relationships
+                WHERE from_node_id = ? AND relationship_type = 'mentions'
+            """, (f"chunk:{chunk_id}",))
+            # Same order as ConceptExtractor.extract (weight, then key), so the same pairs are released
+            mentions = sorted(cursor.fetchall(), key=lambda row: (-row[1], row[0]))
+            touched_concepts.update(concept_node for concept_node, _ in mentions)
+            
+            linked = [concept_node for concept_node, _ in mentions[:self.graph_cooccurrence_concepts]]
+            for pair in itertools.permutations(linked, 2):
+                released[pair] = released.get(pair, 0) + 1
+        
+        chunk_nodes = [(f"chunk:{chunk_id}",) for chunk_id in chunk_ids]
+        cursor.executemany("DELETE FROM knowledge_relationships WHERE from_node_id = ?", chunk_nodes)
+        cursor.executemany("DELETE FROM knowledge_nodes WHERE node_id = ?", chunk_nodes)
+        
+        cursor.executemany("""
+            UPDATE knowledge_relationships SET strength = strength - ?
+            WHERE from_node_id = ? AND relationship_type = 'co_occurs' AND to_node_id = ?
+        """, [(count, from_node, to_node) for (from_node, to_node), count in released.items()])
+        cursor.executemany("""
+            DELETE FROM knowledge_relationships
+            WHERE from_node_id = ? AND relationship_type = 'co_occurs' AND to_node_id = ? AND strength <= 0
+        """, list(released))
+        
+        # A concept no chunk mentions any more has no co-occurrences left either
+        cursor.executemany("""
+            DELETE FROM knowledge_nodes WHERE node_id = ? AND NOT EXISTS (
+                SELECT 1 FROM knowledge_relationships WHERE to_node_id = ? AND relationship_type = 'mentions'
+            )
+        """, [(concept_node, concept_node) for concept_node in touched_concepts])
+    
+    async def _replace_documents(self, db_path: Path, documents: List[Dict[str, Any]], enable_cognitive_analysis: bool, chunker: DocumentChunker, cognitive_concurrency: int, enrichment_mode: str = "inline") -> Dict[str, Any]:
+        """Re-point each stored document at its new chunks and apply the difference in one transaction
+        
+        Chunk text that is already in the chunk store (in this document or any other) keeps its
+        id, vector and cognitive analyses. Only new text is embedded and enriched; chunks no
+        document references any more are deleted (the FTS trigger keeps the keyword index in
+        step) and tombstoned in the vector matrix. Documents whose filename is not stored yet
+        are returned in `new_documents` for ingest.
+        """
+        
+        pool = self._get_connection_pool(db_path)
+        skipped_documents: List[str] = []
+        
+        parsed_documents = []
+        seen_filenames = set()
+        for doc in documents:
+            filename = doc.get("filename", "unknown")
+            content = doc.get("content", "")
+            if not content.strip() or filename in seen_filenames:
+                skipped_documents.append(filename)
+                continue
+            seen_filenames.add(filename)
+            parsed_documents.append({
+                "filename": filename,
+                "content": content,
+                "category": doc.get("category"),
+                "metadata": doc.get("metadata", {}),
+                "content_hash": hashlib.md5(content.encode()).hexdigest(),
+                "source": doc
+            })
+        
+        document_chunks = await pool.run(
+            lambda: [self._create_document_chunks(doc["content"], chunker) for doc in parsed_documents]
+        )
+        for doc, chunks in zip(parsed_documents, document_chunks):
+            doc["chunks"] = chunks
+            for chunk in chunks:
+                chunk["content_hash"] = hashlib.md5(chunk["content"].encode()).hexdigest()
+        
+        def load_stored_documents(conn):
+            cursor = conn.cursor()
+            stored = {}
+            for doc in parsed_documents:
+                cursor.execute(
+                    "SELECT id, content_hash, category, metadata FROM documents WHERE filename = ? ORDER BY id",
+                    (doc["filename"],)
+                )
+                document_rows = cursor.fetchall()
+                if document_rows:
+                    stored[doc["filename"]] = document_rows
+            
+            return (
+                stored,
+                self._find_existing_hashes(cursor, "documents", [doc["content_hash"] for doc in parsed_documents]),
+                self._find_existing_hashes(
+                    cursor, "chunks", [chunk["content_hash"] for doc in parsed_documents for chunk in doc["chunks"]]
+                )
+            )
+        
+        stored, existing_document_hashes, existing_chunk_hashes = await pool.read(load_stored_documents)
+        
+        new_documents = []
+        unchanged_documents = []
+        changes = []
+        for doc in parsed_documents:
+            if doc["filename"] not in stored:
+                new_documents.append(doc["source"])
+                continue
+            
+            document_rows = stored[doc["filename"]]
+            own_document_hashes = {row[1] for row in document_rows}
+            
+            if len(document_rows) == 1 and doc["content_hash"] in own_document_hashes:
+                unchanged_documents.append(doc["filename"])
+                continue
+            
+            if doc["content_hash"] in existing_document_hashes - own_document_hashes:
+                logger.warning(f"Document {doc['filename']} has the same content as another stored document")
+                skipped_documents.append(doc["filename"])
+                continue
+            
+            existing_document_hashes.add(doc["content_hash"])
+            target_row, extra_rows = document_rows[0], document_rows[1:]
+            doc["id"] = target_row[0]
+            changes.append({
+                "doc": doc,
+                "stored_category": target_row[2],
+                "stored_metadata": json.loads(target_row[3] or "{}"),
+                "extra_document_ids": [row[0] for row in extra_rows]
+            })
+        
+        # Only chunk text the store does not hold yet is embedded and enriched, once per distinct text
+        unique_chunks: Dict[str, Dict[str, Any]] = {}
+        for change in changes:
+            for chunk in change["doc"]["chunks"]:
+                if chunk["content_hash"] not in existing_chunk_hashes:
+                    unique_chunks.setdefault(chunk["content_hash"], chunk)
+        changed_chunks = list(unique_chunks.values())
+        
+        embedder = await self._get_kb_embedder(db_path)
+        vectors_by_hash = await self._embed_chunks(db_path, embedder, changed_chunks)
+        await pool.run(self._extract_chunk_concepts, changed_chunks)
+        
+        defer_enrichment = enable_cognitive_analysis and enrichment_mode == "deferred"
+        analyses_by_hash = {}
+        if enable_cognitive_analysis and not defer_enrichment:
+            analyses = await self._enrich_chunks([chunk["content"] for chunk in changed_chunks], cognitive_concurrency)
+            analyses_by_hash = dict(zip(unique_chunks, analyses))
+        
+        vector_matrix = await self._get_vector_matrix(db_path)
+        vector_dtype = await self._get_vector_dtype(db_path)
+        now = datetime.now(timezone.utc).isoformat()
+        
+        def apply_changes(conn):
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                extra_document_ids = [document_id for change in changes for document_id in change["extra_document_ids"]]
+                released_chunk_ids = self._unlink_documents(
+                    cursor, [change["doc"]["id"] for change in changes] + extra_document_ids
+                )
+                
+                for change in changes:
+                    doc = change["doc"]
+                    metadata = dict(change["stored_metadata"])
+                    if doc["metadata"]:
+                        metadata["original_metadata"] = doc["metadata"]
+                    metadata["updated_at"] = now
+                    
+                    cursor.execute("""
+                        UPDATE documents
+                        SET content = ?, content_hash = ?, category = ?, size_bytes = ?, word_count = ?, metadata = ?
+                        WHERE id = ?
+                    """, (
+                        doc["content"], doc["content_hash"], doc["category"] or change["stored_category"],
+                        len(doc["content"].encode()), len(doc["content"].split()), json.dumps(metadata), doc["id"]
+                    ))
+                
+                # Re-link before collecting garbage so chunks the new text still uses survive
+                stored_chunks, stored_vectors = self._store_document_chunks(
+                    cursor, [change["doc"] for change in changes], vectors_by_hash, analyses_by_hash,
+                    vector_dtype, embedder, defer_enrichment, now
+                )
+                removed_chunk_ids = self._delete_unreferenced_chunks(cursor, released_chunk_ids)
+                self._delete_documents(cursor, extra_document_ids)
+                
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            
+            # New chunk ids are above every stored id, so appending keeps matrix rows ordered
+            vector_matrix.remove(removed_chunk_ids)
+            vector_matrix.append([chunk["id"] for chunk in stored_chunks], stored_vectors)
+            return len(stored_chunks), len(removed_chunk_ids), len(extra_document_ids), self._compact_vector_matrix(vector_matrix)
+        
+        embedded_chunks, removed_chunks, removed_documents, compacted = 0, 0, 0, False
+        if changes:
+            embedded_chunks, removed_chunks, removed_documents, compacted = await pool.write(apply_changes, transaction=False)
+        
+        if defer_enrichment and embedded_chunks:
+            self._schedule_enrichment(db_path)
+        
+        return {
+            "new_documents": new_documents,
+            "replaced_documents": [change["doc"]["filename"] for change in changes],
+            "unchanged_documents": unchanged_documents,
+            "skipped_documents": skipped_documents,
+            "reused_chunks": sum(len(change["doc"]["chunks"]) for change in changes) - embedded_chunks,
+            "embedded_chunks": embedded_chunks,
+            "removed_chunks": removed_chunks,
+            "removed_documents": removed_documents,
+            "queued_jobs": embedded_chunks if defer_enrichment else 0,
+            "compacted": compacted
+        }
+    
+    def _unlink_documents(self, cursor, document_ids: List[int]) -> List[int]:
+        """Drop the documents' chunk references, returning the ids of chunks that lost one"""
+        
+        released: Dict[int, int] = {}
+        for document_id in document_ids:
+            cursor.execute("SELECT chunk_id FROM document_chunks WHERE document_id = ?", (document_id,))
+            for (chunk_id,) in cursor.fetchall():
+                released[chunk_id] = released.get(chunk_id, 0) + 1
+        
+        cursor.executemany("DELETE FROM document_chunks WHERE document_id = ?", [(document_id,) for document_id in document_ids])
+        cursor.executemany(
+            "UPDATE chunks SET ref_count = ref_count - ? WHERE id = ?",
+            [(count, chunk_id) for chunk_id, count in released.items()]
+        )
+        
+        return list(released)
+    
+    def _delete_unreferenced_chunks(self, cursor, chunk_ids: List[int], batch_size: int = 500) -> List[int]:
+        """Delete those of the given chunks that no document references any more, returning their ids"""
+        
+        orphaned = []
+        for start in range(0, len(chunk_ids), batch_size):
+            batch = chunk_ids[start:start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            cursor.execute(f"SELECT id FROM chunks WHERE ref_count <= 0 AND id IN ({placeholders})", batch)
+            orphaned.extend(row[0] for row in cursor.fetchall())
+        
+        orphaned.sort()
+        self._delete_chunks(cursor, orphaned)
+        return orphaned
+    
+    def _delete_chunks(self, cursor, chunk_ids: List[int]):
+        """Delete chunks with their analyses, enrichment jobs and graph nodes (the FTS trigger updates the keyword index)"""
+        
+        rows = [(chunk_id,) for chunk_id in chunk_ids]
+        self._delete_concept_graph(cursor, chunk_ids)
+        cursor.executemany("DELETE FROM cognitive_analysis WHERE chunk_id = ?", rows)
+        cursor.executemany("DELETE FROM enrichment_jobs WHERE chunk_id = ?", rows)
+        cursor.executemany("DELETE FROM chunks WHERE id = ?", rows)
+    
+    def _delete_documents(self, cursor, document_ids: List[int]):
+        """Delete unlinked document rows; analyses of chunks they introduced stay with the chunks"""
+        
+        rows = [(document_id,) for document_id in document_ids]
+        cursor.executemany("DELETE FROM cognitive_analysis WHERE document_id = ? AND chunk_id IS NULL", rows)
+        cursor.executemany("UPDATE cognitive_analysis SET document_id = NULL WHERE document_id = ?", rows)
+        cursor.executemany("UPDATE enrichment_jobs SET document_id = NULL WHERE document_id = ?", rows)
+        cursor.executemany("DELETE FROM documents WHERE id = ?", rows)
+    
+    def _compact_vector_matrix(self, vector_matrix: VectorMatrix) -> bool:
+        """Drop tombstoned rows once they make up enough of the matrix (call under the write lock)"""
+        
+        if vector_matrix.dead_count <= len(vector_matrix) * self.vector_compaction_ratio:
+            return False
+        
+        logger.info(f"Compacting vector matrix for {vector_matrix.vectors_dir.parent.name} ({vector_matrix.dead_count} removed rows)")
+        vector_matrix.compact()
+        
+        # The IVF lists and quantized codes refer to the old row layout; they are rebuilt on next sync
+        (vector_matrix.vectors_dir.parent / "ann_index.npz").unlink(missing_ok=True)
+        for derived_path in VectorQuantizer.derived_files(vector_matrix.vectors_dir):
+            derived_path.unlink(missing_ok=True)
+        return True
+    
+    def _find_existing_hashes(self, cursor, table: str, hashes: List[str], batch_size: int = 500) -> set:
+        """Return the subset of content hashes already stored in a table"""
+        
+        existing = set()
+        unique_hashes = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique_hashes), batch_size):
+            batch = unique_hashes[start:start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            cursor.execute(f"SELECT content_hash FROM {table} WHERE content_hash IN ({placeholders})", batch)
+            existing.update(row[0] for row in cursor.fetchall())
+        
+        return existing
+    
+    def _find_chunk_ids(self, cursor, hashes: List[str], batch_size: int = 500) -> Dict[str, int]:
+        """Map the given content hashes to the ids of the chunks that store them"""
+        
+        chunk_ids = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique_hashes), batch_size):
+            batch = unique_hashes[start:start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            cursor.execute(f"SELECT content_hash, id FROM chunks WHERE content_hash IN ({placeholders})", batch)
+            chunk_ids.update(cursor.fetchall())
+        
+        return chunk_ids
+    
+    def _next_row_id(self, cursor, table: str) -> int:
+        """Next AUTOINCREMENT id for a table (call inside the write transaction)"""
+        
+        cursor.execute(f"""
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0),
+                COALESCE((SELECT MAX(id) FROM {table}), 0)
+            ) + 1
+        """, (table,))
+        return cursor.fetchone()[0]
+    
+    def _create_document_chunks(self, content: str, chunker: Optional[DocumentChunker] = None) -> List[Dict[str, Any]]:
+        """Create overlapping chunks from document content"""
+        
+        chunker = chunker or self._get_chunker({})
+        return list(chunker.chunk_text(content))
+    
+    def _get_chunker(self, args: Dict[str, Any]) -> DocumentChunker:
+        """Build a chunker from per-call overrides of the tool's chunk settings"""
+        
+        return DocumentChunker(
+            chunk_size=args.get("chunk_size", self.chunk_size),
+            chunk_overlap=args.get("chunk_overlap", self.chunk_overlap),
+            unit=args.get("chunk_unit", self.chunk_unit)
+        )
+    
+    async def _get_kb_embedder(self, db_path: Path) -> Embedder:
+        """Return the embedder whose model and dimensionality match the vectors stored in the KB"""
+        
+        kb_key = str(db_path.parent)
+        embedder = self._embedders.get(kb_key)
+        if embedder is None:
+            stored_version, embedding_dim = await self._read_embedder_metadata(db_path)
+            metadata = await self._read_kb_metadata(db_path, ["embedder_backend", "embedding_model_path"])
+            embedder = await self._load_embedder(
+                metadata.get("embedder_backend", "hashing"), embedding_dim, metadata.get("embedding_model_path")
+            )
+            if stored_version != embedder.version:
+                logger.warning(
+                    f"Knowledge base {db_path.parent.name} has {stored_version or 'legacy'} embeddings "
+                    f"that do not match {embedder.version}; run the `reembed` operation"
+                )
+            self._embedders[kb_key] = embedder
+        
+        return embedder
+    
+    async def _load_embedder(self, backend: str, embedding_dim: int, model_path: Optional[str] = None) -> Embedder:
+        """Build the embedder for a backend name: "hashing", or "onnx" with a local model directory"""
+        
+        if backend == "hashing":
+            return HashingEmbedder(embedding_dim)
+        if backend != "onnx":
+            raise ValueError(f"Unsupported embedder: {backend}. Available: hashing, onnx")
+        
+        # A KB copied to another host falls back to that host's configured model directory
+        if (not model_path or not Path(model_path).expanduser().exists()) and self.embedding_model_path:
+            model_path = self.embedding_model_path
+        if not model_path:
+            raise ValueError("The onnx embedder needs embedding_model_path (or GURU_EMBEDDING_MODEL_PATH)")
+        
+        model_key = str(Path(model_path).expanduser().resolve())
+        if model_key not in self._onnx_embedders:
+            embedder = await asyncio.get_running_loop().run_in_executor(
+                self._db_executor, lambda: ONNXEmbedder(Path(model_key), batch_size=self.embedding_batch_size)
+            )
+            self._onnx_embedders.setdefault(model_key, embedder)
+        
+        return self._onnx_embedders[model_key]
+    
+    @staticmethod
+    def _embedder_backend(embedder: Embedder) -> str:
+        """Backend name recorded in KB metadata for an embedder"""
+        return "onnx" if isinstance(embedder, ONNXEmbedder) else "hashing"
+    
+    async def _embed_chunks(self, db_path: Path, embedder: Embedder, chunks: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Embed chunks on the KB's executor, keyed by content hash
+        
+        Vectors from cacheable embedders are looked up in the KB's embedding cache first, so
+        text that was embedded before (and since removed, or copied from a replica) is not
+        recomputed; the write stage stores the new ones.
+        """
+        
+        pool = self._get_connection_pool(db_path)
+        vectors_by_hash: Dict[str, np.ndarray] = {}
+        
+        if embedder.cacheable and chunks:
+            vectors_by_hash = await pool.read(
+                self._read_embedding_cache, embedder.version, [chunk["content_hash"] for chunk in chunks]
+            )
+        
+        missing = [chunk for chunk in chunks if chunk["content_hash"] not in vectors_by_hash]
+        if missing:
+            vectors = await pool.run(embedder.embed_batch, [chunk["content"] for chunk in missing])
+            vectors_by_hash.update(zip([chunk["content_hash"] for chunk in missing], vectors))
+        
+        return vectors_by_hash
+    
+    def _read_embedding_cache(self, conn: sqlite3.Connection, embedder_version: str, hashes: List[str], batch_size: int = 500) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the given content hashes"""
+        
+        cached = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique_hashes), batch_size):
+            batch = unique_hashes[start:start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT content_hash, vector FROM embedding_cache WHERE embedder = ? AND content_hash IN ({placeholders})",
+                [embedder_version] + batch
+            ).fetchall()
+            cached.update((content_hash, self._decode_vector(vector, np.float32)) for content_hash, vector in rows)
+        
+        return cached
+    
+    async def _read_embedder_metadata(self, db_path: Path) -> Tuple[Optional[str], int]:
+        """Read the embedder version and dimensionality recorded in the KB metadata table"""
+        
+        metadata = await self._read_kb_metadata(db_path, ["embedder", "embedding_dim"])
+        
+        return metadata.get("embedder"), int(metadata.get("embedding_dim", self.legacy_embedding_dim))
+    
+    async def resume_enrichment_jobs(self):
+        """Requeue deferred enrichment left over from a previous run and start the worker"""
+        
+        for kb_dir in self.knowledge_base_dir.iterdir():
+            db_path = kb_dir / "knowledge_base.db"
+            if not db_path.exists():
+                continue
+            
+            def requeue_jobs(conn):
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'enrichment_jobs'")
+                if not cursor.fetchone():
+                    return 0
+                # Jobs claimed by a worker that died are simply retried
+                cursor.execute("UPDATE enrichment_jobs SET status = 'pending' WHERE status = 'running'")
+                cursor.execute("SELECT COUNT(*) FROM enrichment_jobs WHERE status = 'pending'")
+                return cursor.fetchone()[0]
+            
+            try:
+                pending = await self._get_connection_pool(db_path).write(requeue_jobs)
+                if pending:
+                    logger.info(f"Resuming {pending} deferred enrichment jobs for {kb_dir.name}")
+                    self._schedule_enrichment(db_path)
+            except Exception as e:
+                logger.warning(f"Could not inspect enrichment jobs for {kb_dir.name}: {e}")
+    
+    def _schedule_enrichment(self, db_path: Path):
+        """Mark a KB as having pending jobs and make sure the background worker is running"""
+        
+        self._enrichment_queue.add(db_path)
+        if self._enrichment_task is None or self._enrichment_task.done():
+            self._enrichment_task = asyncio.get_running_loop().create_task(self._run_enrichment_worker())
+    
+    async def _run_enrichment_worker(self):
+        """Drain deferred enrichment jobs, one batch per knowledge base in turn, until all queues are empty"""
+        
+        failures: Dict[Path, int] = {}
+        while self._enrichment_queue:
+            for db_path in list(self._enrichment_queue):
+                try:
+                    processed = await self._process_enrichment_batch(db_path)
+                    failures.pop(db_path, None)
+                except Exception as e:
+                    logger.warning(f"Deferred enrichment failed for {db_path.parent.name}: {e}")
+                    # A failed batch goes back to pending, so keep retrying until its jobs run out of attempts
+                    failures[db_path] = failures.get(db_path, 0) + 1
+                    processed = 0 if failures[db_path] >= self.enrichment_max_attempts else 1
+                
+                if processed == 0:
+                    self._enrichment_queue.discard(db_path)
+    
+    async def _process_enrichment_batch(self, db_path: Path) -> int:
+        """Claim a batch of pending jobs, analyse their chunks and store the results"""
+        
+        if not db_path.exists():
+            return 0
+        
+        pool = self._get_connection_pool(db_path)
+        
+        def claim_jobs(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT j.id, j.document_id, j.chunk_id, j.attempts, c.content
+                FROM enrichment_jobs j
+                JOIN chunks c ON c.id = j.chunk_id
+                WHERE j.status = 'pending'
+                ORDER BY j.id
+                LIMIT ?
+            """, (self.enrichment_batch_size,))
+            jobs = cursor.fetchall()
+            cursor.executemany(
+                "UPDATE enrichment_jobs SET status = 'running' WHERE id = ?",
+                [(job[0],) for job in jobs]
+            )
+            return jobs
+        
+        jobs = await pool.write(claim_jobs)
+        
+        if not jobs:
+            return 0
+        
+        stats = self._enrichment_stats.setdefault(str(db_path.parent), {"completed": 0, "failed": 0, "seconds": 0.0})
+        start_time = time.perf_counter()
+        try:
+            finished, failed = await self._enrich_claimed_jobs(pool, jobs)
+        except Exception as e:
+            # Claimed jobs would otherwise sit in 'running' until a restart; release them for a retry instead
+            failed = await pool.write(self._release_enrichment_jobs, jobs, str(e) or type(e).__name__)
+            stats["failed"] += failed
+            raise
+        
+        stats["completed"] += finished
+        stats["failed"] += failed
+        stats["seconds"] += time.perf_counter() - start_time
+        
+        return len(jobs)
+    
+    async def _enrich_claimed_jobs(self, pool, jobs: List[Tuple]) -> Tuple[int, int]:
+        """Analyse claimed jobs' chunks and store the results, returning how many jobs finished and failed"""
+        
+        analyses = await self._enrich_chunks([job[4] for job in jobs], self.cognitive_concurrency)
+        now = datetime.now(timezone.utc).isoformat()
+        
+        analysis_rows = []
+        finished_jobs = []
+        retried_jobs = []
+        failed_jobs = []
+        for (job_id, document_id, chunk_id, attempts, _), chunk_analyses in zip(jobs, analyses):
+            if chunk_analyses:
+                analysis_rows.extend(
+                    (document_id, chunk_id, system_name, json.dumps(analysis_result), confidence, now)
+                    for system_name, analysis_result, confidence in chunk_analyses
+                )
+                finished_jobs.append((job_id,))
+            elif attempts + 1 >= self.enrichment_max_attempts:
+                failed_jobs.append(("cognitive analysis returned no results", now, job_id))
+            else:
+                retried_jobs.append(("cognitive analysis returned no results", now, job_id))
+        
+        def store_results(conn):
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO cognitive_analysis (document_id, chunk_id, system_name, analysis_result, confidence_score, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, analysis_rows)
+            cursor.executemany("DELETE FROM enrichment_jobs WHERE id = ?", finished_jobs)
+            cursor.executemany("""
+                UPDATE enrichment_jobs SET status = 'pending', attempts = attempts + 1, last_error = ?, updated_at = ?
+                WHERE id = ?
+            """, retried_jobs)
+            cursor.executemany("""
+                UPDATE enrichment_jobs SET status = 'failed', attempts = attempts + 1, last_error = ?, updated_at = ?
+                WHERE id = ?
+            """, failed_jobs)
+        
+        await pool.write(store_results)
+        
+        return len(finished_jobs), len(failed_jobs)
+    
+    def _release_enrichment_jobs(self, conn, jobs: List[Tuple], error: str) -> int:
+        """Return claimed jobs to 'pending' after a failed batch, or fail those out of attempts; returns the failed count"""
+        
+        now = datetime.now(timezone.utc).isoformat()
+        exhausted = {job[0] for job in jobs if job[3] + 1 >= self.enrichment_max_attempts}
+        cursor = conn.cursor()
+        cursor.executemany("""
+            UPDATE enrichment_jobs SET status = ?, attempts = attempts + 1, last_error = ?, updated_at = ?
+            WHERE id = ? AND status = 'running'
+        """, [("failed" if job[0] in exhausted else "pending", error, now, job[0]) for job in jobs])
+        return len(exhausted)
+    
+    async def _enrich_chunks(self, contents: List[str], concurrency: int) -> List[List[Tuple[str, Dict[str, Any], float]]]:
+        """Run cognitive analysis over many chunks with at most `concurrency` bridge calls in flight"""
+        
+        concurrency = max(1, concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        analyses: List[List[Tuple[str, Dict[str, Any], float]]] = [[] for _ in contents]
+        pending = iter(range(len(contents)))
+        
+        # A fixed pool of workers pulls chunk indexes, so huge documents don't spawn one task per chunk
+        async def worker():
+            for index in pending:
+                analyses[index] = await self._apply_cognitive_analysis_to_chunk(contents[index], semaphore)
+        
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(contents)))))
+        
+        return analyses
+    
+    async def _apply_cognitive_analysis_to_chunk(self, content: str, semaphore: Optional[asyncio.Semaphore] = None) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Apply Guru's cognitive systems to analyze a chunk, returning (system, result, confidence) rows"""
+        
+        semaphore = semaphore or asyncio.Semaphore(2)
+        
+        async def harmonic_analysis():
+            async with semaphore:
+                result = await self.core_bridge.invoke_harmonic_analyzer(content, "surface")
+            return "harmonic_analysis", result, result.get("analysis_confidence", 0.8)
+        
+        async def quantum_synthesis():
+            async with semaphore:
+                result = await self.core_bridge.invoke_quantum_synthesizer(
+                    f"Extract key insights from text chunk", [content[:500]]
+                )
+            return "quantum_synthesis", result, result.get("synthesis_confidence", 0.8)
+        
+        # The two systems are independent, so run them side by side
+        systems = [harmonic_analysis()]
+        if len(content) > 200:  # Quantum synthesis only for substantial chunks
+            systems.append(quantum_synthesis())
+        
+        analyses = []
+        for outcome in await asyncio.gather(*systems, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                logger.warning(f"Cognitive analysis failed for chunk: {outcome}")
+            else:
+                analyses.append(outcome)
+        
+        return analyses
+    
+    async def _query_knowledge_base(self, args: Dict[str, Any]) -> str:
+        """Query the knowledge base using RAG"""
+        kb_name = args.get("knowledge_base_name", "")
+        query = args.get("query", "")
+        max_results = args.get("max_results", self.max_retrieval_chunks)
+        include_cognitive_insights = args.get("include_cognitive_insights", True)
+        response_mode = args.get("response_mode", "comprehensive")  # comprehensive, concise, analytical
+        search_mode = args.get("search_mode", "hybrid")  # hybrid, exact, ann
+        nprobe = args.get("nprobe", self.ann_nprobe)
+        graph_hops = args.get("graph_hops", 0)  # concept-graph expansion of the top hits (0 = off)
+        use_cache = args.get("use_cache", True)
+        
+        kb_names = args.get("knowledge_base_names") or []
+        
+        if not (kb_name or kb_names) or not query:
+            return "## Error\n\nKnowledge base name and query are required"
+        
+        if graph_hops not in range(self.max_graph_hops + 1):
+            return f"## Error\n\ngraph_hops must be between 0 and {self.max_graph_hops}"
+        
+        try:
+            filters = self._parse_query_filters(args)
+        except ValueError as e:
+            return f"## Error\n\n{e}"
+        
+        # Several KBs (or a glob over KB names) are searched together
+        if kb_names or self._is_kb_pattern(kb_name):
+            return await self._federated_query(([kb_name] if kb_name else []) + list(kb_names), args, filters)
+        
+        # Load knowledge base
+        kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
+        if not kb_config:
+            return f"## Error\n\nKnowledge base '{kb_name}' not found"
+        
+        db_path = kb_path / "knowledge_base.db"
+        
+        # Repeated queries against unchanged content are served from the cache
+        self.query_cache.max_entries = self.query_cache_size
+        cache_key = self.query_cache.key(
+            str(kb_path), query, max_results, response_mode, search_mode, nprobe, include_cognitive_insights,
+            tuple(sorted(filters.items())), graph_hops
+        )
+        cached = self.query_cache.get(cache_key) if use_cache else None
+        if cached and "response" in cached:
+            return cached["response"]
+        
+        # Retrieve relevant chunks
+        if cached:
+            relevant_chunks = cached["chunks"]
+        else:
+            relevant_chunks = await self._retrieve_relevant_chunks(
+                db_path, query, max_results, search_mode, nprobe, self._vector_quantization(kb_config), filters, graph_hops
+            )
+        
+        if not relevant_chunks:
+            if use_cache and not cached:
+                self.query_cache.put(cache_key, {"chunks": relevant_chunks})
+            filter_hint = "\n4. Loosening the category, filename or date filters" if filters else ""
+            return f"""## 🔍 No Relevant Information Found
+
+**Query:** {query}
+**Knowledge Base:** {kb_name}{self._describe_query_filters(filters)}
+
+No relevant information was found in the knowledge base. Try:
+1. Using different keywords
+2. Adding more documents to the knowledge base
+3. Using broader search terms{filter_hint}"""
+        
+        # Sources go out first; the answer follows once generation finishes
+        await self._report_retrieved_sources(kb_name, relevant_chunks)
+        
+        # Generate response using retrieved context
+        kb_totals = (await self._read_kb_stats(db_path))["totals"]
+        response = await self._generate_rag_response(
+            query, relevant_chunks, dict(kb_config, document_count=kb_totals["documents"], chunk_count=kb_totals["chunks"]),
+            include_cognitive_insights, response_mode
+        )
+        await self._report_progress(2, 2, "Answer generated")
+        
+        if use_cache:
+            entry = {"chunks": relevant_chunks}
+            if self.cache_rag_responses:
+                entry["response"] = response
+            self.query_cache.put(cache_key, entry)
+        
+        return response
+    
+    async def _federated_query(self, kb_patterns: List[str], args: Dict[str, Any], filters: Dict[str, Any]) -> str:
+        """Query several knowledge bases at once and answer from their merged top results
+        
+        Each KB is searched concurrently on its own connection pool; the per-KB results are
+        re-scored on a common scale and merged into one global top-k before a single
+        response is generated over the combined context.
+        """
+        query = args.get("query", "")
+        max_results = args.get("max_results", self.max_retrieval_chunks)
+        include_cognitive_insights = args.get("include_cognitive_insights", True)
+        response_mode = args.get("response_mode", "comprehensive")
+        search_mode = args.get("search_mode", "hybrid")
+        nprobe = args.get("nprobe", self.ann_nprobe)
+        graph_hops = args.get("graph_hops", 0)
+        use_cache = args.get("use_cache", True)
+        
+        knowledge_bases, unmatched = await self._resolve_knowledge_bases(kb_patterns)
+        if not knowledge_bases:
+            return f"## Error\n\nNo knowledge bases match: {', '.join(kb_patterns)}"
+        
+        self.query_cache.max_entries = self.query_cache_size
+        
+        async def retrieve(kb_config: Dict[str, Any], kb_path: Path) -> List[Dict[str, Any]]:
+            # Per-KB candidates are cached under that KB's content version
+            cache_key = self.query_cache.key(
+                str(kb_path), query, max_results, search_mode, nprobe, "federated", tuple(sorted(filters.items())), graph_hops
+            )
+            cached = self.query_cache.get(cache_key) if use_cache else None
+            if cached:
+                return cached["chunks"]
+            
+            chunks = await self._retrieve_relevant_chunks(
+                kb_path / "knowledge_base.db", query, max_results, search_mode, nprobe, self._vector_quantization(kb_config), filters, graph_hops
+            )
+            if use_cache:
+                self.query_cache.put(cache_key, {"chunks": chunks})
+            return chunks
+        
+        results = await asyncio.gather(
+            *(retrieve(kb_config, kb_path) for kb_config, kb_path in knowledge_bases), return_exceptions=True
+        )
+        
+        per_kb_results = []
+        failed_kbs = []
+        for (kb_config, _), chunks in zip(knowledge_bases, results):
+            if isinstance(chunks, Exception):
+                logger.warning(f"Federated query skipped {kb_config['name']}: {chunks}")
+                failed_kbs.append(kb_config["name"])
+            else:
+                per_kb_results.append((kb_config["name"], chunks))
+        
+        relevant_chunks = self._merge_federated_chunks(per_kb_results, max_results)
+        kb_label = ", ".join(kb_config["name"] for kb_config, _ in knowledge_bases)
+        
+        if not relevant_chunks:
+            return f"""## 🔍 No Relevant Information Found
+
+**Query:** {query}
+**Knowledge Bases:** {kb_label}{self._describe_query_filters(filters)}
+
+No relevant information was found in these knowledge bases. Try:
+1. Using different keywords
+2. Adding more documents to the knowledge bases
+3. Using broader search terms"""
+        
+        await self._report_retrieved_sources(kb_label, relevant_chunks)
+        
+        # One response over the merged context, with totals across every searched KB
+        kb_stats = await asyncio.gather(
+            *(self._read_kb_stats(kb_path / "knowledge_base.db") for _, kb_path in knowledge_bases), return_exceptions=True
+        )
+        kb_totals = [stats["totals"] for stats in kb_stats if not isinstance(stats, Exception)]
+        federated_config = {
+            "name": kb_label,
+            "document_count": sum(totals["documents"] for totals in kb_totals),
+            "chunk_count": sum(totals["chunks"] for totals in kb_totals)
+        }
+        response = await self._generate_rag_response(
+            query, relevant_chunks, federated_config, include_cognitive_insights, response_mode
+        )
+        await self._report_progress(2, 2, "Answer generated")
+        
+        hits_per_kb = {}
+        for chunk in relevant_chunks:
+            hits_per_kb[chunk["knowledge_base"]] = hits_per_kb.get(chunk["knowledge_base"], 0) + 1
+        
+        response += f"\n\n### 🗂️ Federated Search\n- **Knowledge Bases Searched:** {len(per_kb_results)}"
+        for kb_name, chunks in per_kb_results:
+            response += f"\n- **{kb_name}:** {hits_per_kb.get(kb_name, 0)} of top {len(relevant_chunks)} ({len(chunks)} candidates)"
+        if failed_kbs:
+            response += f"\n- **Unavailable:** {', '.join(failed_kbs)}"
+        if unmatched:
+            response += f"\n- **Not Found:** {', '.join(unmatched)}"
+        
+        return response
+    
+    def _merge_federated_chunks(self, per_kb_results: List[Tuple[str, List[Dict[str, Any]]]], max_results: int) -> List[Dict[str, Any]]:
+        """Re-score per-KB results on one scale and keep the global top-k with a bounded heap
+        
+        Each KB normalises BM25 against its own best candidate, which would let a weak keyword
+        match in one KB outrank a strong one in another; here BM25 is normalised against the
+        best raw score across all KBs before being fused with the (already comparable) cosine.
+        Graph-expanded chunks are kept, after the merged hits, only when their seed hit made
+        it into the global top-k.
+        """
+        
+        max_keyword_score = max(
+            (chunk["keyword_bm25"] for _, chunks in per_kb_results for chunk in chunks if "graph_hop" not in chunk), default=0.0
+        )
+        
+        heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        sequence = 0
+        for kb_name, chunks in per_kb_results:
+            for chunk in chunks:
+                if "graph_hop" in chunk:
+                    continue
+                keyword_score = chunk["keyword_bm25"] / max_keyword_score if max_keyword_score > 0 else 0.0
+                score = (chunk["vector_similarity"] * 0.7) + (keyword_score * 0.3)
+                if score <= 0.1:
+                    continue
+                
+                entry = (score, sequence, dict(chunk, knowledge_base=kb_name, score=score, keyword_score=keyword_score))
+                sequence += 1
+                if len(heap) < max_results:
+                    heapq.heappush(heap, entry)
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, entry)
+        
+        merged = [chunk for _, _, chunk in sorted(heap, key=lambda entry: (-entry[0], entry[1]))]
+        
+        seeds = {(chunk["knowledge_base"], chunk["chunk_id"]) for chunk in merged}
+        expanded = [
+            dict(chunk, knowledge_base=kb_name)
+            for kb_name, chunks in per_kb_results
+            for chunk in chunks
+            if "graph_hop" in chunk and (kb_name, chunk["graph_seed"]) in seeds
+        ]
+        expanded.sort(key=lambda chunk: chunk["score"], reverse=True)
+        
+        return merged + expanded[:max_results]
+    
+    async def _resolve_knowledge_bases(self, kb_patterns: List[str]) -> Tuple[List[Tuple[Dict[str, Any], Path]], List[str]]:
+        """Resolve KB names and glob patterns to (config, path) pairs, each KB once
+        
+        Also returns the names and patterns that matched no knowledge base.
+        """
+        
+        self._refresh_kb_registry()
+        
+        knowledge_bases = {}
+        unmatched = []
+        for pattern in dict.fromkeys(kb_patterns):
+            if self._is_kb_pattern(pattern):
+                kb_names = sorted(name for name in self._kb_registry if fnmatch.fnmatchcase(name, pattern))
+            else:
+                kb_names = [pattern]
+            
+            matched = False
+            for kb_name in kb_names:
+                kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
+                if kb_config:
+                    matched = True
+                    knowledge_bases.setdefault(kb_path, kb_config)
+            
+            if not matched:
+                unmatched.append(pattern)
+        
+        return [(kb_config, kb_path) for kb_path, kb_config in knowledge_bases.items()], unmatched
+    
+    @staticmethod
+    def _is_kb_pattern(kb_name: str) -> bool:
+        """Whether a knowledge base name is a glob pattern (e.g. "docs-*")"""
+        return any(char in kb_name for char in "*?[")
+    
+    async def _retrieve_relevant_chunks(self, db_path: Path, query: str, max_results: int, search_mode: str = "hybrid", nprobe: Optional[int] = None, quantization: Optional[str] = None, filters: Optional[Dict[str, Any]] = None, graph_hops: int = 0) -> List[Dict[str, Any]]:
+        """Retrieve relevant chunks by fusing BM25 keyword scores with vector similarity
+        
+        In hybrid mode the FTS5 index supplies the candidates and the vector matrix only
+        reranks them; exact/ann modes take vector candidates and look up their BM25 scores.
+        With quantization, vector candidates are scored on the KB's compressed codes and
+        only the shortlist is rescored from the float matrix.
+        
+        Metadata filters are resolved to chunk ids through the indexed documents table before
+        any scoring: the FTS match is restricted to them and the vector scan only reads their
+        matrix rows, so a selective filter makes the query cheaper. Filtered vector searches
+        scan their rows directly instead of probing the IVF index.
+        
+        With graph_hops, the top hits are followed by up to max_results chunks reached through
+        the concept graph (see `_expand_graph_neighbours`), each marked with its `graph_hop`.
+        """
+        
+        vector_matrix = await self._get_vector_matrix(db_path)
+        embedder = await self._get_kb_embedder(db_path)
+        query_embedding = await self._get_connection_pool(db_path).run(embedder.embed, query)
+        candidate_count = max(max_results * self.candidate_multiplier, self.max_retrieval_chunks)
+        match_expression = self._build_fts_query(query)
+        
+        filter_clause, filter_params = self._document_filter_sql(filters or {})
+        filtered_chunks_sql = f"""
+            SELECT dc.chunk_id FROM documents d
+            JOIN document_chunks dc ON dc.document_id = d.id
+            WHERE {filter_clause}
+        """
+        
+        ann_index = None
+        if search_mode == "ann" and not filters:
+            await self._sync_ann_index(db_path)
+            ann_index = self._get_ann_index(db_path, vector_matrix.dim)
+        
+        quantizer = None
+        if quantization:
+            await self._sync_vector_quantizer(db_path, quantization)
+            quantizer = self._get_vector_quantizer(db_path, vector_matrix.dim, quantization)
+            if not quantizer.is_trained:
+                quantizer = None
+        
+        def search(conn):
+            cursor = conn.cursor()
+            # One snapshot for every matrix lookup below, so rows and ids cannot drift apart mid-query
+            vectors = vector_matrix.snapshot()
+            
+            # bm25() is lower-is-better, so negate it into a positive relevance score
+            keyword_scores: Dict[int, float] = {}
+            if search_mode == "hybrid" and match_expression:
+                if filters:
+                    cursor.execute(f"""
+                        SELECT rowid, bm25(chunks_fts) FROM chunks_fts
+                        WHERE chunks_fts MATCH ? AND rowid IN ({filtered_chunks_sql})
+                        ORDER BY rank
+                        LIMIT ?
+                    """, [match_expression] + filter_params + [candidate_count])
+                else:
+                    cursor.execute("""
+                        SELECT rowid, bm25(chunks_fts) FROM chunks_fts
+                        WHERE chunks_fts MATCH ?
+                        ORDER BY rank
+                        LIMIT ?
+                    """, (match_expression, candidate_count))
+                keyword_scores = {rowid: -score for rowid, score in cursor.fetchall()}
+            
+            if keyword_scores:
+                candidate_ids = np.array(sorted(keyword_scores), dtype=np.int64)
+                candidate_similarities = vectors.similarities(candidate_ids, query_embedding)
+            else:
+                if filters:
+                    # Only the matrix rows of matching chunks are scored
+                    cursor.execute(filtered_chunks_sql, filter_params)
+                    filtered_rows = vectors.live_rows(np.fromiter((row[0] for row in cursor), dtype=np.int64))
+                    if quantizer is not None:
+                        candidate_ids, candidate_similarities = quantizer.search(
+                            vectors, query_embedding, candidate_count, self.quantization_rerank_factor, rows=filtered_rows
+                        )
+                    else:
+                        candidate_ids, candidate_similarities = vectors.search(query_embedding, candidate_count, rows=filtered_rows)
+                elif ann_index is not None:
+                    candidate_ids, candidate_similarities = ann_index.search(
+                        vectors, query_embedding, candidate_count, nprobe or self.ann_nprobe,
+                        quantizer, self.quantization_rerank_factor
+                    )
+                elif quantizer is not None:
+                    candidate_ids, candidate_similarities = quantizer.search(
+                        vectors, query_embedding, candidate_count, self.quantization_rerank_factor
+                    )
+                else:
+                    candidate_ids, candidate_similarities = self._exact_vector_search(vector_matrix, vectors, query_embedding, candidate_count)
+                
+                if match_expression and len(candidate_ids):
+                    placeholders = ",".join("?" * len(candidate_ids))
+                    cursor.execute(f"""
+                        SELECT rowid, bm25(chunks_fts) FROM chunks_fts
+                        WHERE chunks_fts MATCH ? AND rowid IN ({placeholders})
+                    """, [match_expression] + [int(chunk_id) for chunk_id in candidate_ids])
+                    keyword_scores = {rowid: -score for rowid, score in cursor.fetchall()}
+            
+            if len(candidate_ids) == 0:
+                return candidate_ids, candidate_similarities, keyword_scores, {}
+            
+            return candidate_ids, candidate_similarities, keyword_scores, self._fetch_chunk_rows(cursor, candidate_ids.tolist(), filters)
+        
+        # Scoring and row lookups run on a pooled reader, so queries proceed while a writer ingests
+        candidate_ids, candidate_similarities, keyword_scores, chunk_rows = await self._get_connection_pool(db_path).read(search)
+        
+        if len(candidate_ids) == 0:
+            return []
+        
+        # Normalise BM25 into [0, 1] against the best candidate so it can be fused with cosine
+        max_keyword_score = max(keyword_scores.values(), default=0.0)
+        
+        scored_chunks = []
+        for chunk_id, vector_similarity in zip(candidate_ids.tolist(), candidate_similarities.tolist()):
+            if chunk_id not in chunk_rows:
+                continue
+            
+            _, content, doc_id, filename, category = chunk_rows[chunk_id]
+            keyword_score = keyword_scores.get(chunk_id, 0.0) / max_keyword_score if max_keyword_score > 0 else 0.0
+            
+            # Combined score
+            combined_score = (vector_similarity * 0.7) + (keyword_score * 0.3)
+            
+            if combined_score > 0.1:  # Basic threshold
+                scored_chunks.append({
+                    "chunk_id": chunk_id,
+                    "content": content,
+                    "document_id": doc_id,
+                    "filename": filename,
+                    "category": category,
+                    "score": combined_score,
+                    "vector_similarity": vector_similarity,
+                    "keyword_score": keyword_score,
+                    "keyword_bm25": keyword_scores.get(chunk_id, 0.0)
+                })
+        
+        # Sort by score and return top results
+        scored_chunks.sort(key=lambda x: x["score"], reverse=True)
+        top_chunks = scored_chunks[:max_results]
+        
+        if graph_hops and top_chunks:
+            top_chunks += await self._expand_graph_neighbours(
+                db_path, vector_matrix, query_embedding, top_chunks, graph_hops, max_results, filters
+            )
+        
+        return top_chunks
+    
+    def _exact_vector_search(self, vector_matrix: VectorMatrix, vectors: VectorSnapshot, query_embedding: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Unfiltered exact top-k; a matrix spanning several shards is scanned by the process pool
+        
+        Workers read the files directly; if a write swaps them mid-scan the search falls back
+        to the in-process scan of `vectors`.
+        """
+        
+        searcher = self._get_sharded_searcher()
+        if searcher.should_shard(vectors):
+            try:
+                return searcher.search(vector_matrix, query_embedding, top_k)
+            except Exception as e:
+                logger.warning(f"Sharded vector search failed, scanning in-process: {e}")
+        
+        return vectors.search(query_embedding, top_k)
+    
+    def _get_sharded_searcher(self) -> ShardedSearcher:
+        """Shared searcher, rebuilt (with a fresh pool) if the shard size or process count setting changed"""
+        
+        with self._sharded_searcher_lock:
+            searcher = self._sharded_searcher
+            if searcher is None or (searcher.shard_rows, searcher.processes) != (self.vector_shard_rows, self.vector_search_processes):
+                if searcher is not None:
+                    searcher.close()
+                searcher = self._sharded_searcher = ShardedSearcher(self.vector_shard_rows, processes=self.vector_search_processes)
+            return searcher
+    
+    def _fetch_chunk_rows(self, cursor, chunk_ids: List[int], filters: Optional[Dict[str, Any]]) -> Dict[int, Tuple]:
+        """Look up (chunk id, content, document id, filename, category) rows for chunks passing the filters
+        
+        A chunk shared by several documents is attributed to the earliest (matching) one.
+        """
+        
+        if not chunk_ids:
+            return {}
+        
+        placeholders = ",".join("?" * len(chunk_ids))
+        document_filter, document_params = self._document_filter_sql(filters or {}, alias="fd")
+        cursor.execute(f"""
+            SELECT c.id, c.content, d.id, d.filename, d.category
+            FROM chunks c
+            JOIN documents d ON d.id = (
+                SELECT MIN(fdc.document_id) FROM document_chunks fdc
+                JOIN documents fd ON fd.id = fdc.document_id
+                WHERE fdc.chunk_id = c.id AND {document_filter}
+            )
+            WHERE c.id IN ({placeholders})
+        """, document_params + [int(chunk_id) for chunk_id in chunk_ids])
+        
+        return {row[0]: row for row in cursor.fetchall()}
+    
+    async def _expand_graph_neighbours(self, db_path: Path, vector_matrix: VectorMatrix, query_embedding: np.ndarray, seeds: List[Dict[str, Any]], graph_hops: int, max_results: int, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Chunks linked to the seed hits through shared concepts, up to graph_hops concept hops away
+        
+        Hop 1 follows seed → concept → other chunks mentioning it; hop 2 first steps from each
+        concept to its strongest co-occurring concepts. Every step is an indexed range scan of
+        one node's edges capped at `graph_fanout`, so the cost grows with the degree of the
+        nodes touched rather than with the size of the graph. A reached chunk scores its best
+        path: seed score × mention strengths × `graph_hop_decay` per hop.
+        """
+        
+        seed_ids = {chunk["chunk_id"] for chunk in seeds}
+        fanout = self.graph_fanout
+        decay = self.graph_hop_decay
+        
+        def expand(conn):
+            cursor = conn.cursor()
+            
+            # concept node → (weight, hop, seed chunk id)
+            concepts: Dict[str, Tuple[float, int, int]] = {}
+            for seed in seeds:
+                cursor.execute("""
+                    SELECT to_node_id, strength FROM knowledge_relationships
+                    WHERE from_node_id = ? AND relationship_type = 'mentions'
+                """, (f"chunk:{seed['chunk_id']}",))
+                for concept_node, strength in cursor.fetchall():
+                    weight = seed["score"] * strength
+                    if weight > concepts.get(concept_node, (0.0,))[0]:
+                        concepts[concept_node] = (weight, 1, seed["chunk_id"])
+            
+            frontier = heapq.nlargest(fanout, concepts.items(), key=lambda item: item[1][0])
+            if graph_hops >= 2:
+                for concept_node, (weight, _, seed_id) in frontier:
+                    cursor.execute("""
+                        SELECT to_node_id, strength FROM knowledge_relationships
+                        WHERE from_node_id = ? AND relationship_type = 'co_occurs'
+                        ORDER BY strength DESC LIMIT ?
+                    """, (concept_node, fanout))
+                    neighbours = cursor.fetchall()
+                    if not neighbours:
+                        continue
+                    top_strength = neighbours[0][1]
+                    for neighbour, strength in neighbours:
+                        neighbour_weight = weight * decay * strength / top_strength
+                        if neighbour_weight > concepts.get(neighbour, (0.0,))[0]:
+                            concepts[neighbour] = (neighbour_weight, 2, seed_id)
+                frontier = heapq.nlargest(fanout, concepts.items(), key=lambda item: item[1][0])
+            
+            # chunk id → (score, hop, seed chunk id, concept node)
+            reached: Dict[int, Tuple[float, int, int, str]] = {}
+            for concept_node, (weight, hop, seed_id) in frontier:
+                cursor.execute("""
+                    SELECT from_node_id, strength FROM knowledge_relationships
+                    WHERE to_node_id = ? AND relationship_type = 'mentions'
+                    ORDER BY strength DESC LIMIT ?
+                """, (concept_node, fanout + len(seed_ids)))
+                for chunk_node, strength in cursor.fetchall():
+                    chunk_id = int(chunk_node.split(":", 1)[1])
+                    score = weight * decay * strength
+                    if chunk_id not in seed_ids and score > reached.get(chunk_id, (0.0,))[0]:
+                        reached[chunk_id] = (score, hop, seed_id, concept_node)
+            
+            best = heapq.nlargest(max_results, reached.items(), key=lambda item: item[1][0])
+            chunk_rows = self._fetch_chunk_rows(cursor, [chunk_id for chunk_id, _ in best], filters)
+            
+            titles = {}
+            for concept_node in {path[3] for _, path in best}:
+                cursor.execute("SELECT title FROM knowledge_nodes WHERE node_id = ?", (concept_node,))
+                row = cursor.fetchone()
+                titles[concept_node] = row[0] if row else concept_node.split(":", 1)[1]
+            
+            return best, chunk_rows, titles
+        
+        best, chunk_rows, titles = await self._get_connection_pool(db_path).read(expand)
+        best = [(chunk_id, path) for chunk_id, path in best if chunk_id in chunk_rows]
+        if not best:
+            return []
+        
+        similarities = vector_matrix.similarities(np.array([chunk_id for chunk_id, _ in best], dtype=np.int64), query_embedding)
+        
+        expanded = []
+        for (chunk_id, (score, hop, seed_id, concept_node)), vector_similarity in zip(best, similarities.tolist()):
+            _, content, doc_id, filename, category = chunk_rows[chunk_id]
+            expanded.append({
+                "chunk_id": chunk_id,
+                "content": content,
+                "document_id": doc_id,
+                "filename": filename,
+                "category": category,
+                "score": score,
+                "vector_similarity": vector_similarity,
+                "keyword_score": 0.0,
+                "keyword_bm25": 0.0,
+                "graph_hop": hop,
+                "graph_seed": seed_id,
+                "graph_concept": titles[concept_node]
+            })
+        
+        return expanded
+    
+    def _parse_query_filters(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect the query's metadata filters, normalising added_at bounds to UTC ISO strings
         
-        if len(added_documents) > 5:
-            result += f"\n- ... and {len(added_documents) - 5} more documents"
+        Raises ValueError for a malformed date.
+        """
         
-        if skipped_documents:
-            result += f"\n\n### Skipped Documents:\n- {', '.join(skipped_documents)}"
+        filters: Dict[str, Any] = {}
         
-        result += f"\n\n### Knowledge Base Status:\n- **Total Documents:** {kb_config['document_count']}\n- **Total Chunks:** {kb_config['chunk_count']}\n- **Last Updated:** {kb_config['last_updated'][:19]}\n\n*Your knowledge base has been updated and is ready for querying!*"
+        category = args.get("category")
+        if category:
+            filters["category"] = tuple(sorted({category} if isinstance(category, str) else set(category)))
         
-        return result
-    
-    async def _process_document_for_kb(self, doc: Dict[str, Any], kb_path: Path, db_path: Path, enable_cognitive_analysis: bool, chunk_documents: bool) -> Optional[Dict[str, Any]]:
-        """Process a single document for knowledge base storage"""
+        if args.get("filename_glob"):
+            filters["filename_glob"] = args["filename_glob"]
         
-        filename = doc.get("filename", "unknown")
-        content = doc.get("content", "")
-        category = doc.get("category", "document")
+        for bound in ("added_after", "added_before"):
+            value = args.get(bound)
+            if not value:
+                continue
+            try:
+                timestamp = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"Invalid {bound}: {value}. Use an ISO 8601 date or timestamp, e.g. 2024-05-01")
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            filters[bound] = timestamp.astimezone(timezone.utc).isoformat()
+        
+        return filters
+    
+    @staticmethod
+    def _document_filter_sql(filters: Dict[str, Any], alias: str = "d") -> Tuple[str, List[Any]]:
+        """Turn query filters into a WHERE clause over the documents table (served by its indexes)"""
         
-        if not content.strip():
-            return None
+        conditions = ["1 = 1"]
+        params: List[Any] = []
         
-        content_hash = hashlib.md5(content.encode()).hexdigest()
+        if filters.get("category"):
+            conditions.append(f"{alias}.category IN ({','.join('?' * len(filters['category']))})")
+            params.extend(filters["category"])
         
-        # Check if document already exists
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
+        # GLOB is case-sensitive like the filename index, so a literal prefix becomes a range scan
+        if filters.get("filename_glob"):
+            conditions.append(f"{alias}.filename GLOB ?")
+            params.append(filters["filename_glob"])
         
-        cursor.execute("SELECT id FROM documents WHERE content_hash = ?", (content_hash,))
-        if cursor.fetchone():
-            conn.close()
-            logger.info(f"Document {filename} already exists (same content hash)")
-            return None
+        # added_at is stored as a UTC ISO timestamp, so string order is time order
+        if filters.get("added_after"):
+            conditions.append(f"{alias}.added_at >= ?")
+            params.append(filters["added_after"])
         
-        # Insert document
-        cursor.execute("""
-            INSERT INTO documents (filename, content_hash, content, category, size_bytes, word_count, added_at, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            filename,
-            content_hash,
-            content,
-            category,
-            len(content.encode()),
-            len(content.split()),
-            datetime.now(timezone.utc).isoformat(),
-            json.dumps({"original_metadata": doc.get("metadata", {})})
-        ))
-        
-        document_id = cursor.lastrowid
-        
-        # Create chunks if requested
-        chunks_created = 0
-        if chunk_documents:
-            chunks = self._create_document_chunks(content)
-            
-            for i, chunk in enumerate(chunks):
-                chunk_hash = hashlib.md5(chunk["content"].encode()).hexdigest()
-                
-                # Create simple vector embedding (in real implementation, use proper embeddings)
-                vector_embedding = self._create_simple_embedding(chunk["content"])
-                
-                cursor.execute("""
-                    INSERT INTO chunks (document_id, chunk_index, content, content_hash, start_position, end_position, vector_embedding, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    document_id,
-                    i,
-                    chunk["content"],
-                    chunk_hash,
-                    chunk["start"],
-                    chunk["end"],
-                    json.dumps(vector_embedding),
-                    datetime.now(timezone.utc).isoformat()
-                ))
-                
-                chunks_created += 1
-                
-                # Apply cognitive analysis to chunk if enabled
-                if enable_cognitive_analysis:
-                    await self._apply_cognitive_analysis_to_chunk(cursor, document_id, cursor.lastrowid, chunk["content"])
+        if filters.get("added_before"):
+            conditions.append(f"{alias}.added_at < ?")
+            params.append(filters["added_before"])
         
-        conn.commit()
-        conn.close()
+        return " AND ".join(conditions), params
+    
+    @staticmethod
+    def _describe_query_filters(filters: Dict[str, Any]) -> str:
+        """Markdown line listing the active query filters (empty without filters)"""
+        
+        if not filters:
+            return ""
+        
+        described = []
+        if filters.get("category"):
+            described.append(f"category in {', '.join(filters['category'])}")
+        if filters.get("filename_glob"):
+            described.append(f"filename matches `{filters['filename_glob']}`")
+        if filters.get("added_after"):
+            described.append(f"added on/after {filters['added_after'][:19]}")
+        if filters.get("added_before"):
+            described.append(f"added before {filters['added_before'][:19]}")
+        
+        return f"\n**Filters:** {'; '.join(described)}"
+    
+    def _build_fts_query(self, query: str) -> str:
+        """Turn free text into an FTS5 MATCH expression that ORs the quoted query terms"""
         
-        return {
-            "filename": filename,
-            "category": category,
-            "document_id": document_id,
-            "chunk_count": chunks_created,
-            "content_hash": content_hash
-        }
+        terms = dict.fromkeys(re.findall(r"\w+", query.lower()))
+        return " OR ".join(f'"{term}"' for term in terms)
     
-    def _create_document_chunks(self, content: str) -> List[Dict[str, Any]]:
-        """Create overlapping chunks from document content"""
+    async def _get_vector_matrix(self, db_path: Path) -> VectorMatrix:
+        """Return the KB's vector matrix, rebuilding it from the database if it is out of sync
+        
+        The check runs once per process when the matrix is first opened (e.g. after a crash or
+        a legacy KB load); afterwards ingest keeps it in step under the pool's write lock.
+        """
+        
+        kb_path = db_path.parent
+        vector_matrix = self._vector_matrices.get(str(kb_path))
+        if vector_matrix is None:
+            vector_matrix = VectorMatrix(kb_path / "vectors", (await self._get_kb_embedder(db_path)).dim)
+            vector_dtype = await self._get_vector_dtype(db_path)
+            await self._get_connection_pool(db_path).write(
+                self._sync_vector_matrix, vector_matrix, vector_dtype, transaction=False
+            )
+            vector_matrix = self._vector_matrices.setdefault(str(kb_path), vector_matrix)
         
-        chunks = []
-        start = 0
+        return vector_matrix
+    
+    def _sync_vector_matrix(self, conn: sqlite3.Connection, vector_matrix: VectorMatrix, vector_dtype: np.dtype):
+        """Rebuild the vector matrix from the stored BLOBs if it disagrees with the chunks table"""
         
-        while start < len(content):
-            end = min(start + self.chunk_size, len(content))
-            
-            # Try to end at a sentence boundary
-            if end < len(content):
-                # Look for sentence endings within the last 100 characters
-                last_sentence_end = max(
-                    content.rfind('.', start, end),
-                    content.rfind('!', start, end),
-                    content.rfind('?', start, end)
-                )
-                
-                if last_sentence_end > start + self.chunk_size // 2:
-                    end = last_sentence_end + 1
-            
-            chunk_content = content[start:end].strip()
-            
-            if chunk_content:
-                chunks.append({
-                    "content": chunk_content,
-                    "start": start,
-                    "end": end
-                })
-            
-            # Move start position with overlap
-            start = max(start + self.chunk_size - self.chunk_overlap, end)
-            
-            if start >= len(content):
-                break
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM chunks")
+        chunk_count = cursor.fetchone()[0]
         
-        return chunks
+        if not vector_matrix.is_consistent(chunk_count):
+            logger.info(f"Rebuilding vector matrix for {vector_matrix.vectors_dir.parent.name} ({chunk_count} chunks)")
+            cursor.execute("SELECT id, vector_embedding FROM chunks ORDER BY id")
+            vector_matrix.rebuild(
+                (chunk_id, self._decode_vector(vector_blob, vector_dtype))
+                for chunk_id, vector_blob in cursor
+            )
     
-    def _create_simple_embedding(self, text: str) -> List[float]:
-        """Create a simple vector embedding for text (placeholder for real embeddings)"""
+    def _get_ann_index(self, db_path: Path, dim: int) -> IVFIndex:
+        """Return the KB's IVF index, loading it from disk on first use"""
         
-        # This is a very simple embedding based on word frequency
-        # In a real implementation, you'd use proper embeddings like sentence-transformers
+        kb_path = db_path.parent
+        ann_index = self._ann_indexes.get(str(kb_path))
+        if ann_index is None:
+            ann_index = IVFIndex(kb_path / "ann_index.npz", dim)
+            self._ann_indexes[str(kb_path)] = ann_index
         
-        words = text.lower().split()
-        word_freq = {}
+        return ann_index
+    
+    async def _sync_ann_index(self, db_path: Path) -> int:
+        """Bring the KB's IVF index up to date with its vector matrix under the write lock"""
         
-        for word in words:
-            if len(word) > 2 and word.isalpha():
-                word_freq[word] = word_freq.get(word, 0) + 1
+        vector_matrix = await self._get_vector_matrix(db_path)
+        ann_index = self._get_ann_index(db_path, vector_matrix.dim)
         
-        # Create a fixed-size vector (64 dimensions)
-        vector_size = 64
-        vector = [0.0] * vector_size
+        return await self._get_connection_pool(db_path).write(
+            lambda conn: ann_index.sync(vector_matrix), transaction=False
+        )
+    
+    @staticmethod
+    def _vector_quantization(kb_config: Dict[str, Any]) -> Optional[str]:
+        """The KB's quantized code format, or None when it searches the float matrix directly"""
         
-        # Use word hashes to map to vector positions
-        for word, freq in word_freq.items():
-            word_hash = hash(word) % vector_size
-            vector[word_hash] += freq / len(words)
+        quantization = kb_config.get("vector_quantization", "none")
+        return None if quantization == "none" else quantization
+    
+    def _get_vector_quantizer(self, db_path: Path, dim: int, kind: str) -> VectorQuantizer:
+        """Return the KB's vector quantizer, loading its codes from disk on first use"""
         
-        # Normalize vector
-        magnitude = sum(x * x for x in vector) ** 0.5
-        if magnitude > 0:
-            vector = [x / magnitude for x in vector]
+        kb_path = db_path.parent
+        quantizer = self._vector_quantizers.get(str(kb_path))
+        if quantizer is None or quantizer.kind != kind:
+            quantizer = VectorQuantizer(kb_path / "vectors", dim, kind)
+            self._vector_quantizers[str(kb_path)] = quantizer
         
-        return vector
+        return quantizer
     
-    async def _apply_cognitive_analysis_to_chunk(self, cursor, document_id: int, chunk_id: int, content: str):
-        """Apply Guru's cognitive systems to analyze a chunk"""
+    async def _sync_vector_quantizer(self, db_path: Path, kind: str) -> int:
+        """Encode vectors appended since the last sync (training codebooks first) under the write lock"""
         
-        try:
-            # Apply harmonic analysis
-            harmonic_result = await self.core_bridge.invoke_harmonic_analyzer(content, "surface")
-            
-            cursor.execute("""
-                INSERT INTO cognitive_analysis (document_id, chunk_id, system_name, analysis_result, confidence_score, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                document_id,
-                chunk_id,
-                "harmonic_analysis",
-                json.dumps(harmonic_result),
-                harmonic_result.get("analysis_confidence", 0.8),
-                datetime.now(timezone.utc).isoformat()
-            ))
-            
-            # Apply quantum synthesis (limited to avoid overwhelming)
-            if len(content) > 200:  # Only for substantial chunks
-                quantum_result = await self.core_bridge.invoke_quantum_synthesizer(
-                    f"Extract key insights from text chunk", [content[:500]]
-                )
-                
-                cursor.execute("""
-                    INSERT INTO cognitive_analysis (document_id, chunk_id, system_name, analysis_result, confidence_score, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    document_id,
-                    chunk_id,
-                    "quantum_synthesis",
-                    json.dumps(quantum_result),
-                    quantum_result.get("synthesis_confidence", 0.8),
-                    datetime.now(timezone.utc).isoformat()
-                ))
-            
-        except Exception as e:
-            logger.warning(f"Cognitive analysis failed for chunk {chunk_id}: {e}")
+        vector_matrix = await self._get_vector_matrix(db_path)
+        quantizer = self._get_vector_quantizer(db_path, vector_matrix.dim, kind)
+        
+        return await self._get_connection_pool(db_path).write(
+            lambda conn: quantizer.sync(vector_matrix), transaction=False
+        )
     
-    async def _query_knowledge_base(self, args: Dict[str, Any]) -> str:
-        """Query the knowledge base using RAG"""
+    async def _evaluate_ann_index(self, args: Dict[str, Any]) -> str:
+        """Measure ANN recall@k and latency against exact brute-force search"""
         kb_name = args.get("knowledge_base_name", "")
-        query = args.get("query", "")
-        max_results = args.get("max_results", self.max_retrieval_chunks)
-        include_cognitive_insights = args.get("include_cognitive_insights", True)
-        response_mode = args.get("response_mode", "comprehensive")  # comprehensive, concise, analytical
+        k = args.get("max_results", self.max_retrieval_chunks)
+        sample_size = args.get("sample_size", 100)
+        nprobe_values = args.get("nprobe_values", [1, 2, 4, 8, 16, 32])
         
-        if not kb_name or not query:
-            return "## Error\n\nKnowledge base name and query are required"
+        if not kb_name:
+            return "## Error\n\nKnowledge base name is required"
         
-        # Load knowledge base
         kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
         if not kb_config:
             return f"## Error\n\nKnowledge base '{kb_name}' not found"
         
         db_path = kb_path / "knowledge_base.db"
+        await self._sync_ann_index(db_path)
+        vector_matrix = await self._get_vector_matrix(db_path)
+        ann_index = self._get_ann_index(db_path, vector_matrix.dim)
         
-        # Retrieve relevant chunks
-        relevant_chunks = await self._retrieve_relevant_chunks(db_path, query, max_results)
+        if not ann_index.is_trained:
+            return f"""## 📏 ANN Index Evaluation
+
+**Knowledge Base:** {kb_name}
+
+The KB has {len(vector_matrix)} vectors; the ANN index is only trained from {ann_index.min_train_size} vectors upwards, and exact search is used until then."""
         
-        if not relevant_chunks:
-            return f"""## 🔍 No Relevant Information Found
+        vectors = vector_matrix.snapshot()
+        
+        # Use stored chunk vectors as queries so the check reflects the KB's own distribution
+        rng = np.random.default_rng(0)
+        sample_rows = rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False)
+        queries = np.asarray(vectors.matrix[np.sort(sample_rows)])
+        
+        def time_searches(search):
+            start_time = time.perf_counter()
+            results = [search(q)[0].tolist() for q in queries]
+            return results, (time.perf_counter() - start_time) * 1000 / len(queries)
+        
+        # Timed scans run on the executor so the event loop stays responsive
+        pool = self._get_connection_pool(db_path)
+        exact_results, exact_ms = await pool.run(time_searches, lambda q: vectors.search(q, k))
+        exact_results = [set(ids) for ids in exact_results]
+        
+        result = f"""## 📏 ANN Index Evaluation
 
-**Query:** {query}
 **Knowledge Base:** {kb_name}
+**Vectors:** {len(vectors)} in {ann_index.nlist} clusters
+**Queries:** {len(queries)} sampled chunk vectors, recall@{k}
+**Exact Search:** {exact_ms:.2f} ms/query
 
-No relevant information was found in the knowledge base. Try:
-1. Using different keywords
-2. Adding more documents to the knowledge base
-3. Using broader search terms"""
+| nprobe | recall@{k} | ms/query | speedup |
+|---|---|---|---|"""
         
-        # Generate response using retrieved context
-        response = await self._generate_rag_response(
-            query, relevant_chunks, kb_config, include_cognitive_insights, response_mode
+        for nprobe in nprobe_values:
+            ann_results, ann_ms = await pool.run(time_searches, lambda q: ann_index.search(vectors, q, k, nprobe))
+            
+            recall = np.mean([
+                len(exact.intersection(approx)) / max(len(exact), 1)
+                for exact, approx in zip(exact_results, ann_results)
+            ])
+            result += f"\n| {nprobe} | {recall:.3f} | {ann_ms:.2f} | {exact_ms / max(ann_ms, 1e-9):.1f}x |"
+        
+        result += "\n\n*Pass the chosen value as `nprobe` with `search_mode: \"ann\"` on `query`.*"
+        
+        return result
+    
+    async def _describe_vector_memory(self, db_path: Path, kb_config: Dict[str, Any]) -> str:
+        """Summarise the resident size of the KB's search structures and, when quantized, their recall"""
+        
+        vector_matrix = await self._get_vector_matrix(db_path)
+        matrix_bytes = len(vector_matrix) * vector_matrix.dim * np.dtype(np.float32).itemsize
+        lines = [f"- **Float Matrix:** {matrix_bytes / (1024 * 1024):.2f} MB ({len(vector_matrix)} rows x {vector_matrix.dim} float32)"]
+        
+        ann_path = db_path.parent / "ann_index.npz"
+        if ann_path.exists():
+            lines.append(f"- **ANN Index:** {ann_path.stat().st_size / (1024 * 1024):.2f} MB")
+        
+        quantization = self._vector_quantization(kb_config)
+        if not quantization:
+            lines.append("- **Quantized Codes:** none (searches scan the float matrix; see `vector_quantization` on `update`)")
+            return "\n".join(lines)
+        
+        await self._sync_vector_quantizer(db_path, quantization)
+        quantizer = self._get_vector_quantizer(db_path, vector_matrix.dim, quantization)
+        if not quantizer.is_trained:
+            lines.append(
+                f"- **Quantized Codes:** {quantization}, not trained yet ({len(vector_matrix)}/{quantizer.min_train_size} vectors; exact float search until then)"
+            )
+            return "\n".join(lines)
+        
+        quantized_bytes = quantizer.code_bytes + quantizer.codebook_bytes
+        lines.append(
+            f"- **Quantized Codes:** {quantization}, {quantized_bytes / (1024 * 1024):.2f} MB "
+            f"({quantizer.code_size} bytes/vector + {quantizer.codebook_bytes / 1024:.1f} KB codebook, "
+            f"{matrix_bytes / max(quantized_bytes, 1):.1f}x smaller than float32)"
         )
         
-        return response
+        vectors = vector_matrix.snapshot()
+        # Stored chunk vectors double as queries, as in `evaluate_index`
+        k = min(self.max_retrieval_chunks, vectors.live_count)
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(len(vectors), size=min(self.quantization_recall_sample, len(vectors)), replace=False))
+        queries = np.asarray(vectors.matrix[sample_rows])
+        
+        def measure_recall():
+            exact = [set(vectors.search(q, k)[0].tolist()) for q in queries]
+            
+            def recall(rerank_factor: int) -> float:
+                return float(np.mean([
+                    len(expected.intersection(quantizer.search(vectors, q, k, rerank_factor)[0].tolist())) / max(len(expected), 1)
+                    for q, expected in zip(queries, exact)
+                ]))
+            
+            return recall(1), recall(self.quantization_rerank_factor)
+        
+        code_recall, reranked_recall = await self._get_connection_pool(db_path).run(measure_recall)
+        lines.append(
+            f"- **Recall@{k}:** {reranked_recall:.3f} with a {self.quantization_rerank_factor}x float rerank, "
+            f"{code_recall:.3f} from codes alone ({len(queries)} sampled chunk vectors)"
+        )
+        
+        return "\n".join(lines)
     
-    async def _retrieve_relevant_chunks(self, db_path: Path, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Retrieve relevant chunks using vector similarity and keyword matching"""
+    async def _reembed_knowledge_base(self, args: Dict[str, Any]) -> str:
+        """Recompute every stored chunk embedding with the current embedder in one pass"""
+        kb_name = args.get("knowledge_base_name", "")
         
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
+        if not kb_name:
+            return "## Error\n\nKnowledge base name is required"
         
-        # Create query embedding
-        query_embedding = self._create_simple_embedding(query)
+        kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
+        if not kb_config:
+            return f"## Error\n\nKnowledge base '{kb_name}' not found"
         
-        # Get all chunks with their embeddings
-        cursor.execute("""
-            SELECT c.id, c.content, c.vector_embedding, c.document_id, d.filename, d.category
-            FROM chunks c
-            JOIN documents d ON c.document_id = d.id
-        """)
+        db_path = kb_path / "knowledge_base.db"
+        previous_version, previous_dim = await self._read_embedder_metadata(db_path)
+        metadata = await self._read_kb_metadata(db_path, ["embedder_backend", "embedding_model_path"])
+        embedder_backend = args.get("embedder") or metadata.get("embedder_backend", "hashing")
+        embedding_model_path = args.get("embedding_model_path") or metadata.get("embedding_model_path") or None
+        embedding_dim = args.get("embedding_dim") or (
+            previous_dim if previous_version == HashingEmbedder.version else self.embedding_dim
+        )
         
-        chunks = cursor.fetchall()
+        try:
+            embedder = await self._load_embedder(embedder_backend, embedding_dim, embedding_model_path)
+        except (ValueError, RuntimeError) as e:
+            return f"## Error\n\n{e}"
         
-        # Calculate similarities and keyword matches
-        scored_chunks = []
-        query_words = set(query.lower().split())
+        vector_dtype = await self._get_vector_dtype(db_path)
         
-        for chunk_id, content, vector_embedding_json, doc_id, filename, category in chunks:
-            try:
-                chunk_embedding = json.loads(vector_embedding_json)
-                
-                # Vector similarity
-                vector_similarity = self._calculate_cosine_similarity(query_embedding, chunk_embedding)
+        start_time = time.perf_counter()
+        batch_size = 1024
+        
+        def reembed_chunks(conn):
+            cursor = conn.cursor()
+            reembedded = 0
+            cache_hits = 0
+            last_chunk_id = 0
+            
+            while True:
+                cursor.execute(
+                    "SELECT id, content, content_hash FROM chunks WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_chunk_id, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
                 
-                # Keyword similarity
-                chunk_words = set(content.lower().split())
-                keyword_overlap = len(query_words.intersection(chunk_words)) / len(query_words) if query_words else 0
+                # Switching back to a model used before reads its vectors from the embedding cache
+                vectors_by_hash = self._read_embedding_cache(conn, embedder.version, [row[2] for row in rows]) if embedder.cacheable else {}
+                cache_hits += len(vectors_by_hash)
+                missing = [(content, content_hash) for _, content, content_hash in rows if content_hash not in vectors_by_hash]
+                if missing:
+                    computed = embedder.embed_batch([content for content, _ in missing])
+                    vectors_by_hash.update(zip([content_hash for _, content_hash in missing], computed))
+                    if embedder.cacheable:
+                        cursor.executemany(
+                            "INSERT OR IGNORE INTO embedding_cache (embedder, content_hash, vector) VALUES (?, ?, ?)",
+                            [(embedder.version, content_hash, self._encode_vector(vector, np.float32)) for (_, content_hash), vector in zip(missing, computed)]
+                        )
                 
-                # Combined score
-                combined_score = (vector_similarity * 0.7) + (keyword_overlap * 0.3)
+                cursor.executemany(
+                    "UPDATE chunks SET vector_embedding = ? WHERE id = ?",
+                    [(self._encode_vector(vectors_by_hash[content_hash], vector_dtype), chunk_id) for chunk_id, _, content_hash in rows]
+                )
                 
-                if combined_score > 0.1:  # Basic threshold
-                    scored_chunks.append({
-                        "chunk_id": chunk_id,
-                        "content": content,
-                        "document_id": doc_id,
-                        "filename": filename,
-                        "category": category,
-                        "score": combined_score,
-                        "vector_similarity": vector_similarity,
-                        "keyword_overlap": keyword_overlap
-                    })
-                    
-            except Exception as e:
-                logger.warning(f"Error processing chunk {chunk_id}: {e}")
-                continue
-        
-        conn.close()
-        
-        # Sort by score and return top results
-        scored_chunks.sort(key=lambda x: x["score"], reverse=True)
+                reembedded += len(rows)
+                last_chunk_id = rows[-1][0]
+            
+            cursor.executemany("INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)", [
+                ("embedder", embedder.version),
+                ("embedding_dim", str(embedder.dim)),
+                ("embedder_backend", self._embedder_backend(embedder)),
+                ("embedding_model_path", embedding_model_path if isinstance(embedder, ONNXEmbedder) else "")
+            ])
+            
+            # Drop derived vector structures so they are rebuilt from the new embeddings
+            derived_paths = [kb_path / "vectors" / "embeddings.f32", kb_path / "vectors" / "chunk_ids.i64", kb_path / "ann_index.npz"]
+            for derived_path in derived_paths + VectorQuantizer.derived_files(kb_path / "vectors"):
+                derived_path.unlink(missing_ok=True)
+            
+            return reembedded, cache_hits
         
-        return scored_chunks[:max_results]
-    
-    def _calculate_cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
+        reembedded, cache_hits = await self._get_connection_pool(db_path).write(reembed_chunks)
         
-        if len(vec1) != len(vec2):
-            return 0.0
+        kb_key = str(kb_path)
+        self._embedders[kb_key] = embedder
+        self._vector_matrices.pop(kb_key, None)
+        self._ann_indexes.pop(kb_key, None)
+        self._vector_quantizers.pop(kb_key, None)
+        self.query_cache.bump_version(kb_key)
         
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = sum(a * a for a in vec1) ** 0.5
-        magnitude2 = sum(b * b for b in vec2) ** 0.5
+        await self._get_vector_matrix(db_path)
+        if kb_config.get("ann_index"):
+            await self._sync_ann_index(db_path)
+        if self._vector_quantization(kb_config):
+            await self._sync_vector_quantizer(db_path, self._vector_quantization(kb_config))
         
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
+        elapsed = time.perf_counter() - start_time
         
-        return dot_product / (magnitude1 * magnitude2)
+        return f"""## 🔁 Knowledge Base Re-embedded
+
+**Knowledge Base:** {kb_name}
+**Previous Embedder:** {previous_version or 'legacy'} ({previous_dim} dimensions)
+**Current Embedder:** {embedder.version} ({embedder.dim} dimensions)
+**Chunks Re-embedded:** {reembedded} ({cache_hits} from the embedding cache)
+**Time:** {elapsed:.2f}s ({reembedded / max(elapsed, 1e-9):.0f} chunks/s)
+
+*Stored vectors now line up with query vectors across restarts.*"""
     
     async def _generate_rag_response(self, query: str, relevant_chunks: List[Dict[str, Any]], kb_config: Dict[str, Any], include_cognitive_insights: bool, response_mode: str) -> str:
         """Generate response using retrieved chunks and Guru's cognitive systems"""
@@ -618,8 +3469,9 @@ No relevant information was found in the knowledge base. Try:
         source_documents = set()
         
         for chunk in relevant_chunks:
-            context_parts.append(f"[{chunk['filename']}] {chunk['content']}")
-            source_documents.add(chunk['filename'])
+            source = self._chunk_source(chunk)
+            context_parts.append(f"[{source}] {chunk['content']}")
+            source_documents.add(source)
         
         context = "\n\n".join(context_parts)
         
@@ -633,8 +3485,8 @@ Context:
 
 Please provide a detailed, accurate response based on the provided context."""
         
-        # Generate response using wingman
-        wingman_response = await self.phi4_wingman.generate_specialized_response(
+        # The wingman answer and the quantum synthesis are independent, so they run concurrently
+        wingman_call = self.phi4_wingman.generate_specialized_response(
             response_prompt, "analytical_reasoning"
         )
         
@@ -642,12 +3494,21 @@ Please provide a detailed, accurate response based on the provided context."""
         cognitive_insights = []
         if include_cognitive_insights and relevant_chunks:
             # Use quantum synthesis to find cross-connections
-            quantum_result = await self.core_bridge.invoke_quantum_synthesizer(
+            synthesis_call = self.core_bridge.invoke_quantum_synthesizer(
                 f"Synthesize insights from knowledge base query: {query}",
                 [chunk["content"][:300] for chunk in relevant_chunks[:3]]
             )
+            wingman_response, quantum_result = await asyncio.gather(wingman_call, synthesis_call, return_exceptions=True)
+            if isinstance(wingman_response, BaseException):
+                raise wingman_response
             
-            cognitive_insights = quantum_result.get("quantum_insights", [])
+            # Insights are an optional extra; a failed synthesis still leaves the answer
+            if isinstance(quantum_result, BaseException):
+                logger.warning(f"Quantum synthesis for RAG response failed: {quantum_result}")
+            else:
+                cognitive_insights = quantum_result.get("quantum_insights", [])
+        else:
+            wingman_response = await wingman_call
         
         # Format final response
         result = f"""## 🧠 Knowledge Base Response
@@ -663,11 +3524,25 @@ Please provide a detailed, accurate response based on the provided context."""
 ### 📚 Sources
 """
         
-        for i, chunk in enumerate(relevant_chunks[:5], 1):
-            result += f"{i}. **{chunk['filename']}** ({chunk['category']}) - Relevance: {chunk['score']:.2f}\n"
+        direct_chunks = [chunk for chunk in relevant_chunks if "graph_hop" not in chunk]
+        graph_chunks = [chunk for chunk in relevant_chunks if "graph_hop" in chunk]
+        
+        for i, chunk in enumerate(direct_chunks[:5], 1):
+            source = self._chunk_source(chunk)
+            result += f"{i}. **{source}** ({chunk['category']}) - Relevance: {chunk['score']:.2f}\n"
         
-        if len(relevant_chunks) > 5:
-            result += f"   ... and {len(relevant_chunks) - 5} more sources\n"
+        if len(direct_chunks) > 5:
+            result += f"   ... and {len(direct_chunks) - 5} more sources\n"
+        
+        if graph_chunks:
+            result += f"\n### 🕸️ Related via Knowledge Graph\n"
+            for i, chunk in enumerate(graph_chunks[:5], 1):
+                result += (
+                    f"{i}. **{self._chunk_source(chunk)}** - via *{chunk['graph_concept']}* "
+                    f"({chunk['graph_hop']} hop{'s' if chunk['graph_hop'] > 1 else ''}) - Relevance: {chunk['score']:.2f}\n"
+                )
+            if len(graph_chunks) > 5:
+                result += f"   ... and {len(graph_chunks) - 5} more related chunks\n"
         
         # Add cognitive insights
         if cognitive_insights:
@@ -679,7 +3554,7 @@ Please provide a detailed, accurate response based on the provided context."""
         result += f"""
 ### 🔍 Retrieval Details
 - **Vector Similarity Range:** {min(c['vector_similarity'] for c in relevant_chunks):.3f} - {max(c['vector_similarity'] for c in relevant_chunks):.3f}
-- **Keyword Overlap Range:** {min(c['keyword_overlap'] for c in relevant_chunks):.3f} - {max(c['keyword_overlap'] for c in relevant_chunks):.3f}
+- **Keyword (BM25) Score Range:** {min(c['keyword_score'] for c in relevant_chunks):.3f} - {max(c['keyword_score'] for c in relevant_chunks):.3f}
 - **Total KB Documents:** {kb_config.get('document_count', 0)}
 - **Total KB Chunks:** {kb_config.get('chunk_count', 0)}
 
@@ -695,12 +3570,13 @@ Please provide a detailed, accurate response based on the provided context."""
         
         knowledge_bases = []
         
-        for kb_dir in self.knowledge_base_dir.iterdir():
-            if kb_dir.is_dir() and (kb_dir / "config.json").exists():
+        self._refresh_kb_registry()
+        for kb_dir in dict.fromkeys(self._kb_registry.values()):
+            if (kb_dir / "config.json").exists():
                 try:
                     with open(kb_dir / "config.json", "r") as f:
                         config = json.load(f)
-                    knowledge_bases.append(config)
+                    knowledge_bases.append((config, kb_dir))
                 except Exception as e:
                     logger.warning(f"Error reading config for {kb_dir.name}: {e}")
         
@@ -708,15 +3584,27 @@ Please provide a detailed, accurate response based on the provided context."""
             return "## 📚 No Knowledge Bases Found\n\nCreate your first knowledge base using the `create` operation."
         
         # Sort by last updated
-        knowledge_bases.sort(key=lambda x: x.get("last_updated", ""), reverse=True)
+        knowledge_bases.sort(key=lambda entry: entry[0].get("last_updated", ""), reverse=True)
+        
+        # One kb_stats read per KB, all KBs concurrently
+        async def read_totals(kb_dir: Path) -> Dict[str, int]:
+            db_path = kb_dir / "knowledge_base.db"
+            await self._ensure_kb_schema(db_path)
+            return (await self._read_kb_stats(db_path))["totals"]
+        
+        kb_totals = await asyncio.gather(*(read_totals(kb_dir) for _, kb_dir in knowledge_bases), return_exceptions=True)
         
         result = f"## 📚 Available Knowledge Bases ({len(knowledge_bases)})\n\n"
         
-        for kb in knowledge_bases:
+        for (kb, kb_dir), totals in zip(knowledge_bases, kb_totals):
+            if isinstance(totals, Exception):
+                logger.warning(f"Error reading statistics for {kb_dir.name}: {totals}")
+                totals = {"documents": "unknown", "chunks": "unknown"}
+            
             result += f"### {kb['name']}\n"
             result += f"- **Description:** {kb.get('description', 'No description')}\n"
-            result += f"- **Documents:** {kb.get('document_count', 0)}\n"
-            result += f"- **Chunks:** {kb.get('chunk_count', 0)}\n"
+            result += f"- **Documents:** {totals['documents']}\n"
+            result += f"- **Chunks:** {totals['chunks']}\n"
             result += f"- **Created:** {kb.get('created_at', 'Unknown')[:19]}\n"
             result += f"- **Last Updated:** {kb.get('last_updated', 'Unknown')[:19]}\n"
             result += f"- **Cognitive Systems:** {', '.join(kb.get('cognitive_systems', []))}\n\n"
@@ -736,27 +3624,21 @@ Please provide a detailed, accurate response based on the provided context."""
         
         db_path = kb_path / "knowledge_base.db"
         
-        # Get database statistics
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-        
-        # Document statistics
-        cursor.execute("SELECT COUNT(*), SUM(size_bytes), SUM(word_count) FROM documents")
-        doc_count, total_size, total_words = cursor.fetchone()
-        
-        # Category distribution
-        cursor.execute("SELECT category, COUNT(*) FROM documents GROUP BY category")
-        categories = dict(cursor.fetchall())
-        
-        # Chunk statistics
-        cursor.execute("SELECT COUNT(*) FROM chunks")
-        chunk_count = cursor.fetchone()[0]
-        
-        # Cognitive analysis statistics
-        cursor.execute("SELECT system_name, COUNT(*) FROM cognitive_analysis GROUP BY system_name")
-        cognitive_stats = dict(cursor.fetchall())
+        # Counters are maintained transactionally in kb_stats, so no table is scanned here
+        pool = self._get_connection_pool(db_path)
+        stats = await self._read_kb_stats(db_path)
+        totals = stats["totals"]
+        doc_count, total_size, total_words = totals["documents"], totals["size_bytes"], totals["word_count"]
+        chunk_count, chunk_references = totals["chunks"], totals["chunk_references"]
+        categories, cognitive_stats, job_counts, cached_embeddings = (
+            stats["category"], stats["cognitive"], stats["jobs"], stats["embedding_cache"]
+        )
         
-        conn.close()
+        embedder_version, embedding_dim = await self._read_embedder_metadata(db_path)
+        vector_dtype = await self._get_vector_dtype(db_path)
+        enrichment_stats = self._enrichment_stats.get(str(kb_path), {"completed": 0, "failed": 0, "seconds": 0.0})
+        cache_stats = self.query_cache.stats(str(kb_path))
+        vector_memory = await self._describe_vector_memory(db_path, kb_config)
         
         result = f"""## 📊 Knowledge Base Information
 
@@ -771,7 +3653,7 @@ Please provide a detailed, accurate response based on the provided context."""
 - **Documents:** {doc_count}
 - **Total Size:** {(total_size or 0) / 1024:.1f} KB
 - **Total Words:** {total_words or 0:,}
-- **Chunks:** {chunk_count}
+- **Chunks:** {chunk_count} unique ({chunk_references} references, {chunk_references - chunk_count} deduplicated)
 - **Avg Words/Document:** {(total_words or 0) // max(doc_count, 1):,}
 
 ### Document Categories"""
@@ -786,12 +3668,36 @@ Please provide a detailed, accurate response based on the provided context."""
         else:
             result += "\n- No cognitive analyses performed yet"
         
+        graph_nodes, graph_edges = stats["graph_nodes"], stats["graph_edges"]
+        result += f"""
+
+### Knowledge Graph
+- **Concepts:** {graph_nodes.get('entity', 0) + graph_nodes.get('term', 0)} ({graph_nodes.get('entity', 0)} entities, {graph_nodes.get('term', 0)} key terms)
+- **Edges:** {graph_edges.get('mentions', 0)} chunk mentions, {graph_edges.get('co_occurs', 0) // 2} concept co-occurrences
+
+### Enrichment Queue
+- **Queue Depth:** {job_counts.get('pending', 0) + job_counts.get('running', 0)} chunks ({job_counts.get('running', 0)} in progress)
+- **Failed Jobs:** {job_counts.get('failed', 0)}
+- **Completed This Session:** {enrichment_stats['completed']:.0f}
+- **Throughput:** {enrichment_stats['completed'] / max(enrichment_stats['seconds'], 1e-9):.1f} chunks/s
+
+### Query Cache
+- **Hit Rate:** {cache_stats['hit_rate']:.1%} ({cache_stats['hits']} hits, {cache_stats['misses']} misses)
+- **Cached Queries:** {cache_stats['entries']} (content version {cache_stats['version']}, {len(self.query_cache)}/{self.query_cache.max_entries} entries across all KBs)"""
+        
+        result += f"\n\n### Vector Memory\n{vector_memory}"
+        
         result += f"""
 
 ### Configuration
 - **Cognitive Systems:** {', '.join(kb_config.get('cognitive_systems', []))}
+- **ANN Index:** {'enabled' if kb_config.get('ann_index') else 'disabled'}
+- **Vector Quantization:** {kb_config.get('vector_quantization', 'none')}
+- **Embedder:** {embedder_version or 'legacy (run `reembed`)'} ({embedding_dim} dimensions, stored as {vector_dtype.name} BLOBs)
+- **Embedding Cache:** {sum(cached_embeddings.values())} vectors across {len(cached_embeddings)} embedder versions
 - **Storage Path:** `{kb_path}`
 - **Database Size:** {(kb_path / 'knowledge_base.db').stat().st_size / 1024:.1f} KB
+- **Connections:** WAL, {pool.max_readers} pooled readers + 1 writer, {pool.mmap_size // (1024 * 1024)} MB mmap, {pool.cache_size_kb // 1024} MB page cache
 
 ### Usage
 - Use `query` operation to search this knowledge base
@@ -830,31 +3736,201 @@ This will permanently delete all documents, chunks, and analysis data."""
         if not kb_config:
             return f"## Error\n\nKnowledge base '{kb_name}' not found"
         
+        kb_totals = (await self._read_kb_stats(kb_path / "knowledge_base.db"))["totals"]
+        
+        # Close pooled connections before their database file disappears
+        pool = self._connection_pools.pop(str(kb_path / "knowledge_base.db"), None)
+        if pool is not None:
+            await pool.close()
+        
         # Delete the entire knowledge base directory
-        import shutil
         shutil.rmtree(kb_path)
+        self._unregister_knowledge_base(kb_path)
+        self._vector_matrices.pop(str(kb_path), None)
+        self._ann_indexes.pop(str(kb_path), None)
+        self._vector_quantizers.pop(str(kb_path), None)
+        self._embedders.pop(str(kb_path), None)
+        self._vector_dtypes.pop(str(kb_path), None)
+        self.query_cache.forget(str(kb_path))
         
         return f"""## 🗑️ Knowledge Base Deleted
 
 **Knowledge Base:** {kb_name}
-**Documents Removed:** {kb_config.get('document_count', 0)}
-**Chunks Removed:** {kb_config.get('chunk_count', 0)}
+**Documents Removed:** {kb_totals['documents']}
+**Chunks Removed:** {kb_totals['chunks']}
 
 The knowledge base has been permanently deleted."""
     
+    async def _export_knowledge_base(self, args: Dict[str, Any]) -> str:
+        """Write the KB to a single snapshot file (online DB backup + raw vector files)"""
+        kb_name = args.get("knowledge_base_name", "")
+        snapshot_path = args.get("snapshot_path")
+        
+        if not kb_name:
+            return "## Error\n\nKnowledge base name is required"
+        
+        kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
+        if not kb_config:
+            return f"## Error\n\nKnowledge base '{kb_name}' not found"
+        
+        db_path = kb_path / "knowledge_base.db"
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        snapshot_path = Path(snapshot_path).expanduser() if snapshot_path else self.snapshot_dir / f"{kb_config['safe_name']}-{timestamp}.gurukb"
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        backup_path = snapshot_path.with_name(snapshot_path.name + ".db")
+        
+        # Bring the matrix in line with the database so the snapshot needs no rebuild on import
+        await self._get_vector_matrix(db_path)
+        
+        vectors_dir = kb_path / "vectors"
+        relative_paths = [
+            "vectors/embeddings.f32", "vectors/chunk_ids.i64", "vectors/deleted.i64", "ann_index.npz"
+        ] + [path.relative_to(kb_path).as_posix() for path in VectorQuantizer.derived_files(vectors_dir)]
+        
+        start_time = time.perf_counter()
+        
+        # Only the backup and the size-pinning of the vector files hold off writers
+        def capture(conn):
+            KBSnapshot.backup_database(conn, backup_path)
+            totals = dict(conn.execute("SELECT key, value FROM kb_stats WHERE scope = 'totals'").fetchall())
+            return totals, KBSnapshot.open_files(kb_path, relative_paths)
+        
+        pool = self._get_connection_pool(db_path)
+        try:
+            totals, files = await pool.write(capture, transaction=False)
+            manifest = {
+                "config": kb_config,
+                "schema_version": self.schema_version,
+                "exported_at": datetime.now(timezone.utc).isoformat(),
+                "totals": totals
+            }
+            snapshot_bytes = await pool.run(KBSnapshot.write, snapshot_path, manifest, backup_path, files)
+        finally:
+            backup_path.unlink(missing_ok=True)
+        
+        elapsed = time.perf_counter() - start_time
+        vector_bytes = sum(size for _, _, size in files)
+        
+        return f"""## 📦 Knowledge Base Exported
+
+**Knowledge Base:** {kb_name}
+**Snapshot:** `{snapshot_path}`
+**Snapshot Size:** {snapshot_bytes / (1024 * 1024):.2f} MB ({vector_bytes / (1024 * 1024):.2f} MB of raw vector files)
+**Documents:** {totals.get('documents', 0)}
+**Chunks:** {totals.get('chunks', 0)}
+**Elapsed:** {elapsed:.2f}s
+
+Restore it on any host with the `import` operation and `snapshot_path`."""
+    
+    async def _import_knowledge_base(self, args: Dict[str, Any]) -> str:
+        """Restore a KB from a snapshot file by copying its database image and vector files into place"""
+        snapshot_path = args.get("snapshot_path")
+        kb_name = args.get("knowledge_base_name", "")
+        
+        if not snapshot_path:
+            return "## Error\n\nsnapshot_path is required"
+        
+        snapshot_path = Path(snapshot_path).expanduser()
+        if not snapshot_path.is_file():
+            return f"## Error\n\nSnapshot not found: {snapshot_path}"
+        
+        loop = asyncio.get_running_loop()
+        try:
+            manifest = await loop.run_in_executor(self._db_executor, KBSnapshot.read_manifest, snapshot_path)
+        except ValueError as e:
+            return f"## Error\n\n{e}"
+        
+        if manifest.get("schema_version", 0) > self.schema_version:
+            return f"## Error\n\nSnapshot schema version {manifest['schema_version']} is newer than this server supports ({self.schema_version})"
+        
+        # The snapshot's KB may be imported under a different name
+        kb_config = dict(manifest["config"])
+        kb_name = kb_name or kb_config["name"]
+        safe_kb_name = "".join(c for c in kb_name if c.isalnum() or c in ('-', '_')).strip()
+        if not safe_kb_name:
+            return "## Error\n\nInvalid knowledge base name"
+        
+        kb_path = self.knowledge_base_dir / safe_kb_name
+        
+        self._refresh_kb_registry()
+        if kb_path.exists() or kb_name in self._kb_registry:
+            return f"## Error\n\nKnowledge base '{kb_name}' already exists"
+        
+        start_time = time.perf_counter()
+        
+        # Restore into a staging directory (no config.json, so the registry ignores it) and move it into place
+        staging_path = self.knowledge_base_dir / f".{safe_kb_name}.import-{os.getpid()}"
+        shutil.rmtree(staging_path, ignore_errors=True)
+        staging_path.mkdir()
+        try:
+            await loop.run_in_executor(self._db_executor, KBSnapshot.extract, snapshot_path, staging_path)
+            for directory in ("documents", "chunks", "vectors"):
+                (staging_path / directory).mkdir(exist_ok=True)
+            staging_path.rename(kb_path)
+        except Exception as e:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            if isinstance(e, (ValueError, OSError, tarfile.TarError)):
+                return f"## Error\n\nCould not import snapshot: {e}"
+            raise
+        
+        kb_config.update(name=kb_name, safe_name=safe_kb_name, last_updated=datetime.now(timezone.utc).isoformat())
+        self._save_knowledge_base_config(kb_path, kb_config)
+        self._register_knowledge_base(kb_config, kb_path)
+        
+        db_path = kb_path / "knowledge_base.db"
+        await self._ensure_kb_schema(db_path)
+        await self._get_connection_pool(db_path).write(
+            lambda conn: conn.execute("UPDATE metadata SET value = ? WHERE key = 'kb_name'", (kb_name,))
+        )
+        
+        # The restored files are used as-is; this only rebuilds them if they disagree with the database
+        await self._get_vector_matrix(db_path)
+        if kb_config.get("ann_index"):
+            await self._sync_ann_index(db_path)
+        if self._vector_quantization(kb_config):
+            await self._sync_vector_quantizer(db_path, self._vector_quantization(kb_config))
+        
+        elapsed = time.perf_counter() - start_time
+        kb_totals = (await self._read_kb_stats(db_path))["totals"]
+        embedder_version, embedding_dim = await self._read_embedder_metadata(db_path)
+        
+        result = f"""## 📥 Knowledge Base Imported
+
+**Knowledge Base:** {kb_name}
+**Snapshot:** `{snapshot_path}` (exported {manifest.get('exported_at', 'unknown')[:19]})
+**Documents:** {kb_totals['documents']}
+**Chunks:** {kb_totals['chunks']}
+**Embedder:** {embedder_version} ({embedding_dim} dimensions)
+**Elapsed:** {elapsed:.2f}s"""
+        
+        metadata = await self._read_kb_metadata(db_path, ["embedder_backend"])
+        if metadata.get("embedder_backend") == "onnx":
+            result += "\n\n*This KB uses an ONNX embedder: queries need the same model available on this host (see `embedding_model_path` / GURU_EMBEDDING_MODEL_PATH).*"
+        
+        return result
+    
     async def _update_knowledge_base(self, args: Dict[str, Any]) -> str:
         """Update knowledge base configuration"""
         kb_name = args.get("knowledge_base_name", "")
         new_description = args.get("description")
         new_cognitive_systems = args.get("cognitive_systems")
+        enable_ann_index = args.get("enable_ann_index")
+        vector_quantization = args.get("vector_quantization")
         
         if not kb_name:
             return "## Error\n\nKnowledge base name is required"
         
+        if vector_quantization is not None and vector_quantization not in ("none",) + VectorQuantizer.kinds:
+            return f"## Error\n\nUnsupported vector_quantization: {vector_quantization}. Available: none, {', '.join(VectorQuantizer.kinds)}"
+        
         kb_config, kb_path = await self._load_knowledge_base_config(kb_name)
         if not kb_config:
             return f"## Error\n\nKnowledge base '{kb_name}' not found"
         
+        quantization_changed = (
+            vector_quantization is not None and vector_quantization != kb_config.get("vector_quantization", "none")
+        )
+        
         # Update configuration
         if new_description is not None:
             kb_config["description"] = new_description
@@ -862,18 +3938,36 @@ The knowledge base has been permanently deleted."""
         if new_cognitive_systems is not None:
             kb_config["cognitive_systems"] = new_cognitive_systems
         
+        if enable_ann_index is not None:
+            kb_config["ann_index"] = enable_ann_index
+        
+        if quantization_changed:
+            kb_config["vector_quantization"] = vector_quantization
+        
         kb_config["last_updated"] = datetime.now(timezone.utc).isoformat()
         
         # Save updated configuration
-        config_path = kb_path / "config.json"
-        with open(config_path, "w") as f:
-            json.dump(kb_config, f, indent=2)
+        self._save_knowledge_base_config(kb_path, kb_config)
+        
+        # Switching code formats drops the old codes (under the write lock) and encodes the new ones
+        if quantization_changed:
+            db_path = kb_path / "knowledge_base.db"
+            self._vector_quantizers.pop(str(kb_path), None)
+            await self._get_connection_pool(db_path).write(
+                lambda conn: [path.unlink(missing_ok=True) for path in VectorQuantizer.derived_files(kb_path / "vectors")],
+                transaction=False
+            )
+            self.query_cache.bump_version(str(kb_path))
+            if self._vector_quantization(kb_config):
+                await self._sync_vector_quantizer(db_path, vector_quantization)
         
         return f"""## ✅ Knowledge Base Updated
 
 **Knowledge Base:** {kb_name}
 **Description:** {kb_config['description']}
 **Cognitive Systems:** {', '.join(kb_config['cognitive_systems'])}
+**ANN Index:** {'enabled' if kb_config.get('ann_index') else 'disabled'}
+**Vector Quantization:** {kb_config.get('vector_quantization', 'none')}
 **Last Updated:** {kb_config['last_updated'][:19]}
 
 Configuration has been successfully updated."""
@@ -881,18 +3975,76 @@ Configuration has been successfully updated."""
     async def _load_knowledge_base_config(self, kb_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[Path]]:
         """Load knowledge base configuration"""
         
-        # Find knowledge base by name
+        # Find knowledge base by name; a miss forces one rescan in case another process created it
+        self._refresh_kb_registry()
+        kb_dir = self._kb_registry.get(kb_name)
+        if kb_dir is None:
+            self._refresh_kb_registry(force=True)
+            kb_dir = self._kb_registry.get(kb_name)
+        if kb_dir is None:
+            return None, None
+        
+        try:
+            with open(kb_dir / "config.json", "r") as f:
+                config = json.load(f)
+        except Exception as e:
+            logger.warning(f"Error reading config for {kb_dir.name}: {e}")
+            return None, None
+        
+        await self._ensure_kb_schema(kb_dir / "knowledge_base.db")
+        return config, kb_dir
+    
+    def _save_knowledge_base_config(self, kb_path: Path, config: Dict[str, Any]):
+        """Write config.json atomically (temp file + rename) so readers never see a partial file
+        
+        Document and chunk counts live in the KB's kb_stats table; legacy copies are dropped here.
+        """
+        
+        config.pop("document_count", None)
+        config.pop("chunk_count", None)
+        
+        tmp_path = kb_path / "config.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(config, f, indent=2)
+        tmp_path.replace(kb_path / "config.json")
+    
+    def _refresh_kb_registry(self, force: bool = False):
+        """Rebuild the name → directory registry if the storage directory changed since the last scan"""
+        
+        mtime = self.knowledge_base_dir.stat().st_mtime_ns
+        if not force and mtime == self._kb_registry_mtime:
+            return
+        
+        configs = []
         for kb_dir in self.knowledge_base_dir.iterdir():
-            if kb_dir.is_dir():
-                config_path = kb_dir / "config.json"
-                if config_path.exists():
-                    try:
-                        with open(config_path, "r") as f:
-                            config = json.load(f)
-                        
-                        if config.get("name") == kb_name or config.get("safe_name") == kb_name:
-                            return config, kb_dir
-                    except Exception as e:
-                        logger.warning(f"Error reading config for {kb_dir.name}: {e}")
-        
-        return None, None
\ No newline at end of file
+            config_path = kb_dir / "config.json"
+            if kb_dir.is_dir() and config_path.exists():
+                try:
+                    with open(config_path, "r") as f:
+                        configs.append((json.load(f), kb_dir))
+                except Exception as e:
+                    logger.warning(f"Error reading config for {kb_dir.name}: {e}")
+        
+        # Display names win over sanitized names when the two collide
+        registry = {config.get("safe_name", kb_dir.name): kb_dir for config, kb_dir in configs}
+        registry.update({config["name"]: kb_dir for config, kb_dir in configs if config.get("name")})
+        
+        # Swap in the new mapping in one assignment so concurrent lookups never see a partial registry
+        self._kb_registry = registry
+        self._kb_registry_mtime = mtime
+    
+    def _register_knowledge_base(self, config: Dict[str, Any], kb_path: Path):
+        """Add a newly created KB to the registry without rescanning"""
+        
+        registry = dict(self._kb_registry)
+        registry.setdefault(config["safe_name"], kb_path)
+        registry[config["name"]] = kb_path
+        
+        self._kb_registry = registry
+        self._kb_registry_mtime = self.knowledge_base_dir.stat().st_mtime_ns
+    
+    def _unregister_knowledge_base(self, kb_path: Path):
+        """Drop a deleted KB from the registry without rescanning"""
+        
+        self._kb_registry = {name: path for name, path in self._kb_registry.items() if path != kb_path}
+        self._kb_registry_mtime = self.knowledge_base_dir.stat().st_mtime_ns
@@ -0,0 +1,203 @@
+"""
+Approximate search (IVF lists, int8 and PQ codes) measured against exact search
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from guru_mcp.rag import IVFIndex, VectorMatrix, VectorQuantizer
+
+DIM = 32
+TOP_K = 10
+
+
+@pytest.fixture
+def clustered(tmp_path):
+    """A matrix of clustered unit vectors, with queries drawn near (but not on) stored rows"""
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(48, DIM))
+    vectors = (centers[rng.integers(len(centers), size=4000)] + 0.35 * rng.normal(size=(4000, DIM))).astype(np.float32)
+    queries = (vectors[rng.choice(len(vectors), size=50, replace=False)] + 0.2 * rng.normal(size=(50, DIM))).astype(np.float32)
+
+    matrix = VectorMatrix(tmp_path / "vectors", DIM)
+    matrix.append(range(1, len(vectors) + 1), vectors)
+    return matrix, queries
+
+
+def recall(matrix, queries, search):
+    """Mean fraction of the exact top-k that the approximate search also returns"""
+    hits = 0
+    for query in queries:
+        exact, _ = matrix.search(query, TOP_K)
+        approximate, scores = search(query)
+        assert len(approximate) == TOP_K and np.all(np.diff(scores) <= 1e-6)
+        hits += len(set(exact.tolist()) & set(approximate.tolist()))
+    return hits / (len(queries) * TOP_K)
+
+
+def test_ivf_recall_against_exact(clustered, tmp_path):
+    matrix, queries = clustered
+    index = IVFIndex(tmp_path / "ivf.npz", DIM)
+    assert index.sync(matrix) == len(matrix) and index.is_trained
+
+    assert recall(matrix, queries, lambda query: index.search(matrix, query, TOP_K, nprobe=index.nlist)) == 1.0
+    assert recall(matrix, queries, lambda query: index.search(matrix, query, TOP_K, nprobe=8)) >= 0.9
+
+    # A reloaded index answers the same way
+    reloaded = IVFIndex(tmp_path / "ivf.npz", DIM)
+    for query in queries[:5]:
+        assert reloaded.search(matrix, query, TOP_K, nprobe=8)[0].tolist() == index.search(matrix, query, TOP_K, nprobe=8)[0].tolist()
+
+
+def test_ivf_follows_appends_and_removes(clustered, tmp_path):
+    matrix, queries = clustered
+    index = IVFIndex(tmp_path / "ivf.npz", DIM)
+    index.sync(matrix)
+
+    # Re-add the query points themselves and drop every tenth stored row
+    matrix.append(range(5001, 5001 + len(queries)), queries)
+    removed = set(range(1, 4001, 10))
+    matrix.remove(sorted(removed))
+    assert index.sync(matrix) == len(queries)
+
+    for offset, query in enumerate(queries):
+        ids, scores = index.search(matrix, query, TOP_K, nprobe=8)
+        assert ids[0] == 5001 + offset and scores[0] == pytest.approx(1.0, abs=1e-5)
+        assert not removed & set(ids.tolist())
+
+
+def test_ivf_searches_race_retraining_syncs(clustered, tmp_path):
+    matrix, queries = clustered
+    index = IVFIndex(tmp_path / "ivf.npz", DIM)
+    index.retrain_growth_factor = 1.0  # every sync retrains and rebuilds all lists
+    index.sync(matrix)
+
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        rng = np.random.default_rng(1)
+        try:
+            for round_index in range(12):
+                first_id = 10_000 + round_index * 50
+                matrix.append(range(first_id, first_id + 50), queries[rng.choice(len(queries), size=50)])
+                index.sync(matrix)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                for query in queries[:10]:
+                    ids, _ = index.search(matrix, query, TOP_K, nprobe=4)
+                    assert len(ids) == TOP_K
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert index.state.indexed_count == len(matrix)
+
+
+# At 32 dimensions PQ has only four one-byte subvectors; a longer exact rerank shortlist makes up for it
+@pytest.mark.parametrize("kind, rerank_factor, minimum_recall", [("int8", 4, 0.98), ("pq", 4, 0.6), ("pq", 16, 0.98)])
+def test_quantizer_recall_against_exact(clustered, tmp_path, kind, rerank_factor, minimum_recall):
+    matrix, queries = clustered
+    quantizer = VectorQuantizer(tmp_path / "vectors", DIM, kind)
+    assert quantizer.sync(matrix) == len(matrix) and quantizer.is_trained
+    assert quantizer.code_bytes < matrix.matrix.nbytes / 3
+
+    assert recall(matrix, queries, lambda query: quantizer.search(matrix, query, TOP_K, rerank_factor)) >= minimum_recall
+
+    # Shortlisted rows are rescored from the float matrix, so returned scores are exact
+    for query in queries[:5]:
+        ids, scores = quantizer.search(matrix, query, TOP_K, rerank_factor)
+        np.testing.assert_allclose(scores, matrix.similarities(ids, query), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("kind", ["int8", "pq"])
+def test_quantizer_searches_race_syncs(clustered, tmp_path, kind):
+    matrix, queries = clustered
+    quantizer = VectorQuantizer(tmp_path / "vectors", DIM, kind)
+    quantizer.kmeans_iterations = 2  # retrains only need to be frequent, not good
+    quantizer.sync(matrix)
+
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        rng = np.random.default_rng(2)
+        try:
+            for round_index in range(40):
+                # Alternate incremental encodes with full retrains that rewrite the code file
+                quantizer.retrain_growth_factor = 1.0 if round_index % 4 == 0 else 4.0
+                first_id = 10_000 + round_index * 25
+                matrix.append(range(first_id, first_id + 25), queries[rng.choice(len(queries), size=25)])
+                quantizer.sync(matrix)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                for query in queries[:10]:
+                    ids, scores = quantizer.search(matrix, query, TOP_K)
+                    assert len(ids) == TOP_K
+                    np.testing.assert_allclose(scores, matrix.similarities(ids, query), rtol=1e-5, atol=1e-6)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert quantizer.encoded_count == len(matrix)
+
+    # A fresh quantizer picks up exactly the published codes from disk
+    reloaded = VectorQuantizer(tmp_path / "vectors", DIM, kind)
+    assert reloaded.encoded_count == len(matrix)
+    np.testing.assert_array_equal(reloaded.codes, quantizer.codes)
+
+
+def test_ivf_with_pq_codes_recall_against_exact(clustered, tmp_path):
+    matrix, queries = clustered
+    index = IVFIndex(tmp_path / "ivf.npz", DIM)
+    quantizer = VectorQuantizer(tmp_path / "vectors", DIM, "pq")
+    index.sync(matrix)
+    quantizer.sync(matrix)
+
+    assert recall(matrix, queries, lambda query: index.search(matrix, query, TOP_K, nprobe=8, quantizer=quantizer, rerank_factor=16)) >= 0.9
+
+
+def test_ivf_search_skips_ids_compacted_out_of_the_matrix(clustered, tmp_path):
+    matrix, queries = clustered
+    index = IVFIndex(tmp_path / "ivf.npz", DIM)
+    quantizer = VectorQuantizer(tmp_path / "vectors", DIM, "int8")
+    index.sync(matrix)
+    quantizer.sync(matrix)
+
+    # The index is not synced after the compaction, as when a query races a remove
+    removed = set(range(1500, 4001))
+    matrix.remove(sorted(removed))
+    matrix.compact()
+
+    for query in queries:
+        for ids, _ in (index.search(matrix, query, TOP_K, nprobe=8), index.search(matrix, query, TOP_K, nprobe=8, quantizer=quantizer)):
+            assert len(ids) and not removed & set(ids.tolist())
+            assert set(ids.tolist()) <= set(matrix.chunk_ids.tolist())
@@ -0,0 +1,139 @@
+"""
+Queries racing document writes and vector matrix compaction
+"""
+
+import asyncio
+import random
+import threading
+
+import numpy as np
+
+from conftest import WORDS, make_documents, run
+from guru_mcp.rag import VectorMatrix
+
+
+def test_queries_stay_consistent_during_remove_add_and_compaction(rag_tool):
+    rag_tool.vector_compaction_ratio = 0.01  # compact on nearly every remove
+    rag_tool.cache_rag_responses = False
+    rag_tool.query_cache_size = 0
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "race"})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "race",
+            "documents": make_documents(200), "enable_cognitive_analysis": False
+        })
+
+        writing = True
+        failures = []
+        query_count = 0
+
+        async def writer():
+            nonlocal writing
+            try:
+                for round_index in range(30):
+                    removed = [f"doc-{i:04d}.txt" for i in range(round_index * 6, round_index * 6 + 6)]
+                    result = await rag_tool.execute({"operation": "remove", "knowledge_base_name": "race", "filenames": removed})
+                    assert not result.startswith("## Error"), result
+                    result = await rag_tool.execute({
+                        "operation": "add_documents", "knowledge_base_name": "race",
+                        "documents": make_documents(6, prefix=f"new-{round_index}", seed=100 + round_index),
+                        "enable_cognitive_analysis": False
+                    })
+                    assert not result.startswith("## Error"), result
+            finally:
+                writing = False
+
+        async def reader(seed):
+            nonlocal query_count
+            rng = random.Random(seed)
+            while writing:
+                for search_mode in ("hybrid", "exact"):
+                    result = await rag_tool.execute({
+                        "operation": "query", "knowledge_base_name": "race", "search_mode": search_mode,
+                        "query": " ".join(rng.sample(WORDS, 4)), "include_cognitive_insights": False
+                    })
+                    query_count += 1
+                    if result.startswith("## Error"):
+                        failures.append(result)
+
+        await asyncio.gather(writer(), *(reader(seed) for seed in range(6)))
+        return failures, query_count
+
+    failures, query_count = run(scenario())
+
+    assert query_count > 0
+    assert failures == []
+
+
+def test_matrix_reads_race_appends_removes_and_compaction(tmp_path):
+    dim = 16
+    matrix = VectorMatrix(tmp_path / "vectors", dim)
+    rng = np.random.default_rng(0)
+    matrix.append(range(1, 2001), rng.normal(size=(2000, dim)).astype(np.float32))
+
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        try:
+            next_id = 2001
+            for _ in range(150):
+                ids = matrix.snapshot().chunk_ids
+                matrix.remove(ids[rng.choice(len(ids), size=40, replace=False)])
+                matrix.append(range(next_id, next_id + 40), rng.normal(size=(40, dim)).astype(np.float32))
+                next_id += 40
+                matrix.compact()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    def reader(seed):
+        reader_rng = np.random.default_rng(seed)
+        try:
+            while not stop.is_set():
+                query = reader_rng.normal(size=dim).astype(np.float32)
+                ids, _ = matrix.search(query, 10)
+                matrix.similarities(ids, query)
+
+                vectors = matrix.snapshot()
+                rows = vectors.live_rows(vectors.chunk_ids[::3])
+                filtered_ids, _ = vectors.search(query, 10, rows=rows)
+                assert set(filtered_ids.tolist()) <= set(vectors.chunk_ids[rows].tolist())
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_snapshot_survives_compaction(tmp_path):
+    matrix = VectorMatrix(tmp_path / "vectors", 8)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 8)).astype(np.float32)
+    matrix.append(range(1, 21), vectors)
+
+    snapshot = matrix.snapshot()
+    expected = snapshot.search(vectors[3], 5)
+
+    matrix.remove(range(1, 11))
+    matrix.compact()
+    matrix.append(range(21, 31), rng.normal(size=(10, 8)).astype(np.float32))
+
+    # The old snapshot still sees the original 20 rows; a new one sees the compacted layout
+    ids, scores = snapshot.search(vectors[3], 5)
+    assert ids.tolist() == expected[0].tolist()
+    np.testing.assert_allclose(scores, expected[1])
+    assert len(snapshot) == 20
+
+    current = matrix.snapshot()
+    assert len(current) == 20 and current.live_count == 20
+    assert current.chunk_ids.tolist() == list(range(11, 31))
+    assert not set(current.search(vectors[3], 20)[0].tolist()) & set(range(1, 11))
@@ -0,0 +1,109 @@
+"""
+Replacing and removing documents keeps the chunk store, keyword index and vector matrix in step
+"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import make_documents, run
+
+
+def paragraphs(document):
+    return document["content"].split("\n\n")
+
+
+def assert_consistent(db_path, vector_matrix, embedder, totals):
+    """Every table, index and counter derived from document_chunks agrees with it"""
+    with sqlite3.connect(db_path) as conn:
+        references = dict(conn.execute("SELECT chunk_id, COUNT(*) FROM document_chunks GROUP BY chunk_id").fetchall())
+        chunks = conn.execute("SELECT id, content, ref_count FROM chunks ORDER BY id").fetchall()
+
+        assert {chunk_id: ref_count for chunk_id, _, ref_count in chunks} == references
+        assert conn.execute("SELECT COUNT(*) FROM document_chunks WHERE document_id NOT IN (SELECT id FROM documents)").fetchone()[0] == 0
+
+        # rank=1 makes fts5 compare its index against the chunks table it mirrors
+        conn.execute("INSERT INTO chunks_fts (chunks_fts, rank) VALUES ('integrity-check', 1)")
+        assert conn.execute("SELECT COUNT(*) FROM chunks_fts").fetchone()[0] == len(chunks)
+
+        assert totals["documents"] == conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        assert totals["chunks"] == len(chunks)
+        assert totals["chunk_references"] == sum(references.values())
+
+    vectors = vector_matrix.snapshot()
+    assert sorted(vectors.chunk_ids[vectors.live_mask].tolist()) == [chunk_id for chunk_id, _, _ in chunks]
+    if chunks:
+        rows = vectors.rows_for([chunk_id for chunk_id, _, _ in chunks])
+        expected = embedder.embed_batch([content for _, content, _ in chunks])
+        np.testing.assert_allclose(vectors.matrix[rows].astype(np.float32), expected, atol=1e-2)
+
+    return {content: ref_count for _, content, ref_count in chunks}
+
+
+def keyword_hits(db_path, text):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH ?", (f'"{text}"',)).fetchone()[0]
+
+
+@pytest.mark.parametrize("compaction_ratio", [0.01, 1.0])
+def test_replace_and_remove_keep_chunk_store_consistent(rag_tool, compaction_ratio):
+    rag_tool.vector_compaction_ratio = compaction_ratio  # compact on every change, or never
+    alpha, beta, gamma, edits = make_documents(4, paragraphs=3)  # without overlap, each paragraph is one chunk
+    alpha_text, beta_text, gamma_text, edit_text = map(paragraphs, (alpha, beta, gamma, edits))
+
+    # beta shares its first two paragraphs with alpha
+    beta = dict(beta, content="\n\n".join(alpha_text[:2] + beta_text[2:]))
+    edited_alpha = dict(alpha, content="\n\n".join([alpha_text[0], edit_text[0], alpha_text[2]]))
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "docs"})
+        _, kb_path = await rag_tool._load_knowledge_base_config("docs")
+        db_path = kb_path / "knowledge_base.db"
+        vector_matrix = await rag_tool._get_vector_matrix(db_path)
+        embedder = await rag_tool._get_kb_embedder(db_path)
+
+        async def check():
+            return assert_consistent(db_path, vector_matrix, embedder, (await rag_tool._read_kb_stats(db_path))["totals"])
+
+        states = {}
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "docs", "documents": [alpha, beta, gamma],
+            "enable_cognitive_analysis": False, "chunk_overlap": 0
+        })
+        states["added"] = await check()
+
+        states["replace"] = await rag_tool.execute({
+            "operation": "replace", "knowledge_base_name": "docs", "documents": [edited_alpha], "enable_cognitive_analysis": False,
+            "chunk_overlap": 0
+        })
+        states["replaced"] = await check()
+
+        states["remove"] = await rag_tool.execute({"operation": "remove", "knowledge_base_name": "docs", "filenames": [beta["filename"]]})
+        states["removed"] = await check()
+
+        await rag_tool.execute({
+            "operation": "remove", "knowledge_base_name": "docs", "filenames": [alpha["filename"], gamma["filename"]]
+        })
+        states["emptied"] = await check()
+        states["keywords"] = {text: keyword_hits(db_path, text) for text in (alpha_text[1], edit_text[0])}
+        return states
+
+    states = run(scenario())
+
+    added = states["added"]
+    assert len(added) == 7  # 9 paragraphs, two of them shared
+    assert added[alpha_text[0]] == added[alpha_text[1]] == 2 and added[gamma_text[0]] == 1
+
+    assert "**Documents Replaced:** 1" in states["replace"] and "**Reused:** 2" in states["replace"]
+    assert "**Re-embedded:** 1" in states["replace"] and "**Removed:** 0" in states["replace"]
+    replaced = states["replaced"]
+    assert replaced[alpha_text[0]] == 2 and replaced[alpha_text[1]] == 1 and replaced[edit_text[0]] == 1
+
+    assert "**Chunks Removed:** 2" in states["remove"] and "**Shared Chunks Kept:** 1" in states["remove"]
+    removed = states["removed"]
+    assert alpha_text[1] not in removed and beta_text[2] not in removed
+    assert removed[alpha_text[0]] == 1 and len(removed) == 6
+
+    assert states["emptied"] == {}
+    assert states["keywords"] == {alpha_text[1]: 0, edit_text[0]: 0}
@@ -0,0 +1,128 @@
+"""
+Embedding backends behind the knowledge base
+"""
+
+import numpy as np
+import pytest
+
+from conftest import WORDS, make_documents, run
+from guru_mcp.rag import Embedder, HashingEmbedder, ONNXEmbedder
+
+
+def test_embedder_without_embed_batch_fails_at_construction():
+    class Incomplete(Embedder):
+        version = "incomplete"
+        dim = 4
+
+    with pytest.raises(TypeError, match="embed_batch"):
+        Incomplete()
+
+
+def test_hashing_embedder_is_stable_and_normalised():
+    embedder = HashingEmbedder(dim=64)
+    texts = ["harmonic quantum synthesis", "", "river granite meadow river"]
+
+    vectors = embedder.embed_batch(texts)
+
+    assert vectors.shape == (3, 64) and vectors.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), [1.0, 0.0, 1.0], atol=1e-6)
+    np.testing.assert_array_equal(embedder.embed(texts[2]), HashingEmbedder(dim=64).embed_batch(texts)[2])
+
+
+@pytest.fixture
+def onnx_model_dir(tmp_path):
+    """A tiny embedding-bag model: token embeddings gathered from a fixed table, with a word-level tokenizer"""
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    tokenizers = pytest.importorskip("tokenizers")
+    from onnx import TensorProto, helper, numpy_helper
+
+    vocab = {token: i for i, token in enumerate(["[PAD]", "[UNK]"] + WORDS)}
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = tokenizers.normalizers.Lowercase()
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+
+    table = np.random.default_rng(0).normal(size=(len(vocab), 12)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "embedding_bag",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "tokens"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "tokens"])
+        ],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "tokens", 12])],
+        initializer=[numpy_helper.from_array(table, "table")]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8)
+
+    model_dir = tmp_path / "tiny-model"
+    model_dir.mkdir()
+    onnx.save(model, model_dir / "model.onnx")
+    tokenizer.save(str(model_dir / "tokenizer.json"))
+    return model_dir, tokenizer, table
+
+
+def test_onnx_embedder_batches_by_length_and_mean_pools(onnx_model_dir, monkeypatch):
+    model_dir, tokenizer, table = onnx_model_dir
+    embedder = ONNXEmbedder(model_dir, batch_size=3)
+    texts = [" ".join(WORDS[i:i + length]) for i, length in enumerate([9, 1, 5, 2, 14, 3, 7, 1])] + [""]
+
+    batches = []
+    encode = embedder._encode
+
+    def recording_encode(batch):
+        batches.append([len(text) for text in batch])
+        return encode(batch)
+
+    monkeypatch.setattr(embedder, "_encode", recording_encode)
+    vectors = embedder.embed_batch(texts)
+
+    assert embedder.dim == 12 and embedder.cacheable and embedder.version.startswith("onnx-tiny-model-")
+    assert [len(batch) for batch in batches] == [3, 3, 3]
+    assert all(batch == sorted(batch) for batch in batches)
+    assert sum(batches, []) == sorted(len(text) for text in texts)
+
+    # Padding inside a batch must not change any text's vector
+    for text, vector in zip(texts, vectors):
+        ids = tokenizer.encode(text).ids
+        expected = table[ids].mean(axis=0) if ids else np.zeros(12, dtype=np.float32)
+        norm = np.linalg.norm(expected)
+        np.testing.assert_allclose(vector, expected / norm if norm else expected, atol=1e-5)
+
+
+def test_onnx_knowledge_base_reuses_cached_embeddings(rag_tool, onnx_model_dir, monkeypatch):
+    model_dir, _, _ = onnx_model_dir
+    documents = make_documents(4)
+
+    async def scenario():
+        result = await rag_tool.execute({
+            "operation": "create", "knowledge_base_name": "onnx", "embedder": "onnx", "embedding_model_path": str(model_dir)
+        })
+        assert not result.startswith("## Error"), result
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "onnx", "documents": documents, "enable_cognitive_analysis": False
+        })
+        _, kb_path = await rag_tool._load_knowledge_base_config("onnx")
+        db_path = kb_path / "knowledge_base.db"
+        embedder = await rag_tool._get_kb_embedder(db_path)
+        first = (await rag_tool._read_kb_stats(db_path))["embedding_cache"]
+
+        embedded = []
+        embed_batch = embedder.embed_batch
+        monkeypatch.setattr(embedder, "embed_batch", lambda texts: embedded.extend(texts) or embed_batch(texts))
+
+        await rag_tool.execute({"operation": "remove", "knowledge_base_name": "onnx", "filenames": [documents[0]["filename"]]})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "onnx", "documents": documents[:1], "enable_cognitive_analysis": False
+        })
+        answer = await rag_tool.execute({
+            "operation": "query", "knowledge_base_name": "onnx", "query": documents[2]["content"][:200],
+            "search_mode": "exact", "include_cognitive_insights": False
+        })
+        return embedder, first, (await rag_tool._read_kb_stats(db_path))["totals"], embedded, answer
+
+    embedder, cached, totals, embedded, answer = run(scenario())
+
+    assert cached == {embedder.version: totals["chunks"]} and totals["chunks"] > len(documents)
+    assert embedded == [documents[2]["content"][:200]]  # only the query; the re-added chunks came from the cache
+    assert documents[2]["filename"] in answer
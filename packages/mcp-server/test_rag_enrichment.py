@@ -0,0 +1,81 @@
+"""
+Deferred enrichment: queued jobs are drained in the background, and failed batches are retried
+"""
+
+import sqlite3
+
+from conftest import make_documents, run
+
+
+def job_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT status, attempts, last_error FROM enrichment_jobs ORDER BY id").fetchall()
+
+
+def analysed_chunks(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(DISTINCT chunk_id) FROM cognitive_analysis").fetchone()[0]
+
+
+def enrich_with_failures(rag_tool, failures):
+    """Add deferred documents and drain the queue, with the first `failures` batches raising mid-analysis"""
+    enrich_chunks = rag_tool._enrich_chunks
+    calls = []
+
+    async def flaky_enrich_chunks(contents, concurrency):
+        calls.append(job_rows(db_path))  # the jobs as this batch claimed them
+        if len(calls) <= failures:
+            raise RuntimeError("bridge offline")
+        return await enrich_chunks(contents, concurrency)
+
+    rag_tool._enrich_chunks = flaky_enrich_chunks
+
+    async def scenario():
+        nonlocal db_path
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "deferred"})
+        _, kb_path = await rag_tool._load_knowledge_base_config("deferred")
+        db_path = kb_path / "knowledge_base.db"
+
+        added = await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "deferred", "documents": make_documents(4),
+            "enable_cognitive_analysis": True, "enrichment_mode": "deferred", "chunk_overlap": 0
+        })
+        await rag_tool._enrichment_task
+        info = await rag_tool.execute({"operation": "info", "knowledge_base_name": "deferred"})
+        return added, info, (await rag_tool._read_kb_stats(db_path))["jobs"]
+
+    db_path = None
+    added, info, job_counts = run(scenario())
+    return db_path, calls, added, info, job_counts
+
+
+def test_deferred_jobs_are_drained(rag_tool):
+    db_path, calls, added, info, job_counts = enrich_with_failures(rag_tool, failures=0)
+
+    assert "**Chunks Queued:** 12" in added, added
+    assert calls == [[("running", 0, None)] * 12]
+    assert job_rows(db_path) == [] and job_counts == {}
+    assert analysed_chunks(db_path) == 12
+    assert "**Queue Depth:** 0 chunks (0 in progress)" in info and "**Completed This Session:** 12" in info
+
+
+def test_failed_batch_is_released_and_retried(rag_tool):
+    db_path, calls, _, info, job_counts = enrich_with_failures(rag_tool, failures=1)
+
+    # The failed batch went back to pending with its error recorded, and the worker picked it up again
+    assert len(calls) == 2
+    assert calls[1] == [("running", 1, "bridge offline")] * 12
+    assert job_rows(db_path) == [] and job_counts == {}
+    assert analysed_chunks(db_path) == 12
+    assert "**Queue Depth:** 0 chunks" in info and "**Completed This Session:** 12" in info
+
+
+def test_jobs_out_of_attempts_are_failed_not_left_running(rag_tool):
+    rag_tool.enrichment_max_attempts = 2
+    db_path, calls, _, info, job_counts = enrich_with_failures(rag_tool, failures=10)
+
+    assert len(calls) == 2
+    assert job_rows(db_path) == [("failed", 2, "bridge offline")] * 12
+    assert job_counts == {"failed": 12}
+    assert analysed_chunks(db_path) == 0
+    assert "**Queue Depth:** 0 chunks" in info and "**Failed Jobs:** 12" in info
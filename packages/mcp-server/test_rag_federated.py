@@ -0,0 +1,73 @@
+"""
+Federated queries: several knowledge bases searched together and merged on one scale
+"""
+
+from conftest import make_documents, run
+
+QUERY = "harmonic quantum lantern"
+
+
+def candidate(chunk_id, vector_similarity, keyword_bm25, **extra):
+    return dict({
+        "chunk_id": chunk_id, "content": f"chunk {chunk_id}", "document_id": 1, "filename": f"{chunk_id}.txt", "category": "general",
+        "score": 0.0, "vector_similarity": vector_similarity, "keyword_score": 1.0, "keyword_bm25": keyword_bm25
+    }, **extra)
+
+
+def test_merge_normalises_bm25_across_knowledge_bases(rag_tool):
+    # Each KB's best keyword match scored 1.0 against its own maximum; the weak KB only matched one term
+    per_kb_results = [
+        ("weak", [candidate(1, 0.35, 1.0), candidate(2, 0.12, 0.5)]),
+        ("strong", [
+            candidate(1, 0.30, 12.0), candidate(3, 0.28, 9.0),
+            candidate(4, 0.40, 0.0, score=0.5, graph_hop=1, graph_seed=1, graph_concept="lantern"),
+            candidate(5, 0.40, 0.0, score=0.5, graph_hop=1, graph_seed=99, graph_concept="lantern")
+        ])
+    ]
+
+    merged = rag_tool._merge_federated_chunks(per_kb_results, 3)
+
+    assert [(chunk["knowledge_base"], chunk["chunk_id"]) for chunk in merged] == [
+        ("strong", 1), ("strong", 3), ("weak", 1),
+        ("strong", 4)  # graph neighbours follow, and only for seeds that made the global top-k
+    ]
+    assert merged[0]["keyword_score"] == 1.0 and merged[2]["keyword_score"] == 1.0 / 12.0
+    assert merged[0]["score"] == 0.30 * 0.7 + 0.3
+    assert merged[0]["score"] > merged[1]["score"] > merged[2]["score"]
+
+
+def test_federated_query_answers_once_over_merged_results(rag_tool):
+    rag_tool.query_cache_size = 0
+    prompts = []
+    generate = rag_tool.phi4_wingman.generate_specialized_response
+
+    async def recording_generate(prompt, specialization):
+        prompts.append(prompt)
+        return await generate(prompt, specialization)
+
+    rag_tool.phi4_wingman.generate_specialized_response = recording_generate
+    matching = {"filename": "match.txt", "content": " ".join([QUERY] * 40).capitalize() + ".", "category": "notes"}
+
+    async def scenario():
+        for kb_name, documents in (
+            ("fed-notes", make_documents(5, prefix="note") + [matching]),
+            ("fed-misc", make_documents(20, prefix="misc", seed=1)),
+            ("archive", [dict(matching, filename="archived.txt")])
+        ):
+            await rag_tool.execute({"operation": "create", "knowledge_base_name": kb_name})
+            await rag_tool.execute({
+                "operation": "add_documents", "knowledge_base_name": kb_name, "documents": documents, "enable_cognitive_analysis": False
+            })
+
+        return await rag_tool.execute({
+            "operation": "query", "knowledge_base_name": "fed-*", "knowledge_base_names": ["missing"], "query": QUERY,
+            "max_results": 6, "include_cognitive_insights": False
+        })
+
+    answer = run(scenario())
+
+    assert answer.startswith("## 🧠"), answer
+    assert len(prompts) == 1 and "[fed-notes/match.txt]" in prompts[0]
+    assert "**Knowledge Base:** fed-misc, fed-notes" in answer
+    assert "1. **fed-notes/match.txt**" in answer and "archive" not in answer
+    assert "**Knowledge Bases Searched:** 2" in answer and "**Not Found:** missing" in answer
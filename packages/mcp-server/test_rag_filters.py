@@ -0,0 +1,99 @@
+"""
+Metadata filters on queries: only chunks of matching documents are ever scored or returned
+"""
+
+import fnmatch
+import sqlite3
+
+import pytest
+
+from conftest import WORDS, make_documents, run
+
+QUERIES = [" ".join(WORDS[i:i + 3]) for i in range(0, 24, 4)]
+FILTERS = [
+    ({"category": "cat-1"}, lambda filename, category, added_at: category == "cat-1"),
+    ({"category": ["cat-1", "shared"]}, lambda filename, category, added_at: category in ("cat-1", "shared")),
+    ({"filename_glob": "new-*"}, lambda filename, category, added_at: fnmatch.fnmatchcase(filename, "new-*")),
+    ({"added_before": "2021-01-01"}, lambda filename, category, added_at: added_at < "2021"),
+    (
+        {"category": "cat-2", "added_after": "2021-01-01T00:00:00+00:00"},
+        lambda filename, category, added_at: category == "cat-2" and added_at >= "2021"
+    )
+]
+
+
+@pytest.mark.parametrize("search_mode", ["hybrid", "exact", "ann"])
+def test_filtered_queries_only_return_matching_documents(rag_tool, search_mode):
+    old_documents = make_documents(30, prefix="old")
+    # A chunk shared with a document outside the filter is attributed to the matching one
+    shared = {"filename": "shared.txt", "content": old_documents[0]["content"].split("\n\n")[0], "category": "shared"}
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "filtered", "enable_ann_index": True})
+        _, kb_path = await rag_tool._load_knowledge_base_config("filtered")
+        db_path = kb_path / "knowledge_base.db"
+
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "filtered", "documents": old_documents,
+            "enable_cognitive_analysis": False, "chunk_overlap": 0
+        })
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE documents SET added_at = '2020-06-01T00:00:00+00:00'")
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "filtered",
+            "documents": make_documents(30, prefix="new", seed=1) + [shared], "enable_cognitive_analysis": False, "chunk_overlap": 0
+        })
+
+        with sqlite3.connect(db_path) as conn:
+            documents = {filename: (category, added_at) for filename, category, added_at in conn.execute(
+                "SELECT filename, category, added_at FROM documents"
+            )}
+
+        results = []
+        for filter_args, predicate in FILTERS:
+            filters = rag_tool._parse_query_filters(filter_args)
+            for query in QUERIES + [shared["content"][:200]]:
+                for graph_hops in (0, 1):
+                    chunks = await rag_tool._retrieve_relevant_chunks(
+                        db_path, query, 8, search_mode, None, None, filters, graph_hops
+                    )
+                    results.append((filter_args, predicate, chunks))
+        return documents, results
+
+    documents, results = run(scenario())
+
+    for filter_args, predicate, chunks in results:
+        assert chunks, filter_args
+        for chunk in chunks:
+            assert predicate(chunk["filename"], *documents[chunk["filename"]]), (filter_args, chunk["filename"])
+
+    shared_hits = [
+        chunk["filename"] for filter_args, _, chunks in results if filter_args == FILTERS[1][0] for chunk in chunks
+        if chunk["content"] == shared["content"]
+    ]
+    assert shared_hits and set(shared_hits) == {"shared.txt"}
+
+
+def test_filters_that_match_nothing_and_bad_dates(rag_tool):
+    rag_tool.query_cache_size = 0
+
+    async def query(**filters):
+        return await rag_tool.execute(dict({
+            "operation": "query", "knowledge_base_name": "filtered", "query": QUERIES[0], "include_cognitive_insights": False
+        }, **filters))
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "filtered"})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "filtered", "documents": make_documents(12),
+            "enable_cognitive_analysis": False
+        })
+        return await query(category="missing"), await query(filename_glob="doc-000[0-2].txt"), await query(added_after="last tuesday")
+
+    no_match, by_filename, bad_date = run(scenario())
+
+    assert no_match.startswith("## 🔍 No Relevant Information Found") and "**Filters:** category in missing" in no_match
+    assert "Loosening the category, filename or date filters" in no_match
+    sources = [line for line in by_filename.splitlines() if "- Relevance:" in line]
+    assert sources and all(any(f"doc-000{i}.txt" in line for i in range(3)) for line in sources)
+    assert bad_date.startswith("## Error") and "Invalid added_after" in bad_date
@@ -0,0 +1,92 @@
+"""
+The concept graph built at ingest time, and graph-expanded retrieval over it
+"""
+
+import sqlite3
+
+from conftest import make_documents, run
+
+QUERY = "zephyr beacons"
+GRAPH_DOCUMENTS = [
+    {"filename": "seed.txt", "content": "Zephyr beacons relay signals across the valley. Each zephyr beacon follows the Aurora Protocol when it wakes."},
+    {"filename": "linked.txt", "content": "Auditors review the Aurora Protocol every quarter and sign the compliance ledger."},
+    {"filename": "bridge.txt", "content": "The Aurora Protocol hands control to the Borealis Engine during storms."},
+    {"filename": "far.txt", "content": "Mechanics overhaul the Borealis Engine in the hangar each winter."}
+]
+
+
+def graph_counts(db_path):
+    """Node and edge counts from the tables, and as kept in kb_stats"""
+    with sqlite3.connect(db_path) as conn:
+        nodes = dict(conn.execute("SELECT node_type, COUNT(*) FROM knowledge_nodes GROUP BY node_type").fetchall())
+        edges = dict(conn.execute("SELECT relationship_type, COUNT(*) FROM knowledge_relationships GROUP BY relationship_type").fetchall())
+        chunk_nodes = conn.execute("SELECT COUNT(*) FROM knowledge_nodes WHERE node_type = 'chunk'").fetchone()[0]
+        chunks = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        dangling = conn.execute("""
+            SELECT COUNT(*) FROM knowledge_relationships r
+            WHERE NOT EXISTS (SELECT 1 FROM knowledge_nodes n WHERE n.node_id = r.from_node_id)
+               OR NOT EXISTS (SELECT 1 FROM knowledge_nodes n WHERE n.node_id = r.to_node_id)
+        """).fetchone()[0]
+    return nodes, edges, chunk_nodes == chunks, dangling
+
+
+def test_graph_expansion_follows_concepts_one_and_two_hops(rag_tool):
+    rag_tool.query_cache_size = 0
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "graph"})
+        _, kb_path = await rag_tool._load_knowledge_base_config("graph")
+        db_path = kb_path / "knowledge_base.db"
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "graph",
+            "documents": make_documents(20) + [dict(document, category="graph") for document in GRAPH_DOCUMENTS],
+            "enable_cognitive_analysis": False
+        })
+
+        async def retrieve(graph_hops):
+            return await rag_tool._retrieve_relevant_chunks(db_path, QUERY, 4, "hybrid", None, None, {}, graph_hops)
+
+        results = {hops: await retrieve(hops) for hops in (0, 1, 2)}
+        results["counts"] = graph_counts(db_path)
+        results["stats"] = await rag_tool._read_kb_stats(db_path)
+        results["answer"] = await rag_tool.execute({
+            "operation": "query", "knowledge_base_name": "graph", "query": QUERY, "max_results": 4, "graph_hops": 2,
+            "include_cognitive_insights": False
+        })
+        results["too_far"] = await rag_tool.execute({
+            "operation": "query", "knowledge_base_name": "graph", "query": QUERY, "graph_hops": 3
+        })
+
+        # Without the bridge document the two concepts no longer co-occur
+        await rag_tool.execute({"operation": "remove", "knowledge_base_name": "graph", "filenames": ["bridge.txt"]})
+        results["after_remove"] = await retrieve(2)
+        results["counts_after_remove"] = graph_counts(db_path)
+        return results
+
+    results = run(scenario())
+
+    def reached(chunks):
+        return {chunk["filename"]: chunk.get("graph_hop") for chunk in chunks}
+
+    assert reached(results[0]) == {"seed.txt": None}
+    assert reached(results[1]) == {"seed.txt": None, "linked.txt": 1, "bridge.txt": 1}
+    assert reached(results[2]) == {"seed.txt": None, "linked.txt": 1, "bridge.txt": 1, "far.txt": 2}
+    assert reached(results["after_remove"]) == {"seed.txt": None, "linked.txt": 1}
+
+    seed, *expanded = results[2]
+    for chunk in expanded:
+        assert chunk["graph_seed"] == seed["chunk_id"] and chunk["score"] < seed["score"]
+    far = expanded[-1]
+    assert "borealis" in far["graph_concept"].lower() and far["score"] < min(chunk["score"] for chunk in expanded[:-1])
+
+    # The kb_stats counters agree with the tables, and every edge joins two existing nodes
+    for key in ("counts", "counts_after_remove"):
+        nodes, edges, chunk_nodes_match, dangling = results[key]
+        assert nodes["entity"] + nodes["term"] > 0 and edges["mentions"] > 0 and edges["co_occurs"] > 0
+        assert chunk_nodes_match and dangling == 0
+    nodes, edges, _, _ = results["counts"]
+    assert results["stats"]["graph_nodes"] == nodes and results["stats"]["graph_edges"] == edges
+
+    assert "### 🕸️ Related via Knowledge Graph" in results["answer"] and "**far.txt** - via" in results["answer"]
+    assert "(2 hops)" in results["answer"]
+    assert results["too_far"].startswith("## Error") and "graph_hops must be between 0 and 2" in results["too_far"]
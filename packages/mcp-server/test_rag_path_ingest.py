@@ -0,0 +1,145 @@
+"""
+Server-side path ingestion, including files streamed from disk through the chunker
+"""
+
+import hashlib
+import sqlite3
+
+import pytest
+
+from conftest import make_documents, run
+from guru_mcp.tools.rag_knowledge_base import RAGKnowledgeBaseTool
+
+
+def write_corpus(directory, documents):
+    directory.mkdir(parents=True, exist_ok=True)
+    for document in documents:
+        (directory / document["filename"]).write_text(document["content"], encoding="utf-8")
+
+
+async def kb_db_path(tool, kb_name):
+    _, kb_path = await tool._load_knowledge_base_config(kb_name)
+    return kb_path / "knowledge_base.db"
+
+
+def stored_chunks(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("""
+            SELECT d.filename, d.content_hash, d.size_bytes, d.word_count, dc.chunk_index, dc.start_position, dc.end_position, c.content
+            FROM documents d JOIN document_chunks dc ON dc.document_id = d.id JOIN chunks c ON c.id = dc.chunk_id
+            ORDER BY d.filename, dc.chunk_index
+        """).fetchall()
+
+
+def test_streamed_files_match_in_memory_ingest(rag_tool, tmp_path):
+    documents = make_documents(3, paragraphs=40)
+    write_corpus(tmp_path / "corpus", documents)
+    rag_tool.stream_file_bytes = 10_000  # every file here is larger
+    rag_tool.stream_chunk_batch = 7
+
+    progress = []
+
+    async def reporter(value, total, message):
+        progress.append(value)
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "streamed"})
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "in-memory"})
+        result = await rag_tool.execute({
+            "operation": "add_path", "knowledge_base_name": "streamed", "path": str(tmp_path / "corpus"),
+            "file_types": ["docs"], "enable_cognitive_analysis": False
+        }, progress=reporter)
+        assert "**Documents Added:** 3" in result, result
+
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "in-memory", "enable_cognitive_analysis": False,
+            "documents": [dict(document, filename=f"corpus/{document['filename']}", category="docs") for document in documents]
+        })
+
+        rerun = await rag_tool.execute({
+            "operation": "add_path", "knowledge_base_name": "streamed", "path": str(tmp_path / "corpus"),
+            "file_types": ["docs"], "enable_cognitive_analysis": False
+        })
+        assert "**Documents Added:** 0" in rerun and "**Documents Skipped:** 3" in rerun, rerun
+
+        return await kb_db_path(rag_tool, "streamed"), await kb_db_path(rag_tool, "in-memory")
+
+    streamed_db, in_memory_db = run(scenario())
+
+    streamed = stored_chunks(streamed_db)
+    assert len(streamed) > 3 * rag_tool.stream_chunk_batch  # several batches per file
+    assert streamed == stored_chunks(in_memory_db)
+
+    with sqlite3.connect(streamed_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM documents WHERE content = ''").fetchone()[0] == 3
+
+    assert progress == sorted(progress) and len(set(progress)) == len(progress)
+    assert progress[-1] == sum(len(document["content"].encode()) for document in documents)
+
+
+def test_failed_stream_removes_partial_document(rag_tool, tmp_path, monkeypatch):
+    write_corpus(tmp_path / "corpus", make_documents(1, paragraphs=40))
+    rag_tool.stream_file_bytes = 10_000
+    rag_tool.stream_chunk_batch = 5
+
+    embed_chunks = rag_tool._embed_chunks
+    calls = []
+
+    async def failing_embed_chunks(*args):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("embedding backend went away")
+        return await embed_chunks(*args)
+
+    monkeypatch.setattr(rag_tool, "_embed_chunks", failing_embed_chunks)
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "partial"})
+        result = await rag_tool.execute({
+            "operation": "add_path", "knowledge_base_name": "partial", "path": str(tmp_path / "corpus"),
+            "enable_cognitive_analysis": False
+        })
+        db_path = await kb_db_path(rag_tool, "partial")
+        return result, db_path, (await rag_tool._read_kb_stats(db_path))["totals"], await rag_tool._get_vector_matrix(db_path)
+
+    result, db_path, totals, vector_matrix = run(scenario())
+
+    assert result.startswith("## Error") and "embedding backend went away" in result
+    assert totals["documents"] == 0 and totals["chunks"] == 0
+    assert vector_matrix.live_count == 0 and len(vector_matrix) == 10  # two committed batches, tombstoned
+    with sqlite3.connect(db_path) as conn:
+        for table in ("documents", "document_chunks", "chunks"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+
+
+def test_add_path_skips_only_binary_and_disallowed_files(rag_tool, tmp_path):
+    corpus = tmp_path / "corpus"
+    write_corpus(corpus, make_documents(2, paragraphs=40))
+    (corpus / "image.txt").write_bytes(b"GIF89a\0\0binary")
+    (corpus / "outside.md").symlink_to("/etc/hostname")
+    rag_tool.filesystem_tool.max_file_size = 1_000  # an analysis limit; ingest ignores it
+    rag_tool.stream_file_bytes = 10_000
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "sizes"})
+        return await rag_tool.execute({
+            "operation": "add_path", "knowledge_base_name": "sizes", "path": str(corpus), "enable_cognitive_analysis": False
+        })
+
+    result = run(scenario())
+
+    assert "**Documents Added:** 2" in result, result
+    assert "**binary:** 1" in result and "**outside allowed directories:** 1" in result
+    assert "too large" not in result
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 7, 64])
+def test_scan_text_file_matches_whole_text(tmp_path, read_size):
+    text = "Grüße  aus\nKöln —\tzwei   Wörter.  \n\nEnde" * 5
+    path = tmp_path / "sample.txt"
+    path.write_bytes(text.encode() + b"\xff trailing")
+
+    decoded = path.read_bytes().decode("utf-8", errors="replace")
+    assert RAGKnowledgeBaseTool._scan_text_file(path, read_size) == (
+        hashlib.md5(decoded.encode()).hexdigest(), len(decoded.encode()), len(decoded.split())
+    )
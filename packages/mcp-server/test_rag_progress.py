@@ -0,0 +1,100 @@
+"""
+Queries stream their retrieved sources ahead of the answer, and generate the answer concurrently with synthesis
+"""
+
+import asyncio
+
+from conftest import make_documents, run
+
+QUERY = "harmonic quantum lantern"
+
+
+async def create_kb(rag_tool):
+    await rag_tool.execute({"operation": "create", "knowledge_base_name": "streamed"})
+    await rag_tool.execute({
+        "operation": "add_documents", "knowledge_base_name": "streamed", "documents": make_documents(20),
+        "enable_cognitive_analysis": False
+    })
+
+
+def query_args(**args):
+    return dict({"operation": "query", "knowledge_base_name": "streamed", "query": QUERY, "max_results": 4}, **args)
+
+
+def test_sources_are_reported_before_the_answer_is_generated(rag_tool):
+    rag_tool.query_cache_size = 0
+    events = []
+    generate = rag_tool.phi4_wingman.generate_specialized_response
+
+    async def recording_generate(prompt, specialization):
+        events.append("generate")
+        return await generate(prompt, specialization)
+
+    async def reporter(progress, total, message):
+        events.append((progress, total, message))
+
+    rag_tool.phi4_wingman.generate_specialized_response = recording_generate
+
+    async def scenario():
+        await create_kb(rag_tool)
+        streamed = await rag_tool.execute(query_args(include_cognitive_insights=False), progress=reporter)
+        silent = await rag_tool.execute(query_args(include_cognitive_insights=False))
+        return streamed, silent
+
+    streamed, silent = run(scenario())
+
+    assert streamed == silent
+    sources, generated, answered, generated_again = events
+    assert generated == "generate" and generated_again == "generate"  # the second query had no reporter
+    assert answered == (2, 2, "Answer generated")
+
+    progress, total, message = sources
+    assert (progress, total) == (1, 2)
+    lines = message.splitlines()
+    assert lines[0] == "Retrieved 4 chunks from streamed; generating answer"
+    assert len(lines) == 5 and all("Relevance:" in line and "BM25" in line for line in lines[1:])
+    # Every source the answer lists was already streamed, in the same order
+    answer_sources = [line.split("**")[1] for line in streamed.splitlines() if "- Relevance:" in line]
+    assert [line.split(". ", 1)[1].split(" (")[0] for line in lines[1:]] == answer_sources
+
+
+def test_answer_and_synthesis_run_concurrently(rag_tool):
+    rag_tool.query_cache_size = 0
+    generate = rag_tool.phi4_wingman.generate_specialized_response
+    synthesize = rag_tool.core_bridge.invoke_quantum_synthesizer
+
+    async def scenario():
+        started = {"answer": asyncio.Event(), "synthesis": asyncio.Event()}  # bound to this scenario's loop
+
+        # Each call waits for the other to start, which only completes if they overlap
+        async def waiting_generate(prompt, specialization):
+            started["answer"].set()
+            await asyncio.wait_for(started["synthesis"].wait(), 5)
+            return await generate(prompt, specialization)
+
+        async def waiting_synthesize(prompt, contents):
+            started["synthesis"].set()
+            await asyncio.wait_for(started["answer"].wait(), 5)
+            return await synthesize(prompt, contents)
+
+        await create_kb(rag_tool)
+        rag_tool.phi4_wingman.generate_specialized_response = waiting_generate
+        rag_tool.core_bridge.invoke_quantum_synthesizer = waiting_synthesize
+        with_insights = await rag_tool.execute(query_args(include_cognitive_insights=True))
+
+        # A failed synthesis still leaves the answer, and a broken reporter never fails the query
+        async def failing_synthesize(prompt, contents):
+            raise RuntimeError("synthesizer offline")
+
+        async def failing_reporter(progress, total, message):
+            raise ConnectionError("client went away")
+
+        rag_tool.phi4_wingman.generate_specialized_response = generate
+        rag_tool.core_bridge.invoke_quantum_synthesizer = failing_synthesize
+        without_synthesis = await rag_tool.execute(query_args(include_cognitive_insights=True), progress=failing_reporter)
+        return with_insights, without_synthesis
+
+    with_insights, without_synthesis = run(scenario())
+
+    assert with_insights.startswith("## 🧠") and "Stub answer" in with_insights, with_insights
+    assert without_synthesis.startswith("## 🧠") and "Stub answer" in without_synthesis, without_synthesis
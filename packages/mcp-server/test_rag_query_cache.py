@@ -0,0 +1,107 @@
+"""
+The query cache serves repeated queries until the knowledge base's content changes
+"""
+
+from conftest import make_documents, run
+from guru_mcp.rag import QueryCache
+
+QUERY = "harmonic quantum lantern"
+FRESH = {"filename": "fresh.txt", "content": " ".join([QUERY] * 40).capitalize() + ".", "category": "fresh"}
+
+
+def test_results_computed_before_a_version_bump_are_not_stored():
+    cache = QueryCache(max_entries=2)
+    stale_key = cache.key("kb", "  Harmonic   Quantum ", 5)
+    cache.bump_version("kb")  # documents were added while the stale result was being computed
+    cache.put(stale_key, {"chunks": ["stale"]})
+    assert len(cache) == 0
+
+    key = cache.key("kb", "harmonic quantum", 5)
+    cache.put(key, {"chunks": ["fresh"]})
+    cache.put(cache.key("other", "harmonic quantum", 5), {"chunks": []})
+    assert cache.get(cache.key("kb", "HARMONIC quantum", 5)) == {"chunks": ["fresh"]}
+
+    cache.bump_version("kb")
+    assert cache.get(key) is None and len(cache) == 1
+    assert cache.stats("kb") == {"entries": 0, "hits": 1, "misses": 1, "hit_rate": 0.5, "version": 2}
+
+
+def test_cached_queries_miss_after_content_changes(rag_tool):
+    rag_tool.cache_rag_responses = True
+    retrievals = []
+    retrieve = rag_tool._retrieve_relevant_chunks
+
+    async def counting_retrieve(*args, **kwargs):
+        retrievals.append(args[1])
+        return await retrieve(*args, **kwargs)
+
+    rag_tool._retrieve_relevant_chunks = counting_retrieve
+
+    async def query(**args):
+        return await rag_tool.execute(dict({
+            "operation": "query", "knowledge_base_name": "cached", "query": QUERY, "include_cognitive_insights": False
+        }, **args))
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "cached"})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "cached", "documents": make_documents(30),
+            "enable_cognitive_analysis": False
+        })
+        answers = {"first": await query(), "repeat": await query(), "other_mode": await query(response_mode="concise")}
+        retrievals_before_add = len(retrievals)
+
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "cached", "documents": [FRESH], "enable_cognitive_analysis": False
+        })
+        answers["after_add"] = await query()
+        answers["after_add_repeat"] = await query()
+
+        await rag_tool.execute({"operation": "remove", "knowledge_base_name": "cached", "filenames": [FRESH["filename"]]})
+        answers["after_remove"] = await query()
+
+        _, kb_path = await rag_tool._load_knowledge_base_config("cached")
+        info = await rag_tool.execute({"operation": "info", "knowledge_base_name": "cached"})
+        return answers, retrievals_before_add, rag_tool.query_cache.stats(str(kb_path)), info
+
+    answers, retrievals_before_add, stats, info = run(scenario())
+
+    # The repeat is a hit; a different response mode is its own entry
+    assert answers["repeat"] == answers["first"]
+    assert retrievals_before_add == 2
+
+    # Adding a document bumps the content version, so the next query sees it
+    assert "fresh.txt" not in answers["first"] and "fresh.txt" in answers["after_add"]
+    assert answers["after_add_repeat"] == answers["after_add"]
+    assert "fresh.txt" not in answers["after_remove"]
+    assert len(retrievals) == 4
+
+    assert stats["hits"] == 2 and stats["misses"] == 4 and stats["version"] >= 2
+    assert "**Hit Rate:** 33.3% (2 hits, 4 misses)" in info
+
+
+def test_disabled_cache_always_retrieves(rag_tool):
+    rag_tool.query_cache_size = 0
+    retrievals = []
+    retrieve = rag_tool._retrieve_relevant_chunks
+
+    async def counting_retrieve(*args, **kwargs):
+        retrievals.append(args[1])
+        return await retrieve(*args, **kwargs)
+
+    rag_tool._retrieve_relevant_chunks = counting_retrieve
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "uncached"})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "uncached", "documents": make_documents(10),
+            "enable_cognitive_analysis": False
+        })
+        for _ in range(3):
+            await rag_tool.execute({
+                "operation": "query", "knowledge_base_name": "uncached", "query": QUERY, "include_cognitive_insights": False
+            })
+
+    run(scenario())
+
+    assert len(retrievals) == 3 and len(rag_tool.query_cache) == 0
@@ -0,0 +1,97 @@
+"""
+Process-parallel sharded search returns exactly what the in-process scan returns
+"""
+
+import numpy as np
+import pytest
+
+from conftest import WORDS, make_documents, run
+from guru_mcp.rag import ShardedSearcher, VectorMatrix
+
+DIM = 24
+
+
+@pytest.fixture(scope="module")
+def searcher():
+    searcher = ShardedSearcher(shard_rows=700, block_rows=128, processes=2)
+    yield searcher
+    searcher.close()
+
+
+def assert_same_results(matrix, searcher, queries, top_k):
+    for query in queries:
+        expected_ids, expected_scores = matrix.search(query, top_k)
+        ids, scores = searcher.search(matrix, query, top_k)
+        np.testing.assert_array_equal(scores, expected_scores)
+        # Rows with exactly equal scores may come back in either order
+        assert sorted(zip(scores.tolist(), ids.tolist())) == sorted(zip(expected_scores.tolist(), expected_ids.tolist()))
+
+
+def test_sharded_search_matches_in_process_scan(searcher, tmp_path):
+    rng = np.random.default_rng(3)
+    matrix = VectorMatrix(tmp_path / "vectors", DIM)
+    matrix.append(range(1, 5001), rng.normal(size=(5000, DIM)).astype(np.float32))
+    queries = rng.normal(size=(12, DIM)).astype(np.float32)
+
+    assert searcher.should_shard(matrix) and len(searcher.shards(len(matrix))) == 8  # the last shard is short
+    for top_k in (1, 10, 1500):  # 1500 spans more than one shard's worth of rows
+        assert_same_results(matrix, searcher, queries, top_k)
+
+    # Tombstoned rows, then appended and compacted layouts
+    matrix.remove(range(1, 5001, 3))
+    assert_same_results(matrix, searcher, queries, 50)
+    matrix.append(range(5001, 5601), rng.normal(size=(600, DIM)).astype(np.float32))
+    assert_same_results(matrix, searcher, queries, 50)
+    matrix.compact()
+    assert_same_results(matrix, searcher, queries, 50)
+
+    # Asking for more rows than are live returns every live row once
+    matrix.remove(range(1, 5601, 2))
+    ids, _ = searcher.search(matrix, queries[0], 10_000)
+    assert sorted(ids.tolist()) == sorted(matrix.chunk_ids[matrix.live_mask].tolist())
+
+
+def test_exact_queries_agree_with_and_without_process_pool(rag_tool, monkeypatch):
+    rag_tool.cache_rag_responses = False
+    rag_tool.query_cache_size = 0
+    rag_tool.vector_shard_rows = 64
+    queries = [" ".join(WORDS[i:i + 3]) for i in range(0, 24, 4)]
+
+    sharded_calls = []
+    search = ShardedSearcher.search
+
+    def counting_search(self, *args):
+        sharded_calls.append(self.processes)
+        return search(self, *args)
+
+    monkeypatch.setattr(ShardedSearcher, "search", counting_search)
+
+    async def answers():
+        return [
+            await rag_tool.execute({
+                "operation": "query", "knowledge_base_name": "sharded", "query": query, "search_mode": "exact",
+                "include_cognitive_insights": False
+            })
+            for query in queries
+        ]
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "sharded"})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "sharded", "documents": make_documents(120),
+            "enable_cognitive_analysis": False
+        })
+        await rag_tool.execute({
+            "operation": "remove", "knowledge_base_name": "sharded", "filenames": [f"doc-{i:04d}.txt" for i in range(0, 120, 7)]
+        })
+
+        rag_tool.vector_search_processes = 1
+        in_process = await answers()
+        rag_tool.vector_search_processes = 2
+        return in_process, await answers()
+
+    in_process, sharded = run(scenario())
+
+    assert sharded_calls == [2] * len(queries)
+    assert all(answer.startswith("## 🧠") for answer in sharded)
+    assert sharded == in_process
@@ -0,0 +1,108 @@
+"""
+Knowledge base snapshots: export on one side, import under a new name on the other
+"""
+
+import sqlite3
+
+from conftest import make_documents, run
+
+TABLES = {
+    "documents": "SELECT filename, content, content_hash, category, metadata FROM documents ORDER BY id",
+    "chunks": "SELECT id, content, content_hash, vector_embedding, ref_count FROM chunks ORDER BY id",
+    "document_chunks": "SELECT document_id, chunk_index, chunk_id, start_position, end_position FROM document_chunks ORDER BY document_id, chunk_index",
+    "cognitive_analysis": "SELECT chunk_id, system_name, analysis_result, confidence_score FROM cognitive_analysis ORDER BY id",
+    "kb_stats": "SELECT scope, key, value FROM kb_stats ORDER BY scope, key"
+}
+QUERIES = ["harmonic river lantern", "quantum cascade glacier", "copper falcon spectrum"]
+
+
+def dump(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {table: conn.execute(sql).fetchall() for table, sql in TABLES.items()}
+
+
+def vector_files(kb_path):
+    return {path.name: path.read_bytes() for path in sorted((kb_path / "vectors").iterdir()) if path.is_file()}
+
+
+def test_export_import_round_trip(rag_tool, tmp_path):
+    rag_tool.vector_compaction_ratio = 1.0  # keep the tombstones so they travel too
+    rag_tool.cache_rag_responses = False
+    documents = make_documents(90)
+    snapshot_path = tmp_path / "exports" / "source.gurukb"
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "source", "vector_quantization": "pq"})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "source", "documents": documents, "enable_cognitive_analysis": True
+        })
+        await rag_tool.execute({
+            "operation": "remove", "knowledge_base_name": "source", "filenames": [document["filename"] for document in documents[::9]]
+        })
+
+        exported = await rag_tool.execute({"operation": "export", "knowledge_base_name": "source", "snapshot_path": str(snapshot_path)})
+        imported = await rag_tool.execute({"operation": "import", "knowledge_base_name": "copy", "snapshot_path": str(snapshot_path)})
+        clash = await rag_tool.execute({"operation": "import", "knowledge_base_name": "copy", "snapshot_path": str(snapshot_path)})
+
+        answers = {}
+        for kb_name in ("source", "copy"):
+            answers[kb_name] = [
+                (await rag_tool.execute({
+                    "operation": "query", "knowledge_base_name": kb_name, "query": query, "search_mode": search_mode,
+                    "include_cognitive_insights": False
+                })).replace(f"**Knowledge Base:** {kb_name}", "")
+                for query in QUERIES for search_mode in ("hybrid", "exact")
+            ]
+
+        paths = [(await rag_tool._load_knowledge_base_config(kb_name))[1] for kb_name in ("source", "copy")]
+        return exported, imported, clash, answers, paths
+
+    exported, imported, clash, answers, (source_path, copy_path) = run(scenario())
+
+    assert exported.startswith("## 📦") and snapshot_path.is_file(), exported
+    assert not snapshot_path.with_name(snapshot_path.name + ".db").exists()
+    assert "**Documents:** 80" in imported, imported
+    assert clash.startswith("## Error") and "already exists" in clash
+
+    source, copy = dump(source_path / "knowledge_base.db"), dump(copy_path / "knowledge_base.db")
+    assert len(source["cognitive_analysis"]) > 0
+    assert source == copy
+
+    # The vector files are restored byte for byte (tombstones and pq codes included), not rebuilt
+    source_files = vector_files(source_path)
+    assert {"embeddings.f32", "chunk_ids.i64", "deleted.i64", "codes.pq"} <= set(source_files)
+    assert vector_files(copy_path) == source_files
+
+    assert answers["copy"] == answers["source"]
+    assert not [path for path in copy_path.parent.iterdir() if ".import-" in path.name]
+
+
+def test_import_rejects_damaged_snapshot(rag_tool, tmp_path):
+    snapshot_path = tmp_path / "source.gurukb"
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "source"})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "source", "documents": make_documents(20), "enable_cognitive_analysis": False
+        })
+        await rag_tool.execute({"operation": "export", "knowledge_base_name": "source", "snapshot_path": str(snapshot_path)})
+
+        damaged = tmp_path / "damaged.gurukb"
+        damaged.write_bytes(snapshot_path.read_bytes()[:-20_000])
+        not_a_snapshot = tmp_path / "notes.gurukb"
+        not_a_snapshot.write_text("just some notes")
+
+        results = [
+            await rag_tool.execute({"operation": "import", "knowledge_base_name": "copy", "snapshot_path": str(path)})
+            for path in (damaged, not_a_snapshot, tmp_path / "missing.gurukb")
+        ]
+        listing = await rag_tool.execute({"operation": "list"})
+        return results, listing
+
+    results, listing = run(scenario())
+
+    assert all(result.startswith("## Error") for result in results), results
+    assert "Not a knowledge base snapshot" in results[1] and "Snapshot not found" in results[2]
+    assert "copy" not in listing
+    kb_dir = rag_tool.knowledge_base_dir
+    assert sorted(path.name for path in kb_dir.iterdir() if path.is_dir()) == ["source"]
@@ -0,0 +1,82 @@
+"""
+The memory-mapped embedding matrix behind vector scoring
+"""
+
+import numpy as np
+
+from conftest import WORDS, make_documents, run
+from guru_mcp.rag import VectorMatrix
+
+
+def brute_force(vectors, chunk_ids, query, top_k):
+    normalised = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalised @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return chunk_ids[order], scores[order]
+
+
+def test_search_matches_brute_force_and_survives_reopen(tmp_path):
+    rng = np.random.default_rng(11)
+    vectors = (rng.normal(size=(3000, 20)) * rng.uniform(0.1, 5.0, size=(3000, 1))).astype(np.float32)
+    chunk_ids = np.arange(10, 30_010, 10, dtype=np.int64)
+    queries = rng.normal(size=(8, 20)).astype(np.float32)
+
+    matrix = VectorMatrix(tmp_path / "vectors", 20)
+    for start in range(0, 3000, 1000):  # appended in several batches, as ingest does
+        matrix.append(chunk_ids[start:start + 1000], vectors[start:start + 1000])
+
+    np.testing.assert_allclose(np.linalg.norm(matrix.matrix, axis=1), 1.0, rtol=1e-5)
+    reopened = VectorMatrix(tmp_path / "vectors", 20)
+    assert reopened.is_consistent(3000) and not reopened.is_consistent(2999)
+
+    for query in queries:
+        expected_ids, expected_scores = brute_force(vectors, chunk_ids, query, 25)
+        for candidate in (matrix, reopened):
+            ids, scores = candidate.search(query, 25)
+            assert ids.tolist() == expected_ids.tolist()
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-5, atol=1e-6)
+
+        # Restricting the scan to some rows ranks just those rows
+        expected_ids, expected_scores = brute_force(vectors[::4], chunk_ids[::4], query, 25)
+        ids, _ = matrix.search(query, 25, rows=matrix.live_rows(chunk_ids[::4]))
+        assert ids.tolist() == expected_ids.tolist()
+        np.testing.assert_allclose(matrix.similarities(ids, query), expected_scores, rtol=1e-5, atol=1e-6)
+
+
+def test_matrix_out_of_step_with_database_is_rebuilt(rag_tool):
+    rag_tool.cache_rag_responses = False
+    rag_tool.query_cache_size = 0
+    queries = [" ".join(WORDS[i:i + 3]) for i in range(0, 24, 6)]
+
+    async def answers():
+        return [
+            await rag_tool.execute({
+                "operation": "query", "knowledge_base_name": "matrix", "query": query, "search_mode": "exact",
+                "include_cognitive_insights": False
+            })
+            for query in queries
+        ]
+
+    async def scenario():
+        await rag_tool.execute({"operation": "create", "knowledge_base_name": "matrix"})
+        await rag_tool.execute({
+            "operation": "add_documents", "knowledge_base_name": "matrix", "documents": make_documents(40),
+            "enable_cognitive_analysis": False
+        })
+        before = await answers()
+
+        # A crash mid-append leaves a torn trailing row; the next open must notice and rebuild
+        _, kb_path = await rag_tool._load_knowledge_base_config("matrix")
+        rag_tool._vector_matrices.pop(str(kb_path))
+        matrix_path = kb_path / "vectors" / "embeddings.f32"
+        with open(matrix_path, "r+b") as f:
+            f.truncate(matrix_path.stat().st_size - 100)
+
+        after = await answers()
+        vector_matrix = await rag_tool._get_vector_matrix(kb_path / "knowledge_base.db")
+        return before, after, vector_matrix, (await rag_tool._read_kb_stats(kb_path / "knowledge_base.db"))["totals"]
+
+    before, after, vector_matrix, totals = run(scenario())
+
+    assert after == before
+    assert vector_matrix.is_consistent(totals["chunks"]) and vector_matrix.live_count == totals["chunks"]